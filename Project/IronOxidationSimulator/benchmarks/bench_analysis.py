@@ -0,0 +1,338 @@
+"""
+bench_analysis.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Benchmark suite for the analysis functions.
+Every function is run on synthetic data (see synthetic.py) over a range of sizes: trace length for the
+trace analyses and number of experiments for the reaction order, 3D plane and save steps. The best wall
+time of a few repeats and the peak memory allocated (tracemalloc) are recorded per function and size,
+written as JSON and compared against a saved baseline.
+
+Usage (from Project/IronOxidationSimulator):
+    python benchmarks/bench_analysis.py -o baseline.json
+    python benchmarks/bench_analysis.py --baseline baseline.json --tolerance 0.25
+    python benchmarks/bench_analysis.py --full --function cut_data
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time as timer
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import synthetic  # noqa: E402
+from src.utils import initial_rate, memo, rate_const, regression_analysis, save, workbook  # noqa: E402
+from src.utils import plane3D_plot  # noqa: E402
+from src.utils.live_estimator import IncrementalRateEstimator  # noqa: E402
+
+POINT_SIZES = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+FULL_POINT_SIZES = POINT_SIZES + [10 ** 7]
+EXPERIMENT_SIZES = [1, 10, 100, 1000, 10000]
+# Differences below these are timer and allocator noise, not regressions
+MIN_SECONDS_DELTA = 1e-3
+MIN_BYTES_DELTA = 64 * 1024
+# Files are only written up to these sizes, Excel files are slow to generate
+MAX_CSV_ROWS = 10 ** 6
+MAX_XLSX_ROWS = 10 ** 4
+# Samples fed one at a time to the live estimator, a Python loop
+MAX_LIVE_SAMPLES = 10 ** 5
+# Largest allowed growth exponent of time with size between the two largest sizes run, for cases whose cost
+# must stay (near) linear in the number of points
+SCALING_LIMITS = {"IncrementalRateEstimator.add[flat noisy]": 1.3}
+
+
+def _cold_read(reader, path):
+    """Returns a call of reader on path that bypasses the table cache and the column sidecar."""
+    def run():
+        workbook.clear_cache()
+        return reader(path)
+    return run
+
+
+def _trace_file(size, directory, extension):
+    path = os.path.join(directory, f"trace_{size}{extension}")
+    if not os.path.exists(path):
+        synthetic.write_table(synthetic.trace_table(size), path)
+    return path
+
+
+def _experiment_file(size, directory, name, table, extension):
+    path = os.path.join(directory, f"{name}_{size}{extension}")
+    if not os.path.exists(path):
+        synthetic.write_table(table(size), path)
+    return path
+
+
+def _save_result(size):
+    """Builds a ButtonArea.result-like dictionary with every analysis for size experiments."""
+    time, conc = synthetic.decay_trace(max(size, 10))
+    order = synthetic.reaction_order_data(max(size, 2))
+    log_x, log_y = regression_analysis.calculate_log_values(order.iloc[:, 0].values, order.iloc[:, 1].values)
+    plane = synthetic.plane_data(max(size, 3))
+    plotter = plane3D_plot.Plane3DPlotter(data=plane)
+    params, r_squared = plotter.perform_analysis()
+    return {
+        "reaction order analysis": {"result": (log_x, log_y) + regression_analysis.calculate_regression(log_x, log_y)},
+        "initial rate analysis": {"Use a range between 5% to 20%": initial_rate.calculate_rate_compare(time, conc)},
+        "rate const analysis": {"Default": rate_const.calculate_rate(time, conc)},
+        "3D plane plot": {"Default": (plotter.pH, plotter.log_initial_concentration, plotter.log_initial_rate,
+                                      params, r_squared)},
+    }
+
+
+def _cases(directory):
+    """
+    Returns the benchmark cases as (name, kind, maximum size, setup) tuples.
+
+    setup(size) returns the function to time, without arguments.
+    """
+    def trace(function):
+        def setup(size):
+            time, conc = synthetic.decay_trace(size)
+            return lambda: function(time, conc)
+        return setup
+
+    def live(size):
+        # A flat noisy trace keeps crossing its first concentration, so its direction flips all the time
+        time, conc = synthetic.decay_trace(size, k=0.0, noise=0.01)
+
+        def run():
+            estimator = IncrementalRateEstimator(0.1)
+            for t, c in zip(time.tolist(), conc.tolist()):
+                estimator.add(t, c)
+                estimator.initial_rate()
+        return run
+
+    def regression(size):
+        order = synthetic.reaction_order_data(size)
+        log_x, log_y = regression_analysis.calculate_log_values(order.iloc[:, 0].values, order.iloc[:, 1].values)
+        return lambda: regression_analysis.calculate_regression(log_x, log_y)
+
+    def plane(size):
+        plotter = plane3D_plot.Plane3DPlotter(data=synthetic.plane_data(size))
+        return lambda: plotter.fit_plane(plotter.log_initial_concentration, plotter.pH, plotter.log_initial_rate)
+
+    def save_all(size):
+        result = _save_result(size)
+        output = tempfile.mkdtemp(dir=directory)
+        return lambda: save.save(result, output, {}, force=True)
+
+    def read(reader, extension, table=None, name=None):
+        def setup(size):
+            if table is None:
+                path = _trace_file(size, directory, extension)
+            else:
+                path = _experiment_file(size, directory, name, table, extension)
+            return _cold_read(reader, path)
+        return setup
+
+    return [
+        ("cut_data", "points", None, trace(lambda time, conc: initial_rate.cut_data(time, conc, 0.1))),
+        ("initial_rate.calculate_rate", "points", None,
+         trace(lambda time, conc: initial_rate.calculate_rate(time, conc, 0.1))),
+        ("initial_rate.calculate_rate_compare", "points", None, trace(initial_rate.calculate_rate_compare)),
+        ("rate_const.calculate_rate", "points", None, trace(rate_const.calculate_rate)),
+        ("IncrementalRateEstimator.add[flat noisy]", "points", MAX_LIVE_SAMPLES, live),
+        ("regression_analysis.calculate_regression", "experiments", None, regression),
+        ("Plane3DPlotter.fit_plane", "experiments", None, plane),
+        ("save.save", "experiments", None, save_all),
+        ("initial_rate.read_data[csv]", "points", MAX_CSV_ROWS, read(initial_rate.read_data, ".csv")),
+        ("initial_rate.read_data[xlsx]", "points", MAX_XLSX_ROWS, read(initial_rate.read_data, ".xlsx")),
+        ("rate_const.read_data[csv]", "points", MAX_CSV_ROWS, read(rate_const.read_data, ".csv")),
+        ("regression_analysis.read_data[xlsx]", "experiments", MAX_XLSX_ROWS,
+         read(regression_analysis.read_data, ".xlsx", synthetic.reaction_order_data, "order")),
+        ("plane3D_plot.read_data[xlsx]", "experiments", MAX_XLSX_ROWS,
+         read(plane3D_plot.read_data, ".xlsx", synthetic.plane_data, "plane")),
+    ]
+
+
+def measure(function, repeat, min_seconds=0.2):
+    """
+    Times a function and measures its peak memory.
+
+    Args:
+        - function (callable): Function without arguments.
+        - repeat (int): Maximum number of timed runs; fewer are made once min_seconds have passed.
+        - min_seconds (float, optional): Total time after which no more runs are started. Defaults to 0.2.
+
+    Returns:
+        dict: Best and mean wall time in seconds, the number of runs and the peak traced memory in bytes.
+    """
+    times = []
+    while len(times) < repeat and (not times or sum(times) < min_seconds):
+        start = timer.perf_counter()
+        function()
+        times.append(timer.perf_counter() - start)
+
+    # A separate run for memory, tracemalloc slows the code down
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(times), "mean_seconds": float(np.mean(times)), "runs": len(times), "peak_bytes": peak}
+
+
+def run_suite(point_sizes, experiment_sizes, functions=None, repeat=5, report=print):
+    """
+    Runs every benchmark case at every size.
+
+    Args:
+        - point_sizes (list of int): Trace lengths.
+        - experiment_sizes (list of int): Numbers of experiments.
+        - functions (list of str, optional): Names of the cases to run. Defaults to all.
+        - repeat (int, optional): Maximum number of timed runs per case. Defaults to 5.
+        - report (callable, optional): Called with one line per measurement. Defaults to print.
+
+    Returns:
+        dict: Machine information under "meta" and one entry per function and size under "results".
+    """
+    results = []
+    # Disk sidecars and memoized fits would turn the benchmarks into cache hits
+    workbook.set_sidecar_enabled(False)
+    memo.set_enabled(False)
+    with tempfile.TemporaryDirectory() as directory:
+        for name, kind, max_size, setup in _cases(directory):
+            if functions and name not in functions:
+                continue
+            sizes = point_sizes if kind == "points" else experiment_sizes
+            for size in sizes:
+                if max_size is not None and size > max_size:
+                    continue
+                entry = {"function": name, "kind": kind, "size": size}
+                try:
+                    with warnings.catch_warnings():
+                        # Tiny sizes make sklearn warn about undefined R squared
+                        warnings.simplefilter("ignore")
+                        entry.update(measure(setup(size), repeat))
+                    report(f"{name:45s} {size:>10d}  {entry['seconds'] * 1000:10.3f} ms  "
+                           f"{entry['peak_bytes'] / 1024 ** 2:9.2f} MB")
+                except Exception as e:
+                    entry["error"] = str(e)
+                    report(f"{name:45s} {size:>10d}  error: {e}")
+                results.append(entry)
+    workbook.set_sidecar_enabled(True)
+    memo.set_enabled(True)
+
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares benchmark results with a baseline.
+
+    Args:
+        - results (dict): Output of run_suite.
+        - baseline (dict): Earlier output of run_suite.
+        - tolerance (float): Allowed relative increase of time and peak memory, e.g. 0.25 for 25%.
+
+    Returns:
+        list: Descriptions of the regressions found, empty if there are none.
+    """
+    previous = {(entry["function"], entry["size"]): entry for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in results["results"]:
+        old = previous.get((entry["function"], entry["size"]))
+        if old is None or "error" in old:
+            continue
+        if "error" in entry:
+            regressions.append(f"{entry['function']} [{entry['size']}]: now fails with {entry['error']}")
+            continue
+        for key, unit, scale, floor in (("seconds", "ms", 1000, MIN_SECONDS_DELTA),
+                                        ("peak_bytes", "MB", 1 / 1024 ** 2, MIN_BYTES_DELTA)):
+            if entry[key] > old[key] * (1 + tolerance) and entry[key] - old[key] > floor:
+                regressions.append(f"{entry['function']} [{entry['size']}]: {key} {entry[key] * scale:.3f} {unit} "
+                                   f"vs baseline {old[key] * scale:.3f} {unit}")
+    return regressions
+
+
+def check_scaling(results, limits=None):
+    """
+    Checks that the time of the cases in SCALING_LIMITS does not grow faster with size than allowed.
+
+    Args:
+        - results (dict): Output of run_suite.
+        - limits (dict, optional): Case name -> largest allowed exponent. Defaults to SCALING_LIMITS.
+
+    Returns:
+        list: Descriptions of the cases that scale worse than their limit, empty if there are none.
+    """
+    limits = SCALING_LIMITS if limits is None else limits
+    violations = []
+    for name, limit in limits.items():
+        entries = sorted((entry["size"], entry["seconds"]) for entry in results["results"]
+                         if entry["function"] == name and "error" not in entry)
+        if len(entries) < 2:
+            continue
+        (small, small_seconds), (large, large_seconds) = entries[-2:]
+        if large_seconds - small_seconds <= MIN_SECONDS_DELTA:
+            continue
+        exponent = np.log(large_seconds / small_seconds) / np.log(large / small)
+        if exponent > limit:
+            violations.append(f"{name}: time grows as size^{exponent:.2f} from {small} to {large}, "
+                              f"limit {limit}")
+    return violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis functions of the Iron Oxidation Simulator.")
+    parser.add_argument("--full", action="store_true", help="Include traces of 10^7 points.")
+    parser.add_argument("--sizes", type=float, nargs="+", help="Trace lengths to run, e.g. 1e3 1e5.")
+    parser.add_argument("--experiments", type=float, nargs="+", help="Numbers of experiments to run.")
+    parser.add_argument("-f", "--function", action="append", help="Only run this case (repeatable).")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Maximum timed runs per case (default: 5).")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown or memory growth (default: 0.25).")
+    args = parser.parse_args(argv)
+
+    point_sizes = [int(size) for size in args.sizes] if args.sizes else (
+        FULL_POINT_SIZES if args.full else POINT_SIZES)
+    experiment_sizes = [int(size) for size in args.experiments] if args.experiments else EXPERIMENT_SIZES
+    results = run_suite(point_sizes, experiment_sizes, args.function, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    violations = check_scaling(results)
+    for violation in violations:
+        print(f"Scaling: {violation}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+bench_startup.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Startup benchmark for the main window.
+Each run starts a fresh interpreter and measures the import time of src.mainwindow and the time until the
+main window first paints. It also checks that no heavy module (pandas, scikit-learn, matplotlib) was
+imported on the way. Results are written as JSON and can be compared against a saved baseline.
+
+Usage (from Project/IronOxidationSimulator):
+    python benchmarks/bench_startup.py -o startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "sklearn", "matplotlib", "mpl_toolkits", "openpyxl"]
+
+# Runs in the child interpreter, prints one JSON line
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import src.mainwindow as mainwindow
+imported = time.perf_counter()
+
+from PyQt5.QtCore import QObject, QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+
+class PaintWatcher(QObject):
+    def __init__(self):
+        super().__init__()
+        self.painted = None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.painted is None:
+            self.painted = time.perf_counter()
+            QTimer.singleShot(0, app.quit)
+        return False
+
+app = QApplication(sys.argv)
+watcher = PaintWatcher()
+app.installEventFilter(watcher)
+window = mainwindow.MainWindow()
+window.show()
+QTimer.singleShot(10000, app.quit)
+app.exec_()
+
+print(json.dumps({
+    "import_seconds": imported - start,
+    "first_paint_seconds": (watcher.painted or time.perf_counter()) - start,
+    "heavy_modules": sorted(name for name in HEAVY if name in sys.modules),
+}))
+"""
+
+
+def run_once():
+    """
+    Starts the application in a fresh interpreter and measures it.
+
+    Returns:
+        dict: Import time, time to first paint and heavy modules loaded, or None if the run failed.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + CHILD
+    process = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        print(f"Error starting the application: {process.stderr.strip()}")
+        return None
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(repeat):
+    """
+    Runs the startup measurement several times and keeps the median.
+
+    Args:
+        - repeat (int): Number of fresh starts.
+
+    Returns:
+        dict: Median import time, median time to first paint and heavy modules loaded, or None if a run failed.
+    """
+    runs = []
+    for _ in range(repeat):
+        run = run_once()
+        if run is None:
+            return None
+        runs.append(run)
+    return {
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "import_seconds": statistics.median(run["import_seconds"] for run in runs),
+        "first_paint_seconds": statistics.median(run["first_paint_seconds"] for run in runs),
+        "heavy_modules": sorted({name for run in runs for name in run["heavy_modules"]}),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """
+    Compares a result with a baseline.
+
+    Args:
+        - result (dict): Result of run_benchmark.
+        - baseline (dict): Earlier result of run_benchmark.
+        - tolerance (float): Allowed relative slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        list: Descriptions of the regressions found, empty if there are none.
+    """
+    regressions = []
+    for key in ("import_seconds", "first_paint_seconds"):
+        if key in baseline and result[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key}: {result[key]:.3f} s vs baseline {baseline[key]:.3f} s")
+    if result["heavy_modules"]:
+        regressions.append(f"heavy modules imported at startup: {', '.join(result['heavy_modules'])}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup time of the Iron Oxidation Simulator.")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Number of fresh starts (default: 5).")
+    parser.add_argument("-o", "--output", help="Write the result to this JSON file.")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown against the baseline (default: 0.25).")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.repeat)
+    if result is None:
+        return 2
+
+    print(f"import src.mainwindow: {result['import_seconds'] * 1000:.1f} ms")
+    print(f"first paint:           {result['first_paint_seconds'] * 1000:.1f} ms")
+    print(f"heavy modules loaded:  {', '.join(result['heavy_modules']) or 'none'}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    elif result["heavy_modules"]:
+        print("Regression: heavy modules imported at startup")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+synthetic.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Synthetic data for the benchmarks.
+Traces are noisy Fe(II) decays as read by initial_rate.read_data and rate_const.read_data. Experiment
+tables follow assets/Book3.xlsx: log10 initial rates of about -2.1 to -1.5 against log10 Fe(II) of about
+1.1 to 1.55 (slope about 1.2), with absolute log errors of 0.002 to 0.2, and are converted to the raw
+concentration / rate (/ pH) columns the readers of the GUI expect.
+"""
+
+import numpy as np
+import pandas as pd
+
+LN10 = np.log(10.0)
+
+
+def decay_trace(n_points, fe0=50.0, k=2e-3, duration=1800.0, noise=0.005, seed=0):
+    """
+    Generates a first-order Fe(II) decay with multiplicative noise.
+
+    Args:
+        - n_points (int): Number of points.
+        - fe0 (float, optional): Initial concentration in uM. Defaults to 50.
+        - k (float, optional): Rate constant in 1/s. Defaults to 2e-3.
+        - duration (float, optional): Length of the trace in seconds. Defaults to 1800.
+        - noise (float, optional): Relative noise level. Defaults to 0.005.
+        - seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        tuple: Time and concentration arrays.
+    """
+    rng = np.random.default_rng(seed)
+    time = np.linspace(0.0, duration, int(n_points))
+    conc = fe0 * np.exp(-k * time) * (1 + noise * rng.standard_normal(time.size))
+    return time, conc
+
+
+def book3_table(n_experiments, seed=0):
+    """
+    Generates a reaction order table with the columns of assets/Book3.xlsx.
+
+    Args:
+        - n_experiments (int): Number of rows.
+        - seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        pandas.DataFrame: logR0, its absolute/upper/lower errors, log[Fe] and its absolute/upper/lower errors.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(n_experiments)
+    log_fe = rng.uniform(1.1, 1.55, n)
+    log_r0 = -3.45 + 1.22 * log_fe + rng.normal(0.0, 0.03, n)
+    d_log_r0 = rng.uniform(0.03, 0.21, n)
+    d_log_fe = rng.uniform(0.001, 0.0055, n)
+    return pd.DataFrame({
+        'logR0': log_r0,
+        'ΔlogR0  absolute': d_log_r0,
+        'ΔlogR0 upper': d_log_r0 * 0.95,
+        'ΔlogR0  lower': d_log_r0 * 1.06,
+        'log[Fe]': log_fe,
+        'Δlog[Fe] absolute': d_log_fe,
+        'Δlog[Fe] upper': d_log_fe * 0.995,
+        'Δlog[Fe] lower': d_log_fe * 1.006,
+    })
+
+
+def reaction_order_data(n_experiments, seed=0):
+    """
+    Generates the raw columns read by regression_analysis.read_data from a Book3-like table.
+
+    Args:
+        - n_experiments (int): Number of experiments.
+        - seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        pandas.DataFrame: Initial concentration, initial rate and their standard deviations.
+    """
+    table = book3_table(n_experiments, seed)
+    conc = 10 ** table['log[Fe]'].values
+    rate = 10 ** table['logR0'].values
+    return pd.DataFrame({
+        'Initial concentration': conc,
+        'Initial rate': rate,
+        'SD concentration': LN10 * conc * table['Δlog[Fe] absolute'].values,
+        'SD rate': LN10 * rate * table['ΔlogR0  absolute'].values,
+    })
+
+
+def plane_data(n_experiments, seed=0):
+    """
+    Generates the columns read by Plane3DPlotter: initial concentration, initial rate and pH.
+
+    Args:
+        - n_experiments (int): Number of experiments.
+        - seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        pandas.DataFrame: Initial concentration, initial rate and pH.
+    """
+    table = book3_table(n_experiments, seed)
+    rng = np.random.default_rng(seed + 1)
+    pH = rng.uniform(6.0, 8.0, len(table))
+    conc = 10 ** table['log[Fe]'].values
+    rate = 10 ** (table['logR0'].values + 0.35 * (pH - 7.0))
+    return pd.DataFrame({'Initial concentration': conc, 'Initial rate': rate, 'pH': pH})
+
+
+def write_table(table, path):
+    """
+    Writes a generated table as .csv or .xlsx, depending on the extension.
+
+    Args:
+        - table (pandas.DataFrame): Table to write.
+        - path (str): Output path.
+    """
+    if path.lower().endswith('.xlsx'):
+        table.to_excel(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+
+def trace_table(n_points, seed=0):
+    """
+    Generates a trace as the two-column table read by initial_rate.read_data.
+
+    Args:
+        - n_points (int): Number of points.
+        - seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        pandas.DataFrame: Time and concentration.
+    """
+    time, conc = decay_trace(n_points, seed=seed)
+    return pd.DataFrame({'Time': time, 'Concentration': conc})
@@ -0,0 +1,114 @@
+"""
+batch_cli.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Command-line entry point for running the analyses without the GUI.
+
+Example (from Project/IronOxidationSimulator):
+    python -m src.batch_cli data/ --analysis "rate const analysis" --workers 8 --output results.csv
+"""
+
+import argparse
+import os
+import sys
+
+from src.utils import memo, tracing
+from src.utils.batch import ANALYSES, collect_files, run_batch, write_table
+from src.utils.initial_rate import ESTIMATORS
+from src.utils.results_store import ResultsStore, runs_from_table
+
+
+def parse_args(argv=None):
+    """
+    Parses the command-line arguments.
+
+    Args:
+        - argv (list of str, optional): Arguments to parse. Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run the Iron Oxidation Simulator analyses on many files.")
+    parser.add_argument("inputs", nargs="+",
+                        help="Directories, glob patterns or .xlsx/.csv files to analyse.")
+    parser.add_argument("-a", "--analysis", action="append", choices=ANALYSES, dest="analyses",
+                        help="Analysis to run on every file. Can be given several times. Defaults to all.")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("-t", "--threshold", type=float, default=None,
+                        help="Threshold for the initial rate analysis. "
+                             "If not given, thresholds from 5%% to 20%% are compared.")
+    parser.add_argument("-e", "--estimator", choices=ESTIMATORS, default="ols",
+                        help="Line fit of the initial rate analysis: least squares (default), or the robust "
+                             "Theil-Sen or RANSAC, which spikes in the first points do not pull off.")
+    parser.add_argument("--ci", choices=("auto", "bootstrap", "jackknife"), default=None, dest="interval",
+                        help="Add a 95%% confidence interval of the reaction order and rate constant. A bootstrap "
+                             "takes about 15 ns per point and resample; auto uses the jackknife for long traces.")
+    parser.add_argument("-o", "--output", default="batch_result.csv",
+                        help="Path of the consolidated result table, .csv or .xlsx (.xls cannot be written).")
+    parser.add_argument("--db", default=None,
+                        help="Also add the results to this SQLite results store, one run per file.")
+    parser.add_argument("--no-memo", action="store_true",
+                        help="Fit every file again instead of reusing fits of data seen earlier in the run.")
+    parser.add_argument("--memo-dir", nargs="?", const=memo.DEFAULT_DIRECTORY, default=None,
+                        help="Also keep the stored fits on disk in this directory (default "
+                             "~/.iron_oxidation/memo), so later runs reuse them. Off by default.")
+    parser.add_argument("--trace", default=None,
+                        help="Write the time of every stage to this file as Chrome trace-event JSON.")
+    args = parser.parse_args(argv)
+    if args.output.lower().endswith(".xls"):
+        # Checked before the run, as write_table would only fail after every file is analysed
+        parser.error("--output: the legacy .xls format cannot be written, use .xlsx or .csv")
+    return args
+
+
+def main(argv=None):
+    """
+    Runs the batch analysis and writes the result table.
+
+    Args:
+        - argv (list of str, optional): Command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit status, 0 on success.
+    """
+    args = parse_args(argv)
+    if args.trace:
+        tracing.enable()
+    if args.no_memo:
+        memo.set_enabled(False)
+        # Worker processes that do not fork read the setting from the environment
+        os.environ[memo.MEMO_ENV] = "0"
+    elif args.memo_dir:
+        memo.enable_disk(args.memo_dir)
+    files = collect_files(args.inputs)
+    if not files:
+        print("No .xlsx or .csv files found.")
+        return 1
+
+    analyses = args.analyses or ANALYSES
+    with tracing.span("run_batch", files=len(files)):
+        table, summary = run_batch(files, analyses, workers=args.workers, threshold=args.threshold,
+                                   estimator=args.estimator, interval=args.interval)
+    with tracing.span("write_table", "io"):
+        write_table(table, args.output)
+
+    failed = (table["error"] != "").sum()
+    print(f"Analysed {summary['files']} files in {summary['seconds']:.2f} s "
+          f"({summary['files_per_second']:.2f} files/s), {failed} failed analyses.")
+    print(f"Results written to {args.output}")
+    if args.db:
+        with tracing.span("store_results", "io"), ResultsStore(args.db) as store:
+            run_ids = store.add_runs(runs_from_table(table))
+        print(f"Added {len(run_ids)} runs to {args.db}")
+    if args.trace and tracing.export_chrome_trace(args.trace):
+        print(f"Trace written to {args.trace}")
+        print(tracing.summary_table())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+analysis_jobs.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+The calculations behind the "Start" button, one function per feature.
+Each function takes the input data of its feature and the options chosen in the OptionDialog, and returns
+the entry stored in ButtonArea.result. They are independent of each other and of the GUI, so ButtonArea
+runs them concurrently on worker threads.
+"""
+
+from ..utils.registry import lazy_module
+
+# Imported on first use, see utils.registry
+regression_analysis = lazy_module("regression_analysis")
+initial_rate = lazy_module("initial_rate")
+rate_const = lazy_module("rate_const")
+plane3D_plot = lazy_module("plane3D_plot")
+bootstrap = lazy_module("bootstrap")
+
+# Reaction order and rate constant option that adds a confidence interval, see bootstrap.confidence_interval
+CONFIDENCE_INTERVAL = "Bootstrap confidence interval"
+# Initial rate options that fit the specific threshold with a robust estimator, see initial_rate.ESTIMATORS
+ROBUST_INITIAL_RATE = {
+    "Theil-Sen (robust, specific threshold)": "theil-sen",
+    "RANSAC (robust, specific threshold)": "ransac",
+}
+
+
+def _report(job, percent):
+    """Reports progress if the function runs as a background job."""
+    if job is not None:
+        job.report(percent)
+
+
+def reaction_order_job(data, options, job=None):
+    """
+    Runs the reaction order analysis.
+
+    Args:
+        - data (dict or tuple): Initial concentrations and initial rates, optionally followed by their
+          standard deviations (the third and fourth columns of a file with at least four columns, see
+          regression_analysis.read_data). The weighted and York fits need them.
+        - options (dict): Options chosen for the feature.
+        - job (Worker, optional): Background job used to report progress. Defaults to None.
+
+    Returns:
+        dict: Log concentration, log rate, slope, intercept, R squared and the standard errors of slope and
+        intercept, keyed by the method name. The confidence interval option adds the result of
+        bootstrap.reaction_order_interval.
+    """
+    _report(job, 0)
+    try:
+        values = list(data.values())
+    except AttributeError:
+        values = list(data)
+    if len(values) not in (2, 4):
+        raise ValueError("Invalid data format")
+
+    x, y = values[:2]
+    log_x, log_y = regression_analysis.calculate_log_values(x, y)
+    if len(values) == 4:
+        log_x_sd = regression_analysis.calculate_log_errors(x, values[2])
+        log_y_sd = regression_analysis.calculate_log_errors(y, values[3])
+    else:
+        log_x_sd = log_y_sd = None
+    _report(job, 50)
+
+    if options.get("Weighted least squares"):
+        if log_x_sd is None:
+            raise ValueError("Weighted least squares needs the standard deviations of both columns")
+        method = "Weighted least squares"
+        slope, intercept, r_squared, se_slope, se_intercept = regression_analysis.weighted_regression(
+            log_x, log_y, log_x_sd, log_y_sd)
+    elif options.get("York (errors in x and y)"):
+        if log_x_sd is None:
+            raise ValueError("York regression needs the standard deviations of both columns")
+        method = "York (errors in x and y)"
+        slope, intercept, r_squared, se_slope, se_intercept = regression_analysis.york_regression(
+            log_x, log_y, log_x_sd, log_y_sd)
+    else:
+        method = CONFIDENCE_INTERVAL if options.get(CONFIDENCE_INTERVAL) else "result"
+        slope, intercept, r_squared = regression_analysis.calculate_regression(log_x, log_y)
+        se_slope, se_intercept = regression_analysis.weighted_regression(log_x, log_y)[3:]
+    result = (log_x, log_y, slope, intercept, r_squared, se_slope, se_intercept)
+    if method == CONFIDENCE_INTERVAL:
+        _report(job, 70)
+        result += (bootstrap.reaction_order_interval(x, y, "auto", n_resamples=bootstrap.INTERVAL_RESAMPLES,
+                                                     seed=0),)
+    _report(job, 100)
+    return {method: result}
+
+
+def initial_rate_job(data, options, job=None):
+    """
+    Runs the initial rate analysis.
+
+    Args:
+        - data (dict): Time, concentration and threshold values.
+        - options (dict): Options chosen for the feature.
+        - job (Worker, optional): Background job used to report progress. Defaults to None.
+
+    Returns:
+        dict: The result of the chosen method, keyed by the method name.
+    """
+    _report(job, 0)
+    try:
+        time, conc, threshold = data.values()
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid data format")
+
+    _report(job, 10)
+    if options.get("Use specific threshold"):
+        return {"Use specific threshold": initial_rate.calculate_rate(time, conc, threshold)}
+    for method, estimator in ROBUST_INITIAL_RATE.items():
+        if options.get(method):
+            return {method: initial_rate.calculate_rate(time, conc, threshold, estimator)}
+    return {"Use a range between 5% to 20%": initial_rate.calculate_rate_compare(time, conc)}
+
+
+def rate_const_job(data, options, job=None):
+    """
+    Runs the rate constant analysis.
+
+    Args:
+        - data (dict): Time and concentration values.
+        - options (dict): Options chosen for the feature.
+        - job (Worker, optional): Background job used to report progress. Defaults to None.
+
+    Returns:
+        dict: The result under the "Default" key, or under the confidence interval option with the result of
+        bootstrap.rate_const_interval added as "interval".
+    """
+    _report(job, 0)
+    try:
+        time, conc = data.values()
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid data format")
+
+    _report(job, 10)
+    result = rate_const.calculate_rate(time, conc)
+    if options.get(CONFIDENCE_INTERVAL):
+        _report(job, 50)
+        interval = bootstrap.rate_const_interval(time, conc, "auto", n_resamples=bootstrap.INTERVAL_RESAMPLES,
+                                                 seed=0)
+        # calculate_rate is memoized, so the interval goes into a copy of its result
+        return {CONFIDENCE_INTERVAL: dict(result, interval=interval)}
+    return {"Default": result}
+
+
+def plane3D_job(data, options, job=None):
+    """
+    Runs the 3D plane analysis.
+
+    Args:
+        - data (dict or tuple): Initial concentrations, initial rates and pH values, optionally followed by
+          their standard deviations.
+        - options (dict): Options chosen for the feature.
+        - job (Worker, optional): Background job used to report progress. Defaults to None.
+
+    Returns:
+        dict: pH, log concentration, log rate, plane parameters and R squared, keyed by the method name.
+        The Monte Carlo method adds the result of Plane3DPlotter.monte_carlo.
+    """
+    _report(job, 0)
+    plane_plotter = plane3D_plot.Plane3DPlotter(data=data)
+    if plane_plotter.data is None:
+        raise ValueError("Invalid data format")
+    _report(job, 30)
+    params, r_squared = plane_plotter.perform_analysis()
+    result = (plane_plotter.pH, plane_plotter.log_initial_concentration, plane_plotter.log_initial_rate,
+              params, r_squared)
+    if options.get("Monte Carlo uncertainty"):
+        _report(job, 50)
+        return {"Monte Carlo uncertainty": result + (plane_plotter.monte_carlo(),)}
+    _report(job, 100)
+    return {"Default": result}
+
+
+ANALYSIS_JOBS = {
+    "reaction order analysis": reaction_order_job,
+    "initial rate analysis": initial_rate_job,
+    "rate const analysis": rate_const_job,
+    "3D plane plot": plane3D_job,
+}
@@ -3,25 +3,28 @@ button_area.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-06-25
-Modified: 2023-08-14
+Modified: 2026-10-18
 """
-import os
-
-import numpy as np
-import pandas as pd
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtCore import QThreadPool
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QRadioButton, QDialog, QFileDialog, \
-    QTabWidget, QMessageBox
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+    QTabWidget, QMessageBox, QProgressBar, QLabel
 
+from .analysis_jobs import ANALYSIS_JOBS
+from .figures import figure_key, render_job
 from .result_window import ResultWindow
 from .visual_window import VisualWindow
+from .workers import Worker
+
+from ..utils import tracing
+from ..utils.registry import lazy_module
 
-from ..utils import regression_analysis, initial_rate, rate_const
-from ..utils.plane3D_plot import Plane3DPlotter
-from ..utils.save import save
+# Imported on first use, see utils.registry
+render = lazy_module("render")
+results_save = lazy_module("save")
+results_store = lazy_module("results_store")
 
-from matplotlib.figure import Figure
+# Save settings that enable the "Save Results" button: a CSV per analysis, or one workbook
+SAVE_OPTIONS = ("Yes", "Yes, as one workbook")
 
 
 class ButtonArea(QWidget):
@@ -32,8 +35,12 @@ class ButtonArea(QWidget):
         - result: A dictionary storing the results.
         - figures: A dictionary storing the generated figures.
         - main_window: Reference to the main application window.
+        - render_cache: Rendered figures, keyed by a hash of the results they show.
     """
 
+    # Memory cap for the rendered figure cache
+    RENDER_CACHE_BYTES = 64 * 1024 ** 2
+
     def __init__(self, parent=None):
         """
         Initialize the ButtonArea with necessary widgets and layouts.
@@ -46,6 +53,12 @@ class ButtonArea(QWidget):
         self.result = {}
         self.figures = {}
         self.main_window = parent
+        self.workers = {}
+        self.job_progress = {}
+        self.thread_pool = QThreadPool.globalInstance()
+        self.render_workers = set()
+        self.render_cache = None
+        self.save_worker = None
 
         layout = QHBoxLayout()
 
@@ -56,6 +69,10 @@ class ButtonArea(QWidget):
         self.visual_button = QPushButton("Visualisation")
         self.save_button = QPushButton("Save Results")
 
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+
         self.result_button.setEnabled(False)
         self.visual_button.setEnabled(False)
         self.save_button.setEnabled(False)
@@ -65,6 +82,7 @@ class ButtonArea(QWidget):
 
         left_layout.addWidget(self.calculate_button)
         left_layout.addWidget(self.reset_button)
+        left_layout.addWidget(self.progress_bar)
         right_layout.addWidget(self.result_button)
         right_layout.addWidget(self.visual_button)
         right_layout.addWidget(self.save_button)
@@ -83,6 +101,9 @@ class ButtonArea(QWidget):
     def calculate(self):
         """
         Calculate functionality of the application.
+
+        Every selected feature is submitted as an independent job to the thread pool, so the window stays
+        responsive and the analyses run concurrently. Results are stored as the jobs finish.
         """
         if not self.main_window.input_window.data:
             QMessageBox.critical(self, "Error", "No data loaded.", QMessageBox.Ok)
@@ -96,125 +117,106 @@ class ButtonArea(QWidget):
         dialog = OptionDialog(selected_features, self)
         if not dialog.exec():
             return
-        try:
-            for option, selected in self.main_window.settings.func_current_options.items():
-                if selected:
-                    if option == "reaction order analysis":
-                        options = dialog.get_options("reaction order analysis")
-
-                        data = self.main_window.input_window.data[option]
-                        if data is None:
-                            print("No data available")
-                            return
-                        try:
-                            x, y = data.values()
-                        except:
-                            try:
-                                x, y = data
-                            except ValueError:
-                                print("Invalid data format")
-                                return
-
-                        log_x, log_y = regression_analysis.calculate_log_values(x, y)
-                        slope, intercept, r_squared = regression_analysis.calculate_regression(log_x, log_y)
-
-                        self.result[option] = {
-                            "result": (
-                                log_x, log_y, slope, intercept, r_squared
-                            )
-                        }
-
-                        self.result_button.setEnabled(True)
-                        self.visual_button.setEnabled(True)
-                        if self.main_window.settings.save_current_option == "Yes":
-                            self.save_button.setEnabled(True)
-
-
-                    elif option == "initial rate analysis":
-                        options = dialog.get_options("initial rate analysis")
-                        use_specific_threshold = options.get("Use specific threshold")
-                        dont_use_specific_threshold = options.get("Use a range between 5% to 20%")
-                        data = self.main_window.input_window.data[option]
-                        if data is None:
-                            print("No data available")
-                            return
-
-                        try:
-                            time, conc, threshold = data.values()
-                        except ValueError:
-                            print("Invalid data format")
-                            return
-
-                        if use_specific_threshold:
-                            rate_result = initial_rate.calculate_rate(time, conc, threshold)
-                            self.result[option] = {"Use specific threshold": rate_result}
-                        else:
-                            rate_results = initial_rate.calculate_rate_compare(time, conc)
-                            self.result[option] = {"Use a range between 5% to 20%": rate_results}
-                        self.result_button.setEnabled(True)
-                        self.visual_button.setEnabled(True)
-                        if self.main_window.settings.save_current_option == "Yes":
-                            self.save_button.setEnabled(True)
-
-                    elif option == "rate const analysis":
-                        data = self.main_window.input_window.data[option]
-                        if data is None:
-                            print("No data available")
-                            return
-
-                        try:
-                            time, conc = data.values()
-                        except ValueError:
-                            print("Invalid data format")
-                            return
-
-                        rate_result = rate_const.calculate_rate(time, conc)
-                        self.result[option] = {"Default": rate_result}
-                        self.result_button.setEnabled(True)
-                        self.visual_button.setEnabled(True)
-                        if self.main_window.settings.save_current_option == "Yes":
-                            self.save_button.setEnabled(True)
-
-                    elif option == "3D plane plot":
-                        data = self.main_window.input_window.data[option]
-                        if data is None:
-                            print("No data available")
-                            return
-
-                        try:
-                            df = pd.DataFrame(data)
-                            temp_filename = "temp_data_file.xlsx"
-                            df.to_excel(temp_filename, index=False)
-
-                            plane_plotter = Plane3DPlotter(temp_filename)
-                            params, r_squared = plane_plotter.perform_analysis()
-
-                            os.remove(temp_filename)
-
-                        except Exception as e:
-                            print("Error processing data:", e)
-                            return
-
-                        self.result[option] = {
-                            "Default": (
-                                plane_plotter.pH, plane_plotter.log_initial_concentration, plane_plotter.log_initial_rate,
-                                params, r_squared)
-                        }
-                        self.result_button.setEnabled(True)
-                        self.visual_button.setEnabled(True)
-                        if self.main_window.settings.save_current_option == "Yes":
-                            self.save_button.setEnabled(True)
-        except:
-            QMessageBox.critical(self, "Invalid input", "Please check your data.", QMessageBox.Ok)
-            self.main_window.settings.reset()
-            self.main_window.input_window.reset()
 
+        with tracing.span("calculate", features=len(selected_features)):
+            self.cancel_jobs()
+            for option in selected_features:
+                data = self.main_window.input_window.data.get(option)
+                if data is None:
+                    print("No data available")
+                    continue
+
+                worker = Worker(option, ANALYSIS_JOBS[option], data, dialog.get_options(option))
+                worker.signals.progress.connect(self.on_job_progress)
+                worker.signals.finished.connect(
+                    lambda option, result, worker=worker: self.on_job_finished(worker, result))
+                worker.signals.error.connect(lambda option, message, worker=worker: self.on_job_error(worker, message))
+                worker.signals.cancelled.connect(lambda option, worker=worker: self.on_job_done(worker))
+                self.workers[option] = worker
+                self.job_progress[option] = 0
+
+            if self.workers:
+                self.calculate_button.setEnabled(False)
+                self.progress_bar.setValue(0)
+                self.progress_bar.show()
+                for worker in self.workers.values():
+                    self.thread_pool.start(worker)
+
+    def on_job_progress(self, option, percent):
+        """
+        Updates the progress bar with the average progress of the running jobs.
 
+        Args:
+            - option (str): Feature the job belongs to.
+            - percent (int): Progress of that job.
+        """
+        if option in self.job_progress:
+            self.job_progress[option] = percent
+            self.progress_bar.setValue(int(sum(self.job_progress.values()) / len(self.job_progress)))
+
+    def on_job_finished(self, worker, result):
+        """
+        Stores the result of a finished job.
+
+        Args:
+            - worker (Worker): The job that finished.
+            - result (dict): Result of the analysis.
+        """
+        if self.workers.get(worker.name) is not worker:
+            return  # a job from an earlier, cancelled run
+        self.result[worker.name] = result
+        self.result_button.setEnabled(True)
+        self.visual_button.setEnabled(True)
+        if self.main_window.settings.save_current_option in SAVE_OPTIONS:
+            self.save_button.setEnabled(True)
+        self.on_job_done(worker)
+
+    def on_job_error(self, worker, message):
+        """
+        Reports a failed job, cancels the other jobs and resets the inputs.
+
+        Args:
+            - worker (Worker): The job that failed.
+            - message (str): Error message.
+        """
+        if self.workers.get(worker.name) is not worker:
+            return
+        print(f"Error in {worker.name}: {message}")
+        self.cancel_jobs()
+        QMessageBox.critical(self, "Invalid input", "Please check your data.", QMessageBox.Ok)
+        self.main_window.settings.reset()
+        self.main_window.input_window.reset()
+
+    def on_job_done(self, worker):
+        """
+        Removes a job that finished or was cancelled, and restores the buttons when none are left.
+
+        Args:
+            - worker (Worker): The job that ended.
+        """
+        if self.workers.get(worker.name) is worker:
+            del self.workers[worker.name]
+            self.job_progress[worker.name] = 100
+        if not self.workers:
+            self.job_progress = {}
+            self.progress_bar.hide()
+            self.update_start_button()
+
+    def cancel_jobs(self):
+        """
+        Asks every running job to stop. Their results, if any arrive, are ignored.
+        """
+        for worker in self.workers.values():
+            worker.cancel()
+        self.workers = {}
+        self.job_progress = {}
+        self.progress_bar.hide()
 
     def reset(self):
         """
-        Reset functionality of the application.
+        Reset functionality of the application. Running calculations are cancelled.
         """
+        self.cancel_jobs()
         self.result_button.setEnabled(False)
         self.visual_button.setEnabled(False)
         self.save_button.setEnabled(False)
@@ -250,98 +252,119 @@ class ButtonArea(QWidget):
     def show_visual(self):
         """
         Show visual functionality of the application.
+
+        Figures are rendered on worker threads. Rendered images are cached by the content of the results,
+        so showing unchanged results again is instant.
         """
-        colors = 'blue'
+        with tracing.span("show_visual"):
+            self._show_visual()
 
+    def _show_visual(self):
+        """Shows cached figures and starts render jobs for the others."""
         for option, selected in self.main_window.settings.func_current_options.items():
             if selected:
-                fig = Figure()
-                ax = fig.add_subplot(111)
-                legend_lines = []
-                pixmap = None
-
-                if option == "reaction order analysis":
-                    for method, result in self.result[option].items():
-                        pixmap = regression_analysis.plot_regression(*result, label=method,
-                                                                     color=colors, ax=ax, fig=fig)
-                        self.figures[option] = pixmap
-
-                elif option == "initial rate analysis":
-
-                    for method, result in self.result[option].items():
-
-                        time = result['time']
-                        conc = result['conc']
-
-                        if method == "Use specific threshold":
-                            slope = result['slope']
-                            intercept = result['intercept']
-                            r_squared = result['r_squared']
-                            pixmap = initial_rate.plot_initial_rate(time, conc, slope, intercept, r_squared)
-
-                        elif method == "Use a range between 5% to 20%":
-                            slopes = result['slopes']
-                            intercepts = result['intercepts']
-                            r_squared_values = result['r_squared_values']
-                            pixmap = initial_rate.plot_rate_comparison(time, conc, slopes, intercepts, r_squared_values)
-
-                        self.figures[option] = pixmap
-
+                if option not in self.result:
+                    print("Error: No valid data found to plot.")
+                    continue
+
+                if self.render_cache is None:
+                    self.render_cache = render.RenderCache(self.RENDER_CACHE_BYTES)
+                key = figure_key(option, self.result[option])
+                image = self.render_cache.get(key)
+                if image is not None:
+                    self.show_figure(option, image)
+                    continue
+
+                worker = Worker(option, render_job, option, self.result[option])
+                worker.signals.finished.connect(
+                    lambda option, image, worker=worker, key=key: self.on_figure_rendered(worker, key, image))
+                worker.signals.error.connect(
+                    lambda option, message, worker=worker: self.on_figure_error(worker, message))
+                self.render_workers.add(worker)
+                self.thread_pool.start(worker)
+
+    def on_figure_rendered(self, worker, key, image):
+        """
+        Caches and shows a figure rendered in the background.
 
-                elif option == "rate const analysis":
+        Args:
+            - worker (Worker): The rendering job.
+            - key (str): Render cache key of the figure.
+            - image (RenderedImage): The rendered figure, or None if there was nothing to plot.
+        """
+        self.render_workers.discard(worker)
+        if image is None:
+            print("Error: No valid data found to plot.")
+            return
+        self.render_cache.put(key, image)
+        self.show_figure(worker.name, image)
 
-                    for method, result in self.result[option].items():
-                        time = result['time']
-                        conc = result['ln_conc']
-                        slope = result['slope']
-                        intercept = result['intercept']
-                        r_squared = result['r_squared']
-                        pixmap = rate_const.plot(time, conc, slope, intercept, r_squared)
-                        self.figures[option] = pixmap
+    def on_figure_error(self, worker, message):
+        """
+        Reports a figure that could not be rendered.
 
+        Args:
+            - worker (Worker): The rendering job.
+            - message (str): Error message.
+        """
+        self.render_workers.discard(worker)
+        print(f"Error plotting {worker.name}: {message}")
 
+    def show_figure(self, option, image):
+        """
+        Shows a rendered figure in a new window and keeps it for saving.
 
-                elif option == "3D plane plot":
-                    for method, result in self.result[option].items():
-                        fig = Figure()
-                        ax = fig.add_subplot(111, projection='3d')
-                        pH, logFe, logR, params, r_squared = result
-                        ax.scatter(logFe, pH, logR, c='k', marker='o')
-                        ax.set_xlabel('log(Initial Concentration)')
-                        ax.set_ylabel('pH')
-                        ax.set_zlabel('log(Initial Rate)')
-                        logFe_range = np.linspace(min(logFe), max(logFe), 50)
-                        pH_range = np.linspace(min(pH), max(pH), 50)
-                        logFe_grid, pH_grid = np.meshgrid(logFe_range, pH_range)
-                        logR_fit = params[0] + params[1] * logFe_grid + params[2] * pH_grid
-                        ax.plot_surface(logFe_grid, pH_grid, logR_fit, alpha=0.5)
-                        equation_str = f"logR_0 = {params[1]:.2f}pH + {params[2]:.2f}logX_0 + {params[0]:.2f}"
-                        ax.set_title(equation_str)
-                        ax.text(0.02, 0.98, 0.02, s=f'R^2={r_squared:.2f}', transform=ax.transAxes,
-                                verticalalignment='top')
-                        canvas = FigureCanvas(fig)
-                        canvas.draw()
-                        width, height = fig.get_size_inches() * fig.get_dpi()
-                        buffer = canvas.buffer_rgba()
-                        buf = buffer.tobytes()
-                        image = QImage(buf, width, height, QImage.Format_RGBA8888)
-                        pixmap = QPixmap.fromImage(image)
-                        self.visual_window = VisualWindow(pixmap, self)
-                        self.figures[option] = pixmap
-
-                if pixmap is not None:
-                    self.visual_window = VisualWindow(pixmap, self)
-                    self.visual_window.show()
-                else:
-                    print("Error: No valid data found to plot.")
+        Args:
+            - option (str): Feature the figure belongs to.
+            - image (RenderedImage): The rendered figure.
+        """
+        with tracing.span("to_pixmap", "plot", option=option, width=image.width, height=image.height):
+            pixmap = image.to_pixmap()
+        self.figures[option] = pixmap
+        self.visual_window = VisualWindow(pixmap, self)
+        self.visual_window.show()
 
     def save_result(self):
         """
         Save result functionality of the application.
+
+        The files are written by a background job. Figures are converted to QImages here, on the GUI thread,
+        so the job can encode them in parallel.
         """
         dirname = QFileDialog.getExistingDirectory(self, "Select directory")
-        if dirname:
-            save(self.result, dirname, self.figures)
+        if not dirname:
+            return
+        workbook = self.main_window.settings.save_current_option == SAVE_OPTIONS[1]
+        images = {option: pixmap.toImage() for option, pixmap in self.figures.items()}
+        # The results database is opt-in, see the "Record results in database" save setting
+        store = results_store.default_path() if self.main_window.settings.store_results else None
+        worker = Worker("save", results_save.save, dict(self.result), dirname, images, workbook, False,
+                        store, self.main_window.input_window.filename)
+        worker.signals.finished.connect(lambda name, summary, worker=worker: self.on_save_done(worker, summary))
+        worker.signals.error.connect(lambda name, message, worker=worker: self.on_save_done(worker, None, message))
+        self.save_worker = worker
+        self.save_button.setEnabled(False)
+        self.thread_pool.start(worker)
+
+    def on_save_done(self, worker, summary, message=None):
+        """
+        Reports the end of a background save.
+
+        Args:
+            - worker (Worker): The save job.
+            - summary (dict): Files written and skipped, see save.save. None if the save failed.
+            - message (str, optional): Error message if the save failed. Defaults to None.
+        """
+        if self.save_worker is worker:
+            self.save_worker = None
+            self.save_button.setEnabled(bool(self.result))
+        if summary is None:
+            print(f"Error saving results: {message}")
+            QMessageBox.critical(self, "Error", "The results could not be saved.", QMessageBox.Ok)
+            return
+        print(f"Saved {len(summary['written'])} files, {len(summary['skipped'])} unchanged files skipped.")
+        if summary['run_id'] is not None:
+            print(f"Results added to {results_store.default_path()} as run {summary['run_id']}.")
 
     def update_start_button(self):
         func_option = self.main_window.settings.func_current_option
@@ -375,52 +398,80 @@ class OptionDialog(QDialog):
                 tab = QWidget()
                 self.default0 = QRadioButton("Default")
                 self.default0.setChecked(True)
+                self.weighted_regression = QRadioButton("Weighted least squares")
+                self.york_regression = QRadioButton("York (errors in x and y)")
+                self.order_interval = QRadioButton("Bootstrap confidence interval")
+                sd_help = ("Needs a file with at least four columns: the third and fourth are read as the standard "
+                           "deviations of the initial concentration and the initial rate.")
+                self.weighted_regression.setToolTip(sd_help)
+                self.york_regression.setToolTip(sd_help)
+                sd_label = QLabel("Weighted and York fits read columns 3 and 4 of the file as standard deviations.")
+                sd_label.setWordWrap(True)
 
                 tab_layout = QVBoxLayout()
                 tab_layout.addWidget(self.default0)
+                tab_layout.addWidget(self.weighted_regression)
+                tab_layout.addWidget(self.york_regression)
+                tab_layout.addWidget(self.order_interval)
+                tab_layout.addWidget(sd_label)
                 tab.setLayout(tab_layout)
 
                 self.tabs[feature] = {"widget": tab,
-                                      "options": {"Default": self.default0}}
+                                      "options": {"Default": self.default0,
+                                                  "Weighted least squares": self.weighted_regression,
+                                                  "York (errors in x and y)": self.york_regression,
+                                                  "Bootstrap confidence interval": self.order_interval}}
 
             if feature == "initial rate analysis":
                 tab = QWidget()
                 self.use_specific_threshold = QRadioButton("Use specific threshold")
                 self.use_specific_threshold.setChecked(True)
                 self.dont_use_specific_threshold = QRadioButton("Use a range between 5% to 20%")
+                self.theil_sen = QRadioButton("Theil-Sen (robust, specific threshold)")
+                self.ransac = QRadioButton("RANSAC (robust, specific threshold)")
 
                 tab_layout = QVBoxLayout()
                 tab_layout.addWidget(self.use_specific_threshold)
                 tab_layout.addWidget(self.dont_use_specific_threshold)
+                tab_layout.addWidget(self.theil_sen)
+                tab_layout.addWidget(self.ransac)
                 tab.setLayout(tab_layout)
 
                 self.tabs[feature] = {"widget": tab,
                                       "options": {"Use specific threshold": self.use_specific_threshold,
-                                                  "Use a range between 5% to 20%": self.dont_use_specific_threshold}}
+                                                  "Use a range between 5% to 20%": self.dont_use_specific_threshold,
+                                                  "Theil-Sen (robust, specific threshold)": self.theil_sen,
+                                                  "RANSAC (robust, specific threshold)": self.ransac}}
 
             if feature == "rate const analysis":
                 tab = QWidget()
                 self.default1 = QRadioButton("Default")
                 self.default1.setChecked(True)
+                self.rate_const_interval = QRadioButton("Bootstrap confidence interval")
 
                 tab_layout = QVBoxLayout()
                 tab_layout.addWidget(self.default1)
+                tab_layout.addWidget(self.rate_const_interval)
                 tab.setLayout(tab_layout)
 
                 self.tabs[feature] = {"widget": tab,
-                                      "options": {"Default": self.default1}}
+                                      "options": {"Default": self.default1,
+                                                  "Bootstrap confidence interval": self.rate_const_interval}}
 
             if feature == "3D plane plot":
                 tab = QWidget()
                 self.default2 = QRadioButton("Default")
                 self.default2.setChecked(True)
+                self.monte_carlo = QRadioButton("Monte Carlo uncertainty")
 
                 tab_layout = QVBoxLayout()
                 tab_layout.addWidget(self.default2)
+                tab_layout.addWidget(self.monte_carlo)
                 tab.setLayout(tab_layout)
 
                 self.tabs[feature] = {"widget": tab,
-                                      "options": {"Default": self.default2}}
+                                      "options": {"Default": self.default2,
+                                                  "Monte Carlo uncertainty": self.monte_carlo}}
 
         for feature, tab in self.tabs.items():
             self.tab_widget.addTab(tab["widget"], feature)
@@ -0,0 +1,98 @@
+"""
+figures.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Figures behind the "Visualisation" button.
+The figures are built as plain matplotlib Figures and rendered with Agg, so ButtonArea can draw them on
+worker threads and cache the rendered images by content.
+"""
+
+from ..utils import tracing
+from ..utils.hashing import content_key
+from ..utils.registry import lazy_module
+
+# Imported on first use, see utils.registry
+regression_analysis = lazy_module("regression_analysis")
+initial_rate = lazy_module("initial_rate")
+rate_const = lazy_module("rate_const")
+plane3D_plot = lazy_module("plane3D_plot")
+render = lazy_module("render")
+
+
+def build_figure(option, result):
+    """
+    Builds the figure of one feature's result.
+
+    Args:
+        - option (str): Feature name.
+        - result (dict): Entry of ButtonArea.result for the feature, keyed by method.
+
+    Returns:
+        matplotlib.figure.Figure or None if there is nothing to plot.
+    """
+    fig = None
+    for method, method_result in result.items():
+        if option == "reaction order analysis":
+            fig = regression_analysis.regression_figure(*method_result[:5], label=method, color='blue',
+                                                        standard_errors=method_result[5:7] or None)
+
+        elif option == "initial rate analysis":
+            time = method_result['time']
+            conc = method_result['conc']
+            if method == "Use a range between 5% to 20%":
+                fig = initial_rate.rate_comparison_figure(time, conc, method_result['slopes'],
+                                                          method_result['intercepts'],
+                                                          method_result['r_squared_values'])
+            else:
+                fig = initial_rate.initial_rate_figure(time, conc, method_result['slope'],
+                                                       method_result['intercept'], method_result['r_squared'])
+
+        elif option == "rate const analysis":
+            fig = rate_const.rate_const_figure(method_result['time'], method_result['ln_conc'],
+                                               method_result['slope'], method_result['intercept'],
+                                               method_result['r_squared'])
+
+        elif option == "3D plane plot":
+            fig = plane3D_plot.plane_figure(*method_result)
+    return fig
+
+
+def figure_key(option, result):
+    """
+    Builds the render cache key of a feature's figure from its result data.
+
+    Args:
+        - option (str): Feature name.
+        - result (dict): Entry of ButtonArea.result for the feature.
+
+    Returns:
+        str: Content hash of the figure.
+    """
+    return content_key(option, result)
+
+
+def render_job(option, result, job=None):
+    """
+    Builds and renders the figure of one feature. Runs on a worker thread.
+
+    Args:
+        - option (str): Feature name.
+        - result (dict): Entry of ButtonArea.result for the feature.
+        - job (Worker, optional): Background job used to report progress. Defaults to None.
+
+    Returns:
+        RenderedImage or None if there is nothing to plot.
+    """
+    if job is not None:
+        job.report(0)
+    with tracing.span("build_figure", "plot", option=option):
+        fig = build_figure(option, result)
+    if fig is None:
+        return None
+    if job is not None:
+        job.report(50)
+    with tracing.span("agg_draw", "plot", option=option):
+        return render.render_figure(fig)
@@ -3,16 +3,13 @@ input_window.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-06-27
-Modified: 2023-08-14
+Modified: 2026-10-18
 """
 from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGroupBox, QPushButton, QFileDialog, QLabel, QDialog
 
 from ..utils.input_help import DataInputDialog
-from ..utils import regression_analysis
-from ..utils import initial_rate
-from ..utils import rate_const
-from ..utils import plane3D_plot
+from ..utils import registry, tracing
 
 
 class InputWindow(QWidget):
@@ -39,12 +36,10 @@ class InputWindow(QWidget):
 
         layout = QVBoxLayout()
 
-        self.plane3D_plotter = plane3D_plot.Plane3DPlotter()
+        # The analysis modules are imported by the registry when a file is first read
         self.data_readers = {
-            "reaction order analysis": regression_analysis.read_data,
-            "initial rate analysis": initial_rate.read_data,
-            "rate const analysis": rate_const.read_data,
-            "3D plane plot": self.plane3D_plotter.read_data,
+            option: (lambda filename, option=option: registry.read_data(option, filename))
+            for option in registry.ANALYSIS_MODULES
         }
 
         self.manual_input_group = QGroupBox("Manual Input")
@@ -92,6 +87,9 @@ class InputWindow(QWidget):
         dialog = DataInputDialog(self)
         if dialog.exec_() == QDialog.Accepted:
             user_input_data = dialog.input_data
+            # Typed-in data has no source file; keep an earlier file out of the results store
+            self.filename = None
+            self.file_path_label.clear()
             selected_functions = [func for func, selected in self.main_window.settings.func_current_options.items() if
                                   selected]
             for func in self.data_readers.keys():
@@ -108,15 +106,17 @@ class InputWindow(QWidget):
         """
         file_path, _ = QFileDialog.getOpenFileName()
         if file_path:
-            self.filename = file_path
-            self.file_path_label.setText(file_path)
-            for func_option, selected in self.main_window.settings.func_current_options.items():
-                if selected:
-                    data_reader = self.data_readers.get(func_option)
-                    if data_reader is not None:
-                        self.data[func_option] = data_reader(file_path)
-                        self.emit_input_changed()
-            self.main_window.button_area.update_start_button()
+            with tracing.span("browse_file", "io", file=file_path):
+                self.filename = file_path
+                self.file_path_label.setText(file_path)
+                for func_option, selected in self.main_window.settings.func_current_options.items():
+                    if selected:
+                        data_reader = self.data_readers.get(func_option)
+                        if data_reader is not None:
+                            with tracing.span("read_data", "io", option=func_option):
+                                self.data[func_option] = data_reader(file_path)
+                            self.emit_input_changed()
+                self.main_window.button_area.update_start_button()
 
     def emit_input_changed(self):
         """
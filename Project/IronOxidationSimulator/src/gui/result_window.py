@@ -3,12 +3,31 @@ result_window.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-06-28
-Modified: 2023-08-14
+Modified: 2026-10-18
 """
 
 from PyQt5.QtWidgets import QMainWindow, QTabWidget, QWidget, QVBoxLayout, QTextEdit
 
 
+def _interval_text(name, interval):
+    """
+    Formats a confidence interval from bootstrap.confidence_interval.
+
+    Args:
+        - name (str): Name of the slope, e.g. "Rate constant".
+        - interval (dict): The interval result.
+
+    Returns:
+        str: The slope interval with its standard error and the method used.
+    """
+    low, high = interval['slope_ci']
+    method = interval['method']
+    if method == "bootstrap":
+        method = f"bootstrap, {interval['n_resamples']} resamples"
+    return (f"{name} {interval['confidence']:.0%} CI: {low} to {high} ({method})\n"
+            f"{name} standard error: {interval['slope_se']}")
+
+
 class ResultWindow(QMainWindow):
     """
     A QMainWindow class that represents the result window for displaying analysis results.
@@ -50,14 +69,22 @@ class ResultWindow(QMainWindow):
                 f"R Squared: {r_squared}"
             )
         elif feature_name == "Reaction Order Analysis":
-            initial_concentration, initial_rate, slope, intercept, r_squared = result
+            initial_concentration, initial_rate, slope, intercept, r_squared = result[:5]
             result_str = (
                 f"Log Initial concentration: {initial_concentration}\n"
                 f"Log Initial rate: {initial_rate}\n"
-                f"Standard error of the initial rate: {slope}\n"
-                f"Standard error of the initial conc: {intercept}\n"
-                f"R Squared: {r_squared}"
+                f"Reaction order (slope): {slope}\n"
+                f"Intercept: {intercept}\n"
             )
+            if len(result) >= 7:
+                se_slope, se_intercept = result[5:7]
+                result_str += (
+                    f"Standard error of the slope: {se_slope}\n"
+                    f"Standard error of the intercept: {se_intercept}\n"
+                )
+            result_str += f"R Squared: {r_squared}"
+            if len(result) > 7:
+                result_str += "\n" + _interval_text("Reaction order", result[7])
         elif feature_name == "Rate Const Analysis":
             slope, intercept, r_squared = result['slope'], result['intercept'], result['r_squared']
             result_str = (
@@ -65,13 +92,21 @@ class ResultWindow(QMainWindow):
                 f"Intercept: {intercept}\n"
                 f"R Squared: {r_squared}"
             )
+            if 'interval' in result:
+                result_str += "\n" + _interval_text("Rate constant", result['interval'])
         elif feature_name == "3D Plane Plot":
-            pH, logFe, logR, params, r_squared = result
+            pH, logFe, logR, params, r_squared = result[:5]
             equation_str = f"logR_0 = {params[1]:.2f}pH + {params[2]:.2f}logX_0 + {params[0]:.2f}"
             result_str = (
                 f"Equation: {equation_str}\n"
                 f"R Squared: {r_squared:.2f}"
             )
+            if len(result) > 5:
+                uncertainty = result[5]
+                names = ("Intercept", "logX_0 coefficient", "pH coefficient")
+                for name, mean, std, (low, high) in zip(names, uncertainty['mean'], uncertainty['std'],
+                                                        uncertainty['ci']):
+                    result_str += f"\n{name}: {mean:.3f} ± {std:.3f} (95% CI {low:.3f} to {high:.3f})"
         else:
             result_str = "Invalid feature name or result format"
 
@@ -0,0 +1,101 @@
+"""
+workers.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Background jobs for the GUI.
+Each job runs on a QThreadPool thread, reports progress through Qt signals and can be cancelled
+cooperatively: the job checks for cancellation every time it reports progress.
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from ..utils import tracing
+
+
+class Cancelled(Exception):
+    """Raised inside a job when it has been asked to stop."""
+
+
+class WorkerSignals(QObject):
+    """
+    Signals emitted by a Worker. They are delivered to the GUI thread by Qt.
+
+    Attributes:
+        - progress (pyqtSignal): Name of the job and its progress in percent.
+        - finished (pyqtSignal): Name of the job and its result.
+        - error (pyqtSignal): Name of the job and the error message.
+        - cancelled (pyqtSignal): Name of the job.
+    """
+    progress = pyqtSignal(str, int)
+    finished = pyqtSignal(str, object)
+    error = pyqtSignal(str, str)
+    cancelled = pyqtSignal(str)
+
+
+class Worker(QRunnable):
+    """
+    A QRunnable that calls function(*args, job=worker) on a pool thread.
+
+    The function reports progress with job.report(percent), which raises Cancelled once cancel() was called.
+
+    Attributes:
+        - name (str): Name of the job, passed along with every signal.
+        - signals (WorkerSignals): Signals used to report back to the GUI thread.
+    """
+
+    def __init__(self, name, function, *args):
+        """
+        Initializes the Worker.
+
+        Args:
+            - name (str): Name of the job, e.g. the analysis option.
+            - function (callable): Function to run. It must accept a 'job' keyword argument.
+            - *args: Positional arguments for the function.
+        """
+        super().__init__()
+        self.name = name
+        self.function = function
+        self.args = args
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Asks the job to stop at its next progress report."""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        """Returns True if the job has been asked to stop."""
+        return self._cancel_event.is_set()
+
+    def report(self, percent):
+        """
+        Reports progress from inside the job.
+
+        Args:
+            - percent (int): Progress of the job, from 0 to 100.
+
+        Raises:
+            Cancelled: If the job has been asked to stop.
+        """
+        if self.is_cancelled():
+            raise Cancelled()
+        self.signals.progress.emit(self.name, int(percent))
+
+    def run(self):
+        """Runs the job and emits finished, error or cancelled."""
+        try:
+            with tracing.span(self.function.__name__, "job", job=self.name):
+                result = self.function(*self.args, job=self)
+        except Cancelled:
+            self.signals.cancelled.emit(self.name)
+        except Exception as e:
+            self.signals.error.emit(self.name, str(e))
+        else:
+            if self.is_cancelled():
+                self.signals.cancelled.emit(self.name)
+            else:
+                self.signals.finished.emit(self.name, result)
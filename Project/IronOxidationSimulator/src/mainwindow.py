@@ -3,7 +3,7 @@ mainwindow.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-06-25
-Modified: 2023-08-14
+Modified: 2026-10-18
 
 Main window for the application.
 This module provides the main application window for the PyQt5-based GUI application.
@@ -17,6 +17,7 @@ import sys
 from src.gui.settings_window import SettingsWindow
 from src.gui.input_window import InputWindow
 from src.gui.button_area import ButtonArea
+from src.utils import tracing
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QUrl
 from PyQt5.QtGui import QDesktopServices
@@ -54,6 +55,12 @@ class MainWindow(QMainWindow):
         self.save_menu = self.menu.addMenu("Save settings")
         self.save_menu.addAction("Yes", self.select_option7)
         self.save_menu.addAction("No", self.select_option8)
+        self.save_menu.addAction("Yes, as one workbook", self.select_option9)
+        self.save_menu.addSeparator()
+        self.store_action = QAction("Record results in database", self, checkable=True)
+        self.store_action.setChecked(self.settings.store_results)
+        self.store_action.toggled.connect(self.settings.set_store_results)
+        self.save_menu.addAction(self.store_action)
 
 
         self.help_menu = self.menu.addMenu("Contact with developer")
@@ -119,6 +126,9 @@ class MainWindow(QMainWindow):
     def select_option8(self):
         self.settings.set_save_option("No")
 
+    def select_option9(self):
+        self.settings.set_save_option("Yes, as one workbook")
+
 
     def open_contact(self):
         """Opens the appropriate contact method based on the menu selection."""
@@ -156,6 +166,7 @@ class Settings(QObject):
 
         Attributes:
             - func_current_options (dict): Current functional options selected.
+            - store_results (bool): Whether saving also records the results in the results database.
     """
     settings_changed = pyqtSignal()
 
@@ -170,6 +181,8 @@ class Settings(QObject):
         self.func_current_option = "None"
         self.input_current_option = "None"
         self.save_current_option = "No"
+        # Off unless a database is named (results_store.DB_ENV, not imported here to keep startup light)
+        self.store_results = bool(os.environ.get("IRON_OXIDATION_DB"))
 
     def set_func_option(self, option):
         """Sets the current function option."""
@@ -186,6 +199,11 @@ class Settings(QObject):
         self.save_current_option = option
         self.settings_changed.emit()
 
+    def set_store_results(self, enabled):
+        """Sets whether saving also records the results in the results database."""
+        self.store_results = bool(enabled)
+        self.settings_changed.emit()
+
     def reset(self):
         """Resets the settings to default values."""
         self.save_current_option = "No"
@@ -211,6 +229,8 @@ def resource_path(relative_path):
 
 
 if __name__ == "__main__":
+    # IRON_OXIDATION_TRACE=trace.json records the time of every stage, see utils.tracing
+    tracing.enable_from_environment()
     with open(resource_path("ui/style.qss"), encoding="utf-8") as f:
         qss = f.read()
 
@@ -0,0 +1,252 @@
+"""
+batch.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Headless batch processing of many data files.
+Each file is read with the existing read_data functions and analysed with the existing calculate functions;
+files are spread across a process pool and the results are collected into one table.
+"""
+
+import glob
+import os
+import time as timer
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from . import bootstrap, regression_analysis, initial_rate, rate_const
+from .results_store import file_ph
+from .plane3D_plot import Plane3DPlotter
+
+ANALYSES = ["reaction order analysis", "initial rate analysis", "rate const analysis", "3D plane plot"]
+DATA_EXTENSIONS = (".xlsx", ".xls", ".csv")
+RESULT_COLUMNS = ["file", "analysis", "method", "slope", "intercept", "r_squared", "se_slope", "se_intercept",
+                  "slope_ci_low", "slope_ci_high", "ph_coefficient", "ph", "fe0", "seconds", "error"]
+
+
+def collect_files(inputs):
+    """
+    Expands directories and glob patterns into a sorted list of data files.
+
+    Args:
+        - inputs (list of str): Directories, glob patterns or file paths.
+
+    Returns:
+        list: Paths of all .xlsx/.xls/.csv files found, without duplicates.
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item)
+        for path in candidates:
+            # Skip the lock files Excel leaves next to open workbooks
+            if os.path.basename(path).startswith("~$"):
+                continue
+            if os.path.isfile(path) and path.lower().endswith(DATA_EXTENSIONS):
+                files.append(os.path.abspath(path))
+    return sorted(set(files))
+
+
+def _row(filename, analysis, method, slope=np.nan, intercept=np.nan, r_squared=np.nan, ph_coefficient=np.nan,
+         se_slope=np.nan, se_intercept=np.nan, fe0=np.nan, slope_ci=(np.nan, np.nan)):
+    """Builds one row of the consolidated result table."""
+    return {
+        "file": filename,
+        "analysis": analysis,
+        "method": method,
+        "slope": slope,
+        "intercept": intercept,
+        "r_squared": r_squared,
+        "se_slope": se_slope,
+        "se_intercept": se_intercept,
+        "slope_ci_low": slope_ci[0],
+        "slope_ci_high": slope_ci[1],
+        "ph_coefficient": ph_coefficient,
+        "ph": np.nan,
+        "fe0": fe0,
+        "seconds": np.nan,
+        "error": "",
+    }
+
+
+def _slope_ci(interval, function, *data):
+    """Confidence interval of the slope with the given method (see bootstrap.confidence_interval), or nan."""
+    if interval is None:
+        return np.nan, np.nan
+    return function(*data, interval, n_resamples=bootstrap.INTERVAL_RESAMPLES, seed=0)['slope_ci']
+
+
+def analyse_file(filename, analyses, threshold=None, estimator="ols", interval=None):
+    """
+    Runs the selected analyses on one file.
+
+    This is the unit of work submitted to the process pool, so it only takes picklable arguments.
+
+    Args:
+        - filename (str): Path to the data file.
+        - analyses (list of str): Analyses to run, see ANALYSES.
+        - threshold (float, optional): Threshold for the initial rate analysis.
+          If None, the 5% to 20% threshold range is compared instead. Defaults to None.
+        - estimator (str, optional): Line fit of the initial rate analysis, see initial_rate.ESTIMATORS.
+          Defaults to "ols".
+        - interval (str, optional): Method of the confidence interval of the default reaction order and
+          rate constant fits, "bootstrap", "jackknife" or "auto" (see bootstrap.confidence_interval).
+          Defaults to None, no interval.
+
+    Returns:
+        tuple: List of result rows and the wall time spent on the file in seconds.
+    """
+    start = timer.perf_counter()
+    rows = []
+    for analysis in analyses:
+        try:
+            if analysis == "reaction order analysis":
+                data = regression_analysis.read_data(filename)
+                if data is None:
+                    raise ValueError("could not read file")
+                log_x, log_y = regression_analysis.calculate_log_values(*data[:2])
+                slope, intercept, r_squared = regression_analysis.calculate_regression(log_x, log_y)
+                se_slope, se_intercept = regression_analysis.weighted_regression(log_x, log_y)[3:]
+                rows.append(_row(filename, analysis, "Default", slope, intercept, r_squared,
+                                 se_slope=se_slope, se_intercept=se_intercept,
+                                 slope_ci=_slope_ci(interval, bootstrap.reaction_order_interval, *data[:2])))
+                if len(data) == 4:
+                    # The file has standard deviations, so report the weighted fits as well
+                    log_x_sd = regression_analysis.calculate_log_errors(data[0], data[2])
+                    log_y_sd = regression_analysis.calculate_log_errors(data[1], data[3])
+                    for method, regression in (("Weighted least squares", regression_analysis.weighted_regression),
+                                               ("York", regression_analysis.york_regression)):
+                        slope, intercept, r_squared, se_slope, se_intercept = regression(log_x, log_y,
+                                                                                         log_x_sd, log_y_sd)
+                        rows.append(_row(filename, analysis, method, slope, intercept, r_squared,
+                                         se_slope=se_slope, se_intercept=se_intercept))
+
+            elif analysis == "initial rate analysis":
+                data = initial_rate.read_data(filename)
+                if data is None:
+                    raise ValueError("could not read file")
+                time, conc = data
+                fe0 = conc[0] if len(conc) else np.nan
+                if estimator != "ols":
+                    # Robust fits have no closed-form threshold sweep, so every threshold is fitted
+                    thresholds = np.arange(0.05, 0.2, 0.01) if threshold is None else [threshold]
+                    for value in thresholds:
+                        result = initial_rate.calculate_rate(time, conc, value, estimator)
+                        rows.append(_row(filename, analysis, f"Threshold {value:.2f} ({estimator})",
+                                         result['slope'], result['intercept'], result['r_squared'], fe0=fe0))
+                elif threshold is not None:
+                    result = initial_rate.calculate_rate(time, conc, threshold)
+                    rows.append(_row(filename, analysis, f"Threshold {threshold:.2f}", result['slope'],
+                                     result['intercept'], result['r_squared'], fe0=fe0))
+                else:
+                    result = initial_rate.calculate_rate_compare(time, conc)
+                    threshold_array = np.arange(0.05, 0.2, 0.01)
+                    for i, value in enumerate(threshold_array):
+                        rows.append(_row(filename, analysis, f"Threshold {value:.2f}", result['slopes'][i],
+                                         result['intercepts'][i], result['r_squared_values'][i], fe0=fe0))
+
+            elif analysis == "rate const analysis":
+                data = rate_const.read_data(filename)
+                if data is None:
+                    raise ValueError("could not read file")
+                result = rate_const.calculate_rate(*data)
+                rows.append(_row(filename, analysis, "Default", result['slope'], result['intercept'],
+                                 result['r_squared'], fe0=data[1][0] if len(data[1]) else np.nan,
+                                 slope_ci=_slope_ci(interval, bootstrap.rate_const_interval, *data)))
+
+            elif analysis == "3D plane plot":
+                plane_plotter = Plane3DPlotter(filename)
+                if plane_plotter.data is None:
+                    raise ValueError("could not read file")
+                params, r_squared = plane_plotter.perform_analysis()
+                rows.append(_row(filename, analysis, "Default", params[1], params[0], r_squared, params[2]))
+
+            else:
+                raise ValueError(f"unknown analysis '{analysis}'")
+        except Exception as e:
+            row = _row(filename, analysis, "")
+            row["error"] = str(e)
+            rows.append(row)
+
+    ph = file_ph(filename)
+    elapsed = timer.perf_counter() - start
+    for row in rows:
+        row["ph"] = np.nan if ph is None else ph
+        row["seconds"] = elapsed
+    return rows, elapsed
+
+
+def run_batch(files, analyses, workers=None, threshold=None, report=print, estimator="ols", interval=None):
+    """
+    Analyses many files in parallel and collects the results into a single table.
+
+    Args:
+        - files (list of str): Paths of the data files.
+        - analyses (list of str): Analyses to run on every file.
+        - workers (int, optional): Number of worker processes. 1 runs everything in this process.
+          Defaults to the number of CPUs.
+        - threshold (float, optional): Threshold for the initial rate analysis. Defaults to None.
+        - report (callable, optional): Called with one progress line per file. Defaults to print.
+        - estimator (str, optional): Line fit of the initial rate analysis. Defaults to "ols".
+        - interval (str, optional): Confidence interval method, see analyse_file. Defaults to None.
+
+    Returns:
+        tuple: pandas.DataFrame with one row per file, analysis and method, and a summary dictionary
+        with the number of files, total wall time and throughput in files per second.
+    """
+    start = timer.perf_counter()
+    rows = []
+
+    if workers == 1:
+        for filename in files:
+            file_rows, elapsed = analyse_file(filename, analyses, threshold, estimator, interval)
+            rows.extend(file_rows)
+            report(f"{os.path.basename(filename)}: {elapsed:.3f} s")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(analyse_file, filename, analyses, threshold, estimator, interval): filename
+                       for filename in files}
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    file_rows, elapsed = future.result()
+                except Exception as e:
+                    row = _row(filename, "", "")
+                    row["error"] = str(e)
+                    file_rows, elapsed = [row], np.nan
+                rows.extend(file_rows)
+                report(f"{os.path.basename(filename)}: {elapsed:.3f} s")
+
+    total = timer.perf_counter() - start
+    table = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    # as_completed returns files in finishing order; sort so the table is reproducible
+    table = table.sort_values(["file", "analysis"], kind="stable").reset_index(drop=True)
+    summary = {
+        "files": len(files),
+        "seconds": total,
+        "files_per_second": len(files) / total if total > 0 else np.nan,
+    }
+    return table, summary
+
+
+def write_table(table, path):
+    """
+    Writes the consolidated result table to CSV or Excel, depending on the file extension.
+    Other extensions are written as CSV; .xls raises a ValueError, as pandas can no longer write it.
+
+    Args:
+        - table (pandas.DataFrame): Result table from run_batch.
+        - path (str): Output path ending in .csv or .xlsx.
+    """
+    if path.lower().endswith(".xls"):
+        raise ValueError(f"cannot write {path}: the legacy .xls format is not supported, use .xlsx or .csv")
+    if path.lower().endswith(".xlsx"):
+        table.to_excel(path, index=False)
+    else:
+        table.to_csv(path, index=False)
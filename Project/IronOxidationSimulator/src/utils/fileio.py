@@ -0,0 +1,82 @@
+"""
+fileio.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Atomic file writes shared by the exports (save) and the memo store (memo).
+A file is written to a temporary file in the same directory that then replaces the target, so an
+interrupted write never leaves a half-written file behind, and it gets the permissions the target would
+have had if written in place.
+"""
+
+import os
+import stat
+import tempfile
+import threading
+
+# Permissions of a new file, see _new_file_mode
+_NEW_FILE_MODE = None
+
+
+def _new_file_mode(directory):
+    """
+    Returns the permissions a newly created file gets (0666 less the umask).
+
+    os.umask can only be read by setting it, which would change it for every thread of the process, so the
+    mode is read once from a probe file created in directory instead.
+    """
+    global _NEW_FILE_MODE
+    if _NEW_FILE_MODE is None:
+        probe = os.path.join(directory, f".mode-{os.getpid()}-{threading.get_ident()}.part")
+        handle = os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            _NEW_FILE_MODE = stat.S_IMODE(os.fstat(handle).st_mode)
+        finally:
+            os.close(handle)
+            os.remove(probe)
+    return _NEW_FILE_MODE
+
+
+def file_mode(path):
+    """
+    Returns the permissions a file written to path should get: those of the file it replaces, or the
+    default for a new file (0666 less the umask), rather than the owner-only mode of mkstemp.
+
+    Args:
+        - path (str): Target file.
+
+    Returns:
+        int: Permission bits.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return _new_file_mode(os.path.dirname(os.path.abspath(path)))
+
+
+def atomic_write(path, write, mode="w"):
+    """
+    Writes a file through a temporary file in the same directory that then replaces path.
+
+    Args:
+        - path (str): Target file.
+        - write (callable): Called with the open temporary file, or with its path if mode is None.
+        - mode (str, optional): Mode to open the temporary file with. Defaults to "w".
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    try:
+        if mode is None:
+            os.close(handle)
+            write(temporary)
+        else:
+            with os.fdopen(handle, mode, newline="" if "b" not in mode else None) as file:
+                write(file)
+        os.chmod(temporary, file_mode(path))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
@@ -0,0 +1,215 @@
+"""
+global_fit.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Global fit of the Fe(II) oxidation rate law over a whole campaign of experiments.
+Instead of fitting every trace on its own and regressing the derived rates against pH and log concentration
+(Plane3DPlotter.fit_plane), all raw traces are fitted at once with shared parameters k, a, b and c of
+    -d[Fe(II)]/dt = k [Fe(II)]^a [O2]^b [OH-]^c
+and one nuisance parameter, [Fe]0, per experiment. The model of each trace is the closed-form solution of
+rate_law.
+
+The Jacobian has an arrow shape: dense columns for the four shared parameters and a single column per
+experiment that is non-zero only on that experiment's points. The normal equations are therefore never
+built densely; the nuisance block is diagonal and is eliminated with its Schur complement, leaving a 4x4
+system per iteration. Cost and memory grow linearly with the number of points and experiments.
+"""
+
+import numpy as np
+
+from .rate_law import fit_rate_law, ln_hydroxide, log_concentration_jacobian
+from .trace_batch import TraceBatch
+
+GLOBAL_PARAMETERS = ["k", "order_fe", "order_o2", "order_oh"]
+
+
+def _segment_sum(ids, values, n):
+    """Sum of values per experiment."""
+    return np.bincount(ids, weights=values, minlength=n)
+
+
+def _evaluate(t, ln_conc, ids, theta, ln_fe0, covariates):
+    """
+    Residuals and Jacobian of all points.
+
+    theta holds (lnk', a, b, c), where lnk' is ln k at the mean ln[O2] and ln[OH-] of the campaign, and
+    covariates holds the centred ln[O2] and ln[OH-] of every experiment.
+    """
+    ln_o2, ln_oh = covariates
+    ln_k = theta[0] + theta[2] * ln_o2 + theta[3] * ln_oh
+    s = 1.0 - theta[1]
+    value, d_fe0, d_k, d_s = log_concentration_jacobian(t, ln_fe0[ids], ln_k[ids], s)
+    residual = value - ln_conc
+    shared = np.column_stack((d_k, -d_s, d_k * ln_o2[ids], d_k * ln_oh[ids]))
+    return residual, shared, d_fe0
+
+
+def _schur_step(ids, n, residual, shared, local, free, damping):
+    """
+    Solves the damped normal equations of the arrow-shaped Jacobian for one Levenberg-Marquardt step.
+
+    Returns:
+        tuple: Steps of the shared parameters and of the per-experiment ln[Fe]0, and the Schur complement.
+    """
+    p = shared.shape[1]
+    shared = shared * free
+    a = shared.T @ shared
+    g = shared.T @ residual
+    b = np.column_stack([_segment_sum(ids, shared[:, i] * local, n) for i in range(p)])
+    d = _segment_sum(ids, local * local, n)
+    h = _segment_sum(ids, local * residual, n)
+
+    # Marquardt damping on the diagonal, identity rows for fixed parameters
+    a[np.diag_indices(p)] *= 1 + damping
+    a[np.diag_indices(p)] += ~free
+    d = d * (1 + damping) + (d == 0)
+
+    schur = a - (b / d[:, None]).T @ b
+    rhs = g - (b / d[:, None]).T @ h
+    delta_shared = -np.linalg.solve(schur, rhs) * free
+    delta_local = -(h + b @ delta_shared) / d
+    return delta_shared, delta_local, schur
+
+
+def global_fit(batch, pH, o2=None, fixed=None, max_iter=100, tol=1e-10):
+    """
+    Fits the shared rate law and per-experiment initial concentrations to every trace of a campaign.
+
+    Orders that the campaign cannot identify are held fixed: the order in O2 when all experiments have the
+    same (or no) O2 concentration, and the order in OH- when all have the same pH. Fixed orders default to
+    a = 1, b = 1 and c = 2 and can be set with the fixed argument.
+
+    Args:
+        - batch (TraceBatch): Fe(II) traces, one per experiment.
+        - pH (float or array): pH of every experiment.
+        - o2 (float or array, optional): O2 concentration of every experiment (mol/L). Defaults to None.
+        - fixed (dict, optional): Orders to hold fixed, e.g. {"order_fe": 1.0}. Defaults to None.
+        - max_iter (int, optional): Maximum number of Levenberg-Marquardt iterations. Defaults to 100.
+        - tol (float, optional): Relative cost decrease at which the fit stops. Defaults to 1e-10.
+
+    Returns:
+        dict: "k", "order_fe", "order_o2", "order_oh" with standard errors under the same names plus "_se",
+        "fixed" (names of the fixed parameters), per-experiment "trace", "fe0" and "fe0_se", and
+        "r_squared" of ln[Fe], "n_points", "iterations" and "converged".
+    """
+    n = len(batch)
+    fixed = dict(fixed or {})
+    for name in fixed:
+        if name not in GLOBAL_PARAMETERS[1:]:
+            raise ValueError(f"unknown order '{name}'")
+
+    pH = np.broadcast_to(np.asarray(pH, dtype=float), (n,))
+    ln_oh = ln_hydroxide(pH)
+    if o2 is None:
+        ln_o2 = np.zeros(n)
+        fixed.setdefault("order_o2", 1.0)
+    else:
+        ln_o2 = np.log(np.broadcast_to(np.asarray(o2, dtype=float), (n,)))
+    if np.ptp(ln_o2) == 0:
+        fixed.setdefault("order_o2", 1.0)
+    if np.ptp(ln_oh) == 0:
+        fixed.setdefault("order_oh", 2.0)
+
+    # Centring the covariates decorrelates ln k from the orders in O2 and OH-
+    mean_o2, mean_oh = ln_o2.mean(), ln_oh.mean()
+    covariates = (ln_o2 - mean_o2, ln_oh - mean_oh)
+
+    ids = batch.trace_ids()
+    valid = np.isfinite(batch.conc) & (batch.conc > 0)
+    if not np.all(valid):
+        counts = np.bincount(ids[valid], minlength=n)
+        batch = TraceBatch(batch.time[valid], batch.conc[valid], np.concatenate(([0], np.cumsum(counts))),
+                           batch.labels)
+        ids = batch.trace_ids()
+    t = batch.time - batch.first(batch.time)[ids]
+    ln_conc = np.log(batch.conc)
+
+    # Starting values: first-order fit of every trace, then a regression of its ln K on the covariates
+    start = fit_rate_law(batch, order=fixed.get("order_fe", 1.0))
+    ln_fe0 = np.log(start['fe0'])
+    free = np.array([True] + [name not in fixed for name in GLOBAL_PARAMETERS[1:]])
+    theta = np.array([0.0, fixed.get("order_fe", 1.0), fixed.get("order_o2", 1.0), fixed.get("order_oh", 2.0)])
+    design = np.column_stack((np.ones(n), covariates[0], covariates[1]))[:, [True, free[2], free[3]]]
+    # Traces without decay (or whose K underflows) have K = 0 and no ln K; they are left out of the regression
+    k_eff = np.asarray(start['k_eff'], dtype=float)
+    usable = np.isfinite(k_eff) & (k_eff > 0)
+    if not usable.any():
+        k_eff, usable = np.full(n, np.finfo(float).tiny), np.ones(n, dtype=bool)
+    target = np.log(k_eff[usable]) - (~free[2]) * theta[2] * covariates[0][usable] \
+        - (~free[3]) * theta[3] * covariates[1][usable]
+    coefficients = np.linalg.lstsq(design[usable], target, rcond=None)[0]
+    theta[[True, False, free[2], free[3]]] = coefficients
+
+    residual, shared, local = _evaluate(t, ln_conc, ids, theta, ln_fe0, covariates)
+    cost = residual @ residual
+    damping = 1e-3
+    converged = False
+    for iteration in range(1, max_iter + 1):
+        try:
+            delta_shared, delta_local, _ = _schur_step(ids, n, residual, shared, local, free, damping)
+        except np.linalg.LinAlgError:
+            # No trace constrains the shared parameters, e.g. none of them decays
+            converged = False
+            break
+        trial_theta, trial_fe0 = theta + delta_shared, ln_fe0 + delta_local
+        trial = _evaluate(t, ln_conc, ids, trial_theta, trial_fe0, covariates)
+        trial_cost = trial[0] @ trial[0]
+        if np.isfinite(trial_cost) and trial_cost <= cost:
+            converged = cost - trial_cost <= tol * cost
+            theta, ln_fe0, cost = trial_theta, trial_fe0, trial_cost
+            residual, shared, local = trial
+            damping /= 10
+            if converged:
+                break
+        else:
+            damping *= 10
+            if damping > 1e12:
+                converged = True
+                break
+
+    # Covariances: the shared block is the inverse Schur complement of the undamped normal equations
+    dof = max(t.size - free.sum() - n, 1)
+    sigma2 = cost / dof
+    try:
+        _, _, schur = _schur_step(ids, n, residual, shared, local, free, 0.0)
+        covariance = np.linalg.inv(schur) * sigma2 * np.outer(free, free)
+    except np.linalg.LinAlgError:
+        covariance = np.full((4, 4), np.nan)
+    # A fit that ends on non-finite values has not converged, whatever stopped the iterations
+    if not (np.all(np.isfinite(theta)) and np.all(np.isfinite(ln_fe0)) and np.all(np.isfinite(covariance))):
+        converged = False
+    b = np.column_stack([_segment_sum(ids, shared[:, i] * free[i] * local, n) for i in range(4)])
+    d = _segment_sum(ids, local * local, n)
+    bd = b / d[:, None]
+    var_fe0 = sigma2 / d + np.einsum('ei,ij,ej->e', bd, covariance, bd)
+
+    # Back to ln k at ln[O2] = ln[OH-] = 0
+    gradient = np.array([1.0, 0.0, -mean_o2, -mean_oh])
+    ln_k = theta[0] - theta[2] * mean_o2 - theta[3] * mean_oh
+    ln_k_se = np.sqrt(gradient @ covariance @ gradient)
+    k = np.exp(ln_k)
+    se = np.sqrt(np.maximum(np.diag(covariance), 0))
+
+    ss_tot = ((ln_conc - ln_conc.mean()) ** 2).sum()
+    fe0 = np.exp(ln_fe0)
+    return {
+        'k': float(k),
+        'k_se': float(k * ln_k_se),
+        'order_fe': float(theta[1]),
+        'order_fe_se': float(se[1]),
+        'order_o2': float(theta[2]),
+        'order_o2_se': float(se[2]),
+        'order_oh': float(theta[3]),
+        'order_oh_se': float(se[3]),
+        'fixed': sorted(fixed),
+        'trace': batch.labels,
+        'fe0': fe0,
+        'fe0_se': fe0 * np.sqrt(np.maximum(var_fe0, 0)),
+        'r_squared': float(1 - cost / ss_tot),
+        'n_points': int(t.size),
+        'iterations': iteration,
+        'converged': bool(converged),
+    }
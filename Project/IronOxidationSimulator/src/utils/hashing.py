@@ -0,0 +1,58 @@
+"""
+hashing.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Content hashes of analysis data.
+Arrays, numbers, strings and nested containers of them are hashed by value, so results that are equal hash
+equally whatever object holds them. The render cache and the results export use these hashes to skip work
+whose input has not changed, and memo uses them to look up stored fits. Only numpy and hashlib are needed,
+so the module is cheap to import.
+"""
+
+import hashlib
+
+import numpy as np
+
+
+def content_key(*values, **params):
+    """
+    Builds a cache key from arrays, numbers, strings, and nested lists, tuples or dicts of them.
+
+    Args:
+        - *values: Data to identify, e.g. the values shown in a figure.
+        - **params: Parameters such as plot labels or colours.
+
+    Returns:
+        str: Hex digest identifying the content.
+    """
+    # SHA-256 is hardware accelerated on current CPUs, which matters for arrays of millions of points
+    digest = hashlib.sha256()
+
+    def feed(value):
+        if isinstance(value, dict):
+            digest.update(b"{")
+            for key in sorted(value, key=str):
+                feed(str(key))
+                feed(value[key])
+            digest.update(b"}")
+        elif isinstance(value, (list, tuple)) and not all(np.isscalar(item) for item in value):
+            digest.update(b"[")
+            for item in value:
+                feed(item)
+            digest.update(b"]")
+        elif isinstance(value, str):
+            digest.update(b"s" + value.encode("utf-8") + b"\0")
+        else:
+            array = np.ascontiguousarray(value)
+            if array.dtype == object:
+                digest.update(b"o" + repr(value).encode("utf-8") + b"\0")
+            else:
+                digest.update(f"a{array.dtype.str}{array.shape}".encode("utf-8"))
+                digest.update(array.reshape(-1).view(np.uint8))
+
+    feed(values)
+    feed(params)
+    return digest.hexdigest()
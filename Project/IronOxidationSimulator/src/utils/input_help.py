@@ -18,6 +18,7 @@ class DataInputDialog(QDialog):
         - main_window (QWidget): Reference to the main application window.
         - input_data (dict): Dictionary storing input data after confirmation.
         - data_types (dict): Dictionary defining the expected data types for each tab.
+        - hints (dict): Notes shown in the tab of a function, e.g. where the standard deviations come from.
         - tab_widget (QTabWidget): Widget containing tabs for each analysis type.
         - list_widgets (dict): Dictionary storing list widgets for each tab.
         - input_fields (dict): Dictionary storing input fields for each data type and tab.
@@ -39,6 +40,14 @@ class DataInputDialog(QDialog):
             '3D plane plot': ['initial concentration (uM)', 'initial rate (uM/s)', 'PH'],
         }
 
+        # Notes shown under the input fields of a tab
+        self.hints = {
+            'reaction order analysis': "Standard deviations for the weighted and York fits cannot be entered here. "
+                                       "Load a file instead: in a file with at least four columns, the third and "
+                                       "fourth are read as the standard deviations of the initial concentration "
+                                       "and the initial rate.",
+        }
+
         self.tab_widget = QTabWidget()
         self.list_widgets = {}
         self.input_fields = {function: {data_type: QLineEdit() for data_type in self.data_types[function]} for function
@@ -87,6 +96,11 @@ class DataInputDialog(QDialog):
             h_layout.addWidget(current_checkbox)
             v_layout.addLayout(h_layout)
 
+        if function in self.hints:
+            hint = QLabel(self.hints[function])
+            hint.setWordWrap(True)
+            v_layout.addWidget(hint)
+
         layout.addWidget(list_widget)
         layout.addLayout(v_layout)
 
@@ -0,0 +1,288 @@
+"""
+live_estimator.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Incremental initial rate and rate constant estimates for an experiment that is still running.
+Samples are fed one at a time (or in small batches) from a file being written by the acquisition software
+or from a socket, and the current estimates are available after every sample.
+"""
+
+import math
+import socket
+import time as timer
+
+import numpy as np
+
+from .streaming import RunningFit
+
+
+class _SortedSums:
+    """
+    Running sums of 1, t, y, t^2, t*y and y^2 over the points whose key is at most (or at least) any bound.
+
+    Points are kept in sorted runs of distinct power-of-two sizes, each with the cumulative sums along the
+    run. New points are buffered in small groups, and a full buffer is merged into the runs the way a binary
+    counter is incremented, so adding a point costs O(log n) amortised. A query is one binary search per run,
+    O(log^2 n), however far the bound has moved since the last one.
+    """
+
+    BUFFER = 32
+
+    def __init__(self):
+        self._runs = []  # (sorted keys, their rows, cumulative sums with a leading zero row) or None
+        self._keys, self._rows = [], []
+
+    def add(self, key, row):
+        """Adds a point with its key and its row of values to sum."""
+        self._keys.append(key)
+        self._rows.append(row)
+        if len(self._keys) >= self.BUFFER:
+            self._flush()
+
+    def _flush(self):
+        """Merges the buffered points into the runs."""
+        keys, rows = np.array(self._keys), np.array(self._rows)
+        self._keys, self._rows = [], []
+        level = 0
+        while level < len(self._runs) and self._runs[level] is not None:
+            run_keys, run_rows, _ = self._runs[level]
+            keys, rows = np.concatenate((run_keys, keys)), np.concatenate((run_rows, rows))
+            self._runs[level] = None
+            level += 1
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        sums = np.zeros((keys.size + 1, rows.shape[1]))
+        np.cumsum(rows, axis=0, out=sums[1:])
+        if level == len(self._runs):
+            self._runs.append(None)
+        self._runs[level] = (keys, rows, sums)
+
+    def query(self, bound, below=True):
+        """
+        Sums the rows of the points with key <= bound, or key >= bound if below is False.
+
+        Returns:
+            Array of the six sums.
+        """
+        total = np.zeros(6)
+        for run in self._runs:
+            if run is None:
+                continue
+            keys, _, sums = run
+            if below:
+                total += sums[np.searchsorted(keys, bound, side="right")]
+            else:
+                total += sums[-1] - sums[np.searchsorted(keys, bound, side="left")]
+        if self._keys:
+            keys = np.array(self._keys)
+            total += np.array(self._rows)[keys <= bound if below else keys >= bound].sum(axis=0)
+        return total
+
+
+class IncrementalRateEstimator:
+    """
+    Keeps running sufficient statistics for the initial rate and the rate constant of a growing trace.
+
+    The initial rate follows initial_rate.calculate_rate: the fit uses the points whose distance from the
+    first concentration is within threshold times the change between the first and the latest concentration.
+    With d = conc - first concentration and b = threshold * (latest - first concentration), those are the
+    points with d <= b for a rising trace and d >= b for a falling one. The points are kept sorted by d with
+    prefix sums (see _SortedSums), so the fit for either direction and any boundary is a lookup: the boundary
+    can move, and the direction can flip on a noisy flat trace, without revisiting the points. Adding a
+    sample costs O(log n) amortised and an estimate O(log^2 n).
+
+    Attributes:
+        - threshold (float): Fraction of the concentration change used for the initial rate.
+        - time, conc (list): Every sample received so far.
+        - full (RunningFit): Fit over all samples, used to score the initial rate line.
+        - subset (RunningFit): Fit over the samples inside the threshold boundary, computed on access.
+        - log_fit (RunningFit): Fit of ln(concentration) against time for the rate constant.
+        - rising (bool): True if the latest concentration is above the first one.
+    """
+
+    def __init__(self, threshold=0.1):
+        """
+        Initializes an empty estimator.
+
+        Args:
+            - threshold (float, optional): Fraction of the concentration change to use for the
+              initial rate. Defaults to 0.1.
+        """
+        self.threshold = threshold
+        self.time, self.conc = [], []
+        self.full = RunningFit()
+        self.log_fit = RunningFit()
+        self.rising = False
+        self._sorted = _SortedSums()
+
+    def __len__(self):
+        """Returns the number of samples received."""
+        return len(self.time)
+
+    @property
+    def subset(self):
+        """Fit over the samples inside the threshold boundary."""
+        fit = RunningFit(self.full.t_ref, self.full.y_ref)
+        if not self.conc:
+            return fit
+        boundary = (self.conc[-1] - self.conc[0]) * self.threshold
+        sums = self._sorted.query(boundary, below=self.rising)
+        fit.n = int(round(sums[0]))
+        fit.sum_t, fit.sum_y, fit.sum_tt, fit.sum_ty, fit.sum_yy = (float(value) for value in sums[1:])
+        return fit
+
+    def add(self, time, conc):
+        """
+        Adds one sample.
+
+        Args:
+            - time (float): Time of the sample.
+            - conc (float): Concentration of the sample.
+        """
+        time, conc = float(time), float(conc)
+        if not self.time:
+            self.full = RunningFit(time, conc)
+        self.time.append(time)
+        self.conc.append(conc)
+        self.full.update(time, conc)
+        if conc > 0:
+            self.log_fit.update(time, math.log(conc))
+
+        self.rising = conc > self.conc[0]
+        t, y = time - self.full.t_ref, conc - self.full.y_ref
+        self._sorted.add(conc - self.conc[0], (1.0, t, y, t * t, t * y, y * y))
+
+    def update(self, time, conc):
+        """
+        Adds one sample or a small batch of samples.
+
+        Args:
+            - time (float or array): Sample times.
+            - conc (float or array): Sample concentrations.
+        """
+        for t, c in zip(np.atleast_1d(time), np.atleast_1d(conc)):
+            self.add(t, c)
+
+    def initial_rate(self):
+        """
+        Returns the current initial rate estimate.
+
+        Returns:
+            Dictionary containing slope, intercept, R squared (over all samples) and the number of points
+            in the fit.
+        """
+        subset = self.subset
+        slope, intercept = subset.line()
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'r_squared': self.full.score(slope, intercept),
+            'n_points': subset.n
+        }
+
+    def rate_const(self):
+        """
+        Returns the current rate constant estimate from ln(concentration) against time.
+
+        Samples with a non-positive concentration are left out of this fit.
+
+        Returns:
+            Dictionary containing slope (rate constant), intercept, R squared and the number of points.
+        """
+        slope, intercept = self.log_fit.line()
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'r_squared': self.log_fit.r_squared(),
+            'n_points': self.log_fit.n
+        }
+
+
+def _parse_line(line):
+    """Parses 'time,conc' (comma, semicolon, tab or space separated). Returns None for headers and blanks."""
+    fields = line.replace(",", " ").replace(";", " ").split()
+    if len(fields) < 2:
+        return None
+    try:
+        return float(fields[0]), float(fields[1])
+    except ValueError:
+        return None
+
+
+def tail_file(filename, poll_interval=0.2, idle_timeout=5.0):
+    """
+    Follows a text file that is still being written and yields every new sample.
+
+    Args:
+        - filename (str): Path to a CSV/text file with time and concentration in the first two columns.
+        - poll_interval (float, optional): Seconds between checks for new data. Defaults to 0.2.
+        - idle_timeout (float, optional): Stop after this many seconds without new data.
+          None follows the file forever. Defaults to 5.0.
+
+    Yields:
+        (time, conc) tuples.
+    """
+    last_data = timer.monotonic()
+    pending = ""
+    with open(filename, encoding="utf-8") as f:
+        while True:
+            chunk = f.read()
+            if chunk:
+                last_data = timer.monotonic()
+                pending += chunk
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    sample = _parse_line(line)
+                    if sample is not None:
+                        yield sample
+            elif idle_timeout is not None and timer.monotonic() - last_data > idle_timeout:
+                sample = _parse_line(pending)
+                if sample is not None:
+                    yield sample
+                return
+            else:
+                timer.sleep(poll_interval)
+
+
+def socket_reader(host, port, timeout=None):
+    """
+    Connects to a TCP server that sends one 'time,conc' line per sample and yields the samples.
+
+    Args:
+        - host (str): Server address.
+        - port (int): Server port.
+        - timeout (float, optional): Socket timeout in seconds. Defaults to None (blocking).
+
+    Yields:
+        (time, conc) tuples until the server closes the connection.
+    """
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        with connection.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                sample = _parse_line(line)
+                if sample is not None:
+                    yield sample
+
+
+def run_live(samples, estimator, callback=None, every=1):
+    """
+    Feeds samples into an estimator and reports the estimates as they change.
+
+    Args:
+        - samples (iterable): (time, conc) tuples, e.g. from tail_file or socket_reader.
+        - estimator (IncrementalRateEstimator): Estimator to update.
+        - callback (callable, optional): Called with (initial_rate, rate_const) dictionaries.
+          Defaults to None.
+        - every (int, optional): Call the callback every this many samples. Defaults to 1.
+
+    Returns:
+        IncrementalRateEstimator: The updated estimator.
+    """
+    for time, conc in samples:
+        estimator.add(time, conc)
+        if callback is not None and len(estimator) % every == 0:
+            callback(estimator.initial_rate(), estimator.rate_const())
+    return estimator
@@ -0,0 +1,254 @@
+"""
+mechanism.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Stiff kinetic mechanism solver for the Haber-Weiss-type oxidation of Fe(II) by O2.
+The mechanism is given as a table of elementary reactions. From it the module builds the rate equations of
+all species and their analytic Jacobian. Many initial conditions (e.g. one per experiment, each at its own pH)
+are integrated together as one block-diagonal system with scipy's BDF method and a sparse Jacobian, so the
+mechanism can be checked against traces read with initial_rate.read_data.
+
+Concentrations are in mol/L and times in seconds.
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+
+from .rate_law import ln_hydroxide
+
+SPECIES = ("Fe(II)", "Fe(III)", "O2", "O2-", "H2O2", "OH")
+
+# Reaction table: reactants and products with their stoichiometric coefficients, the rate constant
+# (M^-n s^-1 at [OH-] = 1 M) and the order in OH-, so the rate constant at a given pH is k [OH-]^oh_order.
+# The constants are order-of-magnitude values for circumneutral water and are meant to be replaced by
+# measured ones.
+DEFAULT_REACTIONS = [
+    {"name": "Fe(II) oxygenation", "reactants": {"Fe(II)": 1, "O2": 1}, "products": {"Fe(III)": 1, "O2-": 1},
+     "k": 4.0e13, "oh_order": 2},
+    {"name": "Fe(II) + superoxide", "reactants": {"Fe(II)": 1, "O2-": 1}, "products": {"Fe(III)": 1, "H2O2": 1},
+     "k": 1.0e7, "oh_order": 0},
+    {"name": "Fenton", "reactants": {"Fe(II)": 1, "H2O2": 1}, "products": {"Fe(III)": 1, "OH": 1},
+     "k": 5.0e4, "oh_order": 0},
+    {"name": "Fe(II) + hydroxyl radical", "reactants": {"Fe(II)": 1, "OH": 1}, "products": {"Fe(III)": 1},
+     "k": 3.2e8, "oh_order": 0},
+    {"name": "Fe(III) + superoxide", "reactants": {"Fe(III)": 1, "O2-": 1}, "products": {"Fe(II)": 1, "O2": 1},
+     "k": 1.5e8, "oh_order": 0},
+    {"name": "Superoxide dismutation", "reactants": {"O2-": 2}, "products": {"H2O2": 1, "O2": 1},
+     "k": 1.0e6, "oh_order": 0},
+]
+
+
+class Mechanism:
+    """
+    Rate equations of a reaction table.
+
+    Attributes:
+        - reactions (list): The reaction table.
+        - species (tuple): Names of the species, in the order of the state vector.
+        - stoichiometry (array): Net production of every species by every reaction, shape (species, reactions).
+        - orders (array): Order of every reaction in every species, shape (reactions, species).
+        - k (array): Rate constants at [OH-] = 1 M.
+        - oh_orders (array): Orders in OH- of the rate constants.
+    """
+
+    def __init__(self, reactions=None, species=SPECIES):
+        """
+        Builds the stoichiometry and order matrices of a reaction table.
+
+        Args:
+            - reactions (list, optional): Reaction table, see DEFAULT_REACTIONS. Defaults to DEFAULT_REACTIONS.
+            - species (tuple, optional): Names of the species. Defaults to SPECIES.
+        """
+        self.reactions = list(DEFAULT_REACTIONS if reactions is None else reactions)
+        self.species = tuple(species)
+        index = {name: i for i, name in enumerate(self.species)}
+
+        n_species, n_reactions = len(self.species), len(self.reactions)
+        self.stoichiometry = np.zeros((n_species, n_reactions))
+        self.orders = np.zeros((n_reactions, n_species), dtype=int)
+        for j, reaction in enumerate(self.reactions):
+            for name, count in reaction["reactants"].items():
+                if name not in index:
+                    raise ValueError(f"unknown species '{name}' in reaction '{reaction.get('name', j)}'")
+                self.orders[j, index[name]] = count
+                self.stoichiometry[index[name], j] -= count
+            for name, count in reaction["products"].items():
+                if name not in index:
+                    raise ValueError(f"unknown species '{name}' in reaction '{reaction.get('name', j)}'")
+                self.stoichiometry[index[name], j] += count
+        self.k = np.array([reaction["k"] for reaction in self.reactions], dtype=float)
+        self.oh_orders = np.array([reaction.get("oh_order", 0) for reaction in self.reactions], dtype=float)
+
+        # (reaction, species) pairs with a non-zero rate derivative
+        self._reactant_pairs = np.argwhere(self.orders > 0)
+        pattern = (np.abs(self.stoichiometry) > 0).astype(int) @ (self.orders > 0).astype(int)
+        self.pattern_rows, self.pattern_cols = np.nonzero(pattern)
+
+    def index(self, name):
+        """Returns the position of a species in the state vector."""
+        return self.species.index(name)
+
+    def rate_constants(self, pH):
+        """
+        Rate constants at given pH values.
+
+        Args:
+            - pH (array-like): pH of every condition.
+
+        Returns:
+            array of shape (conditions, reactions).
+        """
+        ln_oh = ln_hydroxide(np.atleast_1d(pH))
+        return self.k[None, :] * np.exp(np.outer(ln_oh, self.oh_orders))
+
+    def rates(self, conc, k):
+        """
+        Rates of all reactions.
+
+        Args:
+            - conc (array): Concentrations, shape (conditions, species).
+            - k (array): Rate constants, shape (conditions, reactions).
+
+        Returns:
+            array of shape (conditions, reactions).
+        """
+        rates = k.copy()
+        for j, i in self._reactant_pairs:
+            rates[:, j] *= conc[:, i] ** self.orders[j, i]
+        return rates
+
+    def derivatives(self, conc, k):
+        """
+        Time derivatives of all species.
+
+        Args:
+            - conc (array): Concentrations, shape (conditions, species).
+            - k (array): Rate constants, shape (conditions, reactions).
+
+        Returns:
+            array of shape (conditions, species).
+        """
+        return self.rates(conc, k) @ self.stoichiometry.T
+
+    def jacobian(self, conc, k):
+        """
+        Analytic Jacobian of the time derivatives.
+
+        Args:
+            - conc (array): Concentrations, shape (conditions, species).
+            - k (array): Rate constants, shape (conditions, reactions).
+
+        Returns:
+            array of shape (conditions, species, species).
+        """
+        n_conditions, n_species = conc.shape
+        rate_jacobian = np.zeros((n_conditions, len(self.reactions), n_species))
+        for j, i in self._reactant_pairs:
+            # d/dc_i of k_j prod_l c_l^n_l, computed without dividing by c_i
+            term = k[:, j] * self.orders[j, i] * conc[:, i] ** (self.orders[j, i] - 1)
+            for l in np.flatnonzero(self.orders[j]):
+                if l != i:
+                    term = term * conc[:, l] ** self.orders[j, l]
+            rate_jacobian[:, j, i] = term
+        return np.einsum('sr,crl->csl', self.stoichiometry, rate_jacobian)
+
+
+def _block_jacobian(mechanism, n_conditions):
+    """Returns a function building the sparse block-diagonal Jacobian of the batched system."""
+    n_species = len(mechanism.species)
+    rows, cols = mechanism.pattern_rows, mechanism.pattern_cols
+    offsets = (np.arange(n_conditions) * n_species)[:, None]
+    all_rows = (offsets + rows[None, :]).ravel()
+    all_cols = (offsets + cols[None, :]).ravel()
+    size = n_conditions * n_species
+
+    def build(conc, k):
+        data = mechanism.jacobian(conc, k)[:, rows, cols].ravel()
+        return sparse.csr_matrix((data, (all_rows, all_cols)), shape=(size, size))
+
+    return build
+
+
+def simulate(initial, pH, time, mechanism=None, rtol=1e-6, atol=1e-14):
+    """
+    Integrates the mechanism for many initial conditions at once.
+
+    Args:
+        - initial (dict): Initial concentration (mol/L) of each species, a float or one value per condition.
+          Species that are not given start at zero.
+        - pH (float or array-like): pH of every condition.
+        - time (array-like): Increasing output times in seconds; integration starts at time[0].
+        - mechanism (Mechanism, optional): Mechanism to integrate. Defaults to Mechanism().
+        - rtol (float, optional): Relative tolerance of the integrator. Defaults to 1e-6.
+        - atol (float, optional): Absolute tolerance in mol/L. Defaults to 1e-14.
+
+    Returns:
+        array of shape (conditions, times, species) with the concentrations, or None if the integration fails.
+    """
+    mechanism = mechanism or Mechanism()
+    time = np.asarray(time, dtype=float)
+    n_conditions = max([np.size(pH)] + [np.size(value) for value in initial.values()])
+    n_species = len(mechanism.species)
+
+    conc0 = np.zeros((n_conditions, n_species))
+    for name, value in initial.items():
+        conc0[:, mechanism.index(name)] = value
+    k = mechanism.rate_constants(np.broadcast_to(np.asarray(pH, dtype=float), (n_conditions,)))
+    build_jacobian = _block_jacobian(mechanism, n_conditions)
+
+    def fun(_, y):
+        return mechanism.derivatives(y.reshape(n_conditions, n_species), k).ravel()
+
+    def jac(_, y):
+        return build_jacobian(y.reshape(n_conditions, n_species), k)
+
+    try:
+        solution = solve_ivp(fun, (time[0], time[-1]), conc0.ravel(), method="BDF", t_eval=time, jac=jac,
+                             rtol=rtol, atol=atol)
+    except Exception as e:
+        print(f"Error integrating the mechanism: {e}")
+        return None
+    if not solution.success:
+        print(f"Error integrating the mechanism: {solution.message}")
+        return None
+    return solution.y.reshape(n_conditions, n_species, time.size).transpose(0, 2, 1)
+
+
+def simulate_trace(time, conc, pH, o2, mechanism=None, unit=1e-6):
+    """
+    Simulates the Fe(II) curve of a measured trace, e.g. from initial_rate.read_data.
+
+    The simulation starts from the first measured Fe(II) concentration with no Fe(III) or reactive oxygen
+    species, at the given pH and O2 concentration.
+
+    Args:
+        - time (array-like): Measured times in seconds.
+        - conc (array-like): Measured Fe(II) concentrations.
+        - pH (float): pH of the experiment.
+        - o2 (float): O2 concentration in mol/L.
+        - mechanism (Mechanism, optional): Mechanism to integrate. Defaults to Mechanism().
+        - unit (float, optional): Size of the concentration unit of the data in mol/L. Defaults to 1e-6 (uM).
+
+    Returns:
+        dict: 'time', measured 'conc', simulated 'simulated' Fe(II) in the units of the data, 'rmse' and
+        'r_squared' of the simulation against the data, or None if the integration fails.
+    """
+    mechanism = mechanism or Mechanism()
+    time = np.asarray(time, dtype=float)
+    conc = np.asarray(conc, dtype=float)
+    curves = simulate({"Fe(II)": conc[0] * unit, "O2": o2}, pH, time, mechanism)
+    if curves is None:
+        return None
+    simulated = curves[0, :, mechanism.index("Fe(II)")] / unit
+    residual = conc - simulated
+    return {
+        'time': time,
+        'conc': conc,
+        'simulated': simulated,
+        'rmse': float(np.sqrt(np.mean(residual ** 2))),
+        'r_squared': float(1 - np.sum(residual ** 2) / np.sum((conc - conc.mean()) ** 2)),
+    }
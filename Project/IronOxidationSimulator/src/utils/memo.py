@@ -0,0 +1,417 @@
+"""
+memo.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Memoization of the analysis fits, optionally persistent.
+A memoized function is looked up by a content hash of its arguments (arrays are hashed by value, see
+hashing.content_key), its name and its code version, so reopening the same workbook or rerunning the same
+analysis returns the stored result instead of fitting again. The code version is a hash of the bytecode of
+the function and of the helpers it calls in its module, plus an explicit version number, so editing a fit
+invalidates its old results automatically. Arguments that are not arrays, numbers or strings (e.g. object
+arrays) cannot be hashed reliably; such calls are simply computed.
+
+Results are kept in two tiers, each bounded by total size with least recently used eviction:
+    - memory: pickled results of this process. On by default.
+    - disk: one pickle file per result, shared by the GUI, batch runs and their worker processes. Files are
+      written atomically (see fileio). Off unless asked for, as it keeps copies of the analysed data on disk: set
+      IRON_OXIDATION_MEMO_DIR to a directory, or IRON_OXIDATION_MEMO=disk for ~/.iron_oxidation/memo, or
+      call enable_disk().
+
+Stored results are returned as fresh copies, except for input arrays that the function returns unchanged,
+which are the caller's own arrays, as without memoization. Set IRON_OXIDATION_MEMO=0 to turn
+memoization off, or call set_enabled(False).
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from .fileio import atomic_write
+from .hashing import content_key
+
+MEMO_ENV = "IRON_OXIDATION_MEMO"
+DIRECTORY_ENV = "IRON_OXIDATION_MEMO_DIR"
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".iron_oxidation", "memo")
+MEMORY_BYTES = 64 * 1024 ** 2
+DISK_BYTES = 512 * 1024 ** 2
+# Bumped when the key or file format changes
+MEMO_VERSION = 1
+
+_enabled = os.environ.get(MEMO_ENV, "1") != "0"
+
+
+def disk_directory():
+    """
+    Returns the directory of the disk tier chosen in the environment.
+
+    Returns:
+        str: IRON_OXIDATION_MEMO_DIR if set, DEFAULT_DIRECTORY if IRON_OXIDATION_MEMO=disk, otherwise None
+        (memory only).
+    """
+    directory = os.environ.get(DIRECTORY_ENV)
+    if directory:
+        return directory
+    return DEFAULT_DIRECTORY if os.environ.get(MEMO_ENV) == "disk" else None
+
+
+def _code_hash(code, digest):
+    """Feeds a code object and the code objects nested in it, e.g. of inner functions, to a digest."""
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _code_hash(const, digest)
+        else:
+            digest.update(repr(const).encode())
+    digest.update(repr(code.co_names).encode())
+
+
+def code_version(function):
+    """
+    Hashes the bytecode of a function and of the functions of its module that it calls, directly or not.
+
+    Args:
+        - function (callable): Python function.
+
+    Returns:
+        str: Hex digest that changes when the function or one of its helpers is edited.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    seen = set()
+    pending = [function]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        code = current.__code__
+        _code_hash(code, digest)
+        for name in code.co_names:
+            helper = current.__globals__.get(name)
+            if getattr(helper, "__module__", None) == function.__module__ and hasattr(helper, "__code__"):
+                pending.append(helper)
+    return digest.hexdigest()
+
+
+def _by_value(value):
+    """Returns True if a value can be hashed by content: arrays and scalars, but not arbitrary objects."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return True
+    if isinstance(value, dict):
+        return all(_by_value(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(_by_value(item) for item in value)
+    dtype = getattr(value, "dtype", None)
+    return dtype is not None and dtype != object
+
+
+class _Argument:
+    """Stands in, in a stored result, for a value that the function returned unchanged from its arguments."""
+
+    def __init__(self, index):
+        self.index = index
+
+
+def _strip_arguments(result, args):
+    """Replaces the values of a dict or tuple result that are arguments by _Argument markers."""
+    positions = {id(arg): i for i, arg in enumerate(args)}
+
+    def strip(value):
+        index = positions.get(id(value))
+        return value if index is None or isinstance(value, (int, float, str)) else _Argument(index)
+
+    if isinstance(result, dict):
+        return {key: strip(value) for key, value in result.items()}
+    if isinstance(result, tuple):
+        return tuple(strip(value) for value in result)
+    return result
+
+
+def _restore_arguments(result, args):
+    """Puts the caller's arguments back in place of the _Argument markers."""
+    def restore(value):
+        return args[value.index] if isinstance(value, _Argument) else value
+
+    if isinstance(result, dict):
+        return {key: restore(value) for key, value in result.items()}
+    if isinstance(result, tuple):
+        return tuple(restore(value) for value in result)
+    return result
+
+
+class Memo:
+    """
+    A two-tier (memory and disk) store of pickled results, each tier an LRU bounded by size.
+
+    Attributes:
+        - directory (str): Directory of the disk tier, or None for memory only.
+        - memory_bytes (int): Size cap of the memory tier.
+        - disk_bytes (int): Size cap of the disk tier.
+        - hits (int): Number of lookups answered from memory or disk.
+        - misses (int): Number of lookups that found nothing.
+    """
+
+    def __init__(self, directory=None, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        """
+        Initializes an empty memory tier. The disk tier is created on first write.
+
+        Args:
+            - directory (str, optional): Directory of the disk tier, None for memory only. Defaults to None.
+            - memory_bytes (int, optional): Size cap of the memory tier. Defaults to MEMORY_BYTES.
+            - disk_bytes (int, optional): Size cap of the disk tier. Defaults to DISK_BYTES.
+        """
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    def _remember(self, key, data):
+        """Stores pickled data in the memory tier. Caller holds the lock."""
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def get(self, key):
+        """
+        Looks up a result.
+
+        Args:
+            - key (str): Content hash identifying the result.
+
+        Returns:
+            tuple: (True, result) if found, otherwise (False, None).
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+        if data is None and self.directory is not None:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as file:
+                    data = file.read()
+                # The modification time orders the disk tier for eviction
+                os.utime(path)
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self._remember(key, data)
+        found, result = False, None
+        if data is not None:
+            try:
+                found, result = True, pickle.loads(data)
+            except Exception:
+                pass
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found, result
+
+    def put(self, key, result):
+        """
+        Stores a result in the memory tier and, if there is one, the disk tier.
+
+        Args:
+            - key (str): Content hash identifying the result.
+            - result: Picklable result.
+        """
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        with self._lock:
+            self._remember(key, data)
+        if self.directory is None or len(data) > self.disk_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, lambda file: file.write(data), mode="wb")
+        except OSError as e:
+            print(f"Error writing memo file {path}: {e}")
+            return
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(data)
+            over = self._disk_size is None or self._disk_size > self.disk_bytes
+        if over:
+            self._evict_disk()
+
+    def _disk_files(self):
+        """Lists the files of the disk tier as (modification time, size, path)."""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".pkl"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict_disk(self):
+        """Deletes the least recently used files until the disk tier fits its cap."""
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        if total > self.disk_bytes:
+            for _, size, path in sorted(files):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.disk_bytes:
+                    break
+        with self._lock:
+            self._disk_size = total
+
+    def clear(self, disk=False):
+        """
+        Forgets all results held in memory, and optionally the disk tier too.
+
+        Args:
+            - disk (bool, optional): Also delete the disk tier. Defaults to False.
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        if disk and self.directory is not None:
+            for _, _, path in self._disk_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_size = 0
+
+    def info(self):
+        """
+        Returns the state of the store.
+
+        Returns:
+            dict: Entries and bytes of the memory tier, bytes of the disk tier (None until known), hits
+            and misses.
+        """
+        with self._lock:
+            return {"memory_entries": len(self._memory), "memory_bytes": self._memory_size,
+                    "disk_bytes": self._disk_size, "hits": self.hits, "misses": self.misses}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns the shared store, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = Memo(disk_directory())
+        return _store
+
+
+def set_store(store):
+    """
+    Replaces the shared store, e.g. with a memory-only Memo().
+
+    Args:
+        - store (Memo): The new store.
+    """
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def enable_disk(directory=None):
+    """
+    Replaces the shared store with one that also keeps results on disk.
+
+    The directory is also put in the environment, so worker processes that do not fork use it too.
+
+    Args:
+        - directory (str, optional): Directory of the disk tier. Defaults to DEFAULT_DIRECTORY.
+    """
+    directory = directory or DEFAULT_DIRECTORY
+    os.environ[DIRECTORY_ENV] = directory
+    set_store(Memo(directory))
+
+
+def set_enabled(enabled):
+    """
+    Turns memoization on or off. When off, memoized functions always compute their result.
+
+    Args:
+        - enabled (bool): Whether to look up and store results.
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    """Returns True if memoized functions look up stored results."""
+    return _enabled
+
+
+def memoize(name, version=1, method=False):
+    """
+    Decorator that memoizes a function by the content of its arguments.
+
+    Args:
+        - name (str): Name of the analysis, part of the key.
+        - version (int, optional): Bump to invalidate stored results when the result changes without a change
+          of the code of the function or its helpers in the same module, e.g. after a library update.
+          Defaults to 1.
+        - method (bool, optional): The function is a method; its first argument (self) is not part of the
+          key. Defaults to False.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorate(function):
+        # Computed on the first call, once the helpers defined later in the module exist
+        versions = []
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            key_args = list(args[1:] if method else args)
+            if not _enabled or not _by_value(key_args) or not _by_value(kwargs):
+                return function(*args, **kwargs)
+            if not versions:
+                versions.append(f"{MEMO_VERSION}:{version}:{code_version(function)}")
+            key = content_key(name, versions[0], key_args, kwargs)
+            store = get_store()
+            found, result = store.get(key)
+            if found:
+                return _restore_arguments(result, key_args)
+            result = function(*args, **kwargs)
+            # Input arrays echoed in the result (e.g. 'time') are not stored: the key already pins their content
+            store.put(key, _strip_arguments(result, key_args))
+            return result
+
+        wrapper.uncached = function
+        return wrapper
+    return decorate
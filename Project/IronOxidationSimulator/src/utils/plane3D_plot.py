@@ -3,18 +3,43 @@ plane3D_plot.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-08-12
-Modified: 2023-08-17
+Modified: 2026-10-18
 
 This file contains functions for performing 3D plotting and regression analysis on data.
 It includes functions for reading data, plotting 3D scatter points, and fitting a plane to the data.
 """
 import numpy as np
-import pandas as pd
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
 import matplotlib.pyplot as plt
-from PyQt5.QtGui import QImage, QPixmap
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from .memo import memoize
+from .render import figure_to_pixmap
+from .simulate import simulate_grid
+from .workbook import read_table
+
+
+def read_data(filename):
+    """
+    Reads the raw 3D plane data from an Excel file, without taking logs.
+
+    Args:
+        - filename (str): Name of the Excel file to read from.
+
+    If the file has six columns or more, columns four to six hold the standard deviations of the initial
+    concentration, initial rate and pH, and are returned as well.
+
+    Returns:
+        tuple: Initial concentration, initial rate and pH values (and their standard deviations),
+        or None if an error occurs.
+    """
+    try:
+        data = read_table(filename)
+        return tuple(data.iloc[:, i].values for i in range(6 if data.shape[1] >= 6 else 3))
+    except Exception as e:
+        print(f"Error reading file {filename}: {e}")
+        return None
 
 
 class Plane3DPlotter:
@@ -27,22 +52,42 @@ class Plane3DPlotter:
         - pH (array): pH values from the data.
         - params (tuple): Parameters of the fitted plane.
         - r_squared (float): R-squared value of the fitted model.
+        - errors (tuple): Standard deviations of the logged initial concentration, logged initial rate and pH,
+          or None if the data has none.
     """
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, data=None):
         """
-        Initializes Plane3DPlotter with a given filename.
+        Initializes Plane3DPlotter with a given filename or with data already in memory.
 
         Args:
             - filename (str, optional): Name of the input Excel file. Defaults to None.
+            - data (DataFrame, dict or tuple, optional): Initial concentration, initial rate and pH values,
+              see prepare_data. If given, no file is read. Defaults to None.
         """
         self.filename = filename
-        self.data = self.read_data(filename)
+        self.errors = None
+        self.data = self.prepare_data(data) if data is not None else self.read_data(filename)
         self.log_initial_concentration, self.log_initial_rate, self.pH = (
         None, None, None) if self.data is None else self.data
         self.params = None
         self.r_squared = None
 
+    @classmethod
+    def from_arrays(cls, initial_concentration, initial_rate, pH):
+        """
+        Creates a Plane3DPlotter from arrays without any file I/O.
+
+        Args:
+            - initial_concentration (array): Initial concentrations.
+            - initial_rate (array): Initial rates.
+            - pH (array): pH values.
+
+        Returns:
+            Plane3DPlotter: Plotter holding the logged data.
+        """
+        return cls(data=(initial_concentration, initial_rate, pH))
+
     def read_data(self, filename):
         """
         Reads data from the specified Excel file and returns logged values.
@@ -54,17 +99,46 @@ class Plane3DPlotter:
             tuple: Logged initial concentration, logged initial rate, and pH values.
         """
         try:
-            data = pd.read_excel(filename)
-            # Assuming initial concentration is in the first column
-            log_initial_concentration = np.log(data.iloc[:, 0].values)
-            # Assuming initial rate is in the second column
-            log_initial_rate = np.log(data.iloc[:, 1].values)
-            # Assuming pH is in the third column
-            pH = data.iloc[:, 2].values
-            return log_initial_concentration, log_initial_rate, pH
+            data = read_table(filename)
         except Exception as e:
             print(f"Error reading file {filename}: {e}")
             return None
+        return self.prepare_data(data)
+
+    def prepare_data(self, data):
+        """
+        Takes the log of the initial concentration and rate.
+
+        Args:
+            - data (DataFrame, dict or tuple): A DataFrame or dict whose first three columns are the initial
+              concentration, initial rate and pH (as produced by the manual input dialog), or a tuple of
+              those three arrays. Three more columns with their standard deviations are optional and are
+              kept in self.errors, propagated through the log.
+
+        Returns:
+            tuple: Logged initial concentration, logged initial rate, and pH values.
+        """
+        try:
+            if isinstance(data, dict):
+                columns = list(data.values())
+            elif hasattr(data, "iloc"):
+                columns = [data.iloc[:, i].values for i in range(min(data.shape[1], 6))]
+            else:
+                columns = list(data)
+            # Assuming initial concentration, initial rate and pH are the first three columns
+            initial_concentration = np.asarray(columns[0], dtype=float)
+            initial_rate = np.asarray(columns[1], dtype=float)
+            log_initial_concentration = np.log(initial_concentration)
+            log_initial_rate = np.log(initial_rate)
+            pH = np.asarray(columns[2], dtype=float)
+            if len(columns) >= 6:
+                self.errors = (np.abs(np.asarray(columns[3], dtype=float) / initial_concentration),
+                               np.abs(np.asarray(columns[4], dtype=float) / initial_rate),
+                               np.asarray(columns[5], dtype=float))
+            return log_initial_concentration, log_initial_rate, pH
+        except Exception as e:
+            print(f"Error preparing data: {e}")
+            return None
 
     def perform_analysis(self):
         """
@@ -76,6 +150,7 @@ class Plane3DPlotter:
         self.params, self.r_squared = self.fit_plane(self.log_initial_concentration, self.pH, self.log_initial_rate)
         return self.params, self.r_squared
 
+    @memoize("Plane3DPlotter.fit_plane", method=True)
     def fit_plane(self, log_initial_concentration, pH, log_initial_rate):
         """
         Fits a plane to the given 3D data.
@@ -94,6 +169,81 @@ class Plane3DPlotter:
         r_squared = r2_score(log_initial_rate, predictions)
         return (model.intercept_, model.coef_[0], model.coef_[1]), r_squared
 
+    def monte_carlo(self, n_samples=5000, confidence=0.95, seed=None, chunk_size=1000):
+        """
+        Propagates the uncertainty of all three coordinates through the plane fit.
+
+        Every sample perturbs the logged initial concentration, logged initial rate and pH of all points with
+        normal noise of their standard deviations (self.errors), and all perturbed planes are refitted in
+        batched least-squares solves. Without standard deviations, only the log rate is perturbed, with the
+        residual standard deviation of the fit.
+
+        Args:
+            - n_samples (int, optional): Number of perturbed data sets. Defaults to 5000.
+            - confidence (float, optional): Confidence level of the intervals and bands. Defaults to 0.95.
+            - seed (int, optional): Seed of the random generator. Defaults to None.
+            - chunk_size (int, optional): Number of samples fitted at once. Defaults to 1000.
+
+        Returns:
+            dict: 'samples' (parameters of every sample, shape (n_samples, 3)), 'mean', 'std' and 'ci' of the
+            parameters, 'r_squared' of every sample, and 'band' with the grid of plot_fitted_plane and the
+            'lower' and 'upper' surfaces of the confidence band.
+        """
+        if self.params is None:
+            self.perform_analysis()
+        x, y, z = self.log_initial_concentration, self.pH, self.log_initial_rate
+        if self.errors is not None:
+            sd_x, sd_z, sd_y = (np.broadcast_to(np.nan_to_num(error), x.shape) for error in self.errors)
+        else:
+            predictions = self.params[0] + self.params[1] * x + self.params[2] * y
+            sd_x, sd_y = np.zeros_like(x), np.zeros_like(y)
+            sd_z = np.full_like(z, np.sqrt(np.sum((z - predictions) ** 2) / max(z.size - 3, 1)))
+
+        rng = np.random.default_rng(seed)
+        # Centring keeps the 3x3 normal equations well conditioned
+        x_ref, y_ref, z_ref = x.mean(), y.mean(), z.mean()
+        samples = np.empty((n_samples, 3))
+        r_squared = np.empty(n_samples)
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            shape = (stop - start, x.size)
+            xs = x - x_ref + rng.standard_normal(shape) * sd_x
+            ys = y - y_ref + rng.standard_normal(shape) * sd_y
+            zs = z - z_ref + rng.standard_normal(shape) * sd_z
+            design = np.stack((np.ones(shape), xs, ys), axis=-1)
+            normal_matrix = np.einsum('sni,snj->sij', design, design)
+            rhs = np.einsum('sni,sn->si', design, zs)
+            coefficients = np.linalg.solve(normal_matrix, rhs[:, :, None])[:, :, 0]
+            residual = zs - np.einsum('sni,si->sn', design, coefficients)
+            centred = zs - zs.mean(axis=1, keepdims=True)
+            r_squared[start:stop] = 1 - np.sum(residual ** 2, axis=1) / np.sum(centred ** 2, axis=1)
+            # Back to the uncentred intercept
+            coefficients[:, 0] += z_ref - coefficients[:, 1] * x_ref - coefficients[:, 2] * y_ref
+            samples[start:stop] = coefficients
+
+        alpha = (1 - confidence) / 2
+        x_grid, y_grid = plane_grid(x, y)
+        lower = np.empty(x_grid.size)
+        upper = np.empty(x_grid.size)
+        grid_design = np.column_stack((np.ones(x_grid.size), x_grid.ravel(), y_grid.ravel()))
+        for start in range(0, x_grid.size, 500):
+            surfaces = grid_design[start:start + 500] @ samples.T
+            lower[start:start + 500], upper[start:start + 500] = np.quantile(surfaces, [alpha, 1 - alpha], axis=1)
+
+        return {
+            'samples': samples,
+            'mean': samples.mean(axis=0),
+            'std': samples.std(axis=0, ddof=1),
+            'ci': np.quantile(samples, [alpha, 1 - alpha], axis=0).T,
+            'r_squared': r_squared,
+            'band': {
+                'log_initial_concentration': x_grid,
+                'pH': y_grid,
+                'lower': lower.reshape(x_grid.shape),
+                'upper': upper.reshape(x_grid.shape),
+            },
+        }
+
     def plot_3D_data(self, ax=None):
         """
         Plots the 3D data and fitted plane.
@@ -131,20 +281,37 @@ class Plane3DPlotter:
         ax.set_zlabel('log(Initial Rate)')
         return fig, ax
 
-    def plot_fitted_plane(self, ax, params):
+    def plot_fitted_plane(self, ax, params, band=None):
         """
         Plots the fitted plane on the given 3D axes.
 
         Args:
             - ax (Axes3D): 3D axes object to plot on.
             - params (tuple): Parameters of the fitted plane.
+            - band (dict, optional): Confidence band from monte_carlo, drawn around the plane. Defaults to None.
         """
-        log_initial_concentration_range = np.linspace(self.log_initial_concentration.min(),
-                                                      self.log_initial_concentration.max(), 50)
-        pH_range = np.linspace(self.pH.min(), self.pH.max(), 50)
-        log_initial_concentration_grid, pH_grid = np.meshgrid(log_initial_concentration_range, pH_range)
+        log_initial_concentration_grid, pH_grid = plane_grid(self.log_initial_concentration, self.pH)
         log_initial_rate_fit = params[0] + params[1] * log_initial_concentration_grid + params[2] * pH_grid
         ax.plot_surface(log_initial_concentration_grid, pH_grid, log_initial_rate_fit, alpha=0.5)
+        if band is not None:
+            draw_band(ax, band)
+
+    def simulate(self, pH, initial_concentration, time, filename=None):
+        """
+        Simulates Fe(II) curves from the fitted plane, see simulate.simulate_grid.
+
+        Args:
+            - pH (array): pH values of the grid.
+            - initial_concentration (array): Initial concentrations of the grid.
+            - time (array): Times at which to evaluate the curves.
+            - filename (str, optional): .npy file to write the curves to. Defaults to None.
+
+        Returns:
+            array: Concentrations indexed by pH, initial concentration and time.
+        """
+        if self.params is None:
+            self.perform_analysis()
+        return simulate_grid(self.params, pH, initial_concentration, time, filename=filename)
 
     def get_results(self):
         """
@@ -168,10 +335,69 @@ class Plane3DPlotter:
         Returns:
             QPixmap: Converted QPixmap of the figure.
         """
-        canvas = FigureCanvas(fig)
-        canvas.draw()
-        width, height = fig.get_size_inches() * fig.get_dpi()
-        image = QImage(canvas.buffer_rgba(), width, height, QImage.Format_ARGB32)
-        pixmap = QPixmap.fromImage(image)
-        return pixmap
+        return figure_to_pixmap(fig)
+
+
+def plane_grid(log_initial_concentration, pH, size=50):
+    """
+    Grid over the range of the data on which the fitted plane is drawn.
 
+    Args:
+        - log_initial_concentration (array): Logged values of initial concentrations.
+        - pH (array): pH values.
+        - size (int, optional): Number of grid lines along each axis. Defaults to 50.
+
+    Returns:
+        tuple: Log concentration and pH grids.
+    """
+    log_initial_concentration_range = np.linspace(np.min(log_initial_concentration),
+                                                  np.max(log_initial_concentration), size)
+    pH_range = np.linspace(np.min(pH), np.max(pH), size)
+    return np.meshgrid(log_initial_concentration_range, pH_range)
+
+
+def draw_band(ax, band):
+    """
+    Draws the lower and upper surfaces of a confidence band from Plane3DPlotter.monte_carlo.
+
+    Args:
+        - ax (Axes3D): 3D axes object to plot on.
+        - band (dict): The 'band' entry of the Monte Carlo result.
+    """
+    for surface in (band['lower'], band['upper']):
+        ax.plot_wireframe(band['log_initial_concentration'], band['pH'], surface, color='grey', alpha=0.3,
+                          rstride=5, cstride=5)
+
+
+def plane_figure(pH, log_initial_concentration, log_initial_rate, params, r_squared, uncertainty=None):
+    """
+    Builds the figure of the data points and the fitted plane. Safe to call from a worker thread.
+
+    Args:
+        - pH (array): pH values.
+        - log_initial_concentration (array): Logged values of initial concentrations.
+        - log_initial_rate (array): Logged values of initial rates.
+        - params (tuple): Parameters of the fitted plane.
+        - r_squared (float): R-squared value of the fitted model.
+        - uncertainty (dict, optional): Result of Plane3DPlotter.monte_carlo; its confidence band is drawn
+          around the plane. Defaults to None.
+
+    Returns:
+        Figure: The 3D plot.
+    """
+    fig = Figure()
+    ax = fig.add_subplot(111, projection='3d')
+    ax.scatter(log_initial_concentration, pH, log_initial_rate, c='k', marker='o')
+    ax.set_xlabel('log(Initial Concentration)')
+    ax.set_ylabel('pH')
+    ax.set_zlabel('log(Initial Rate)')
+    logFe_grid, pH_grid = plane_grid(log_initial_concentration, pH)
+    logR_fit = params[0] + params[1] * logFe_grid + params[2] * pH_grid
+    ax.plot_surface(logFe_grid, pH_grid, logR_fit, alpha=0.5)
+    if uncertainty is not None:
+        draw_band(ax, uncertainty['band'])
+    equation_str = f"logR_0 = {params[1]:.2f}pH + {params[2]:.2f}logX_0 + {params[0]:.2f}"
+    ax.set_title(equation_str)
+    ax.text(0.02, 0.98, 0.02, s=f'R^2={r_squared:.2f}', transform=ax.transAxes,
+            verticalalignment='top')
+    return fig
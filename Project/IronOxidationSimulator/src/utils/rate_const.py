@@ -3,16 +3,17 @@ rate_const.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-08-10
-Modified: 2023-08-14
+Modified: 2026-10-18
 
 """
 
 import numpy as np
-import pandas as pd
 from sklearn.linear_model import LinearRegression
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from PyQt5.QtGui import QPixmap, QImage
+from matplotlib.figure import Figure
+
+from .memo import memoize
+from .render import figure_to_pixmap
+from .workbook import read_table
 
 
 def read_data(filename):
@@ -26,7 +27,7 @@ def read_data(filename):
         Time and concentration values or None if an error occurs.
     """
     try:
-        data = pd.read_excel(filename)
+        data = read_table(filename)
         time = data.iloc[:, 0].values
         conc = data.iloc[:, 1].values
         return time, conc
@@ -35,6 +36,7 @@ def read_data(filename):
         return None
 
 
+@memoize("rate_const.calculate_rate")
 def calculate_rate(time, conc):
     """
     Calculates the reaction rate using regression on logarithmic concentration.
@@ -65,9 +67,9 @@ def calculate_rate(time, conc):
     }
 
 
-def plot(time, conc, slope, intercept, r_squared):
+def rate_const_figure(time, conc, slope, intercept, r_squared):
     """
-    Plots the given time and logarithmic concentration data with a linear fit.
+    Builds the figure of the logarithmic concentration with its linear fit. Safe to call from a worker thread.
 
     Args:
         - time (array-like): Array of time values.
@@ -77,11 +79,12 @@ def plot(time, conc, slope, intercept, r_squared):
         - r_squared (float): R squared value from linear regression.
 
     Returns:
-        PyQt5.QtGui.QPixmap: Pixmap representation of the plot.
+        matplotlib.figure.Figure: The plot.
     """
     time = np.array(time)
 
-    fig, ax = plt.subplots(figsize=(6, 4))
+    fig = Figure(figsize=(6, 4))
+    ax = fig.add_subplot(111)
 
     ax.scatter(time, conc, label="Data points", color="blue")
     ax.plot(time, slope * time + intercept, '-', color="red",
@@ -91,11 +94,21 @@ def plot(time, conc, slope, intercept, r_squared):
     ax.set_ylabel('ln_Concentration')
     ax.legend(loc="best")
 
-    # Convert the matplotlib figure to a QPixmap
-    canvas = FigureCanvas(fig)
-    canvas.draw()
-    width, height = fig.get_size_inches() * fig.get_dpi()
-    image = QImage(canvas.buffer_rgba(), width, height, QImage.Format_ARGB32)
-    pixmap = QPixmap.fromImage(image)
+    return fig
+
 
-    return pixmap
+def plot(time, conc, slope, intercept, r_squared):
+    """
+    Plots the given time and logarithmic concentration data with a linear fit.
+
+    Args:
+        - time (array-like): Array of time values.
+        - conc (array-like): Array of logarithmic concentration values.
+        - slope (float): Slope from linear regression.
+        - intercept (float): Intercept from linear regression.
+        - r_squared (float): R squared value from linear regression.
+
+    Returns:
+        PyQt5.QtGui.QPixmap: Pixmap representation of the plot.
+    """
+    return figure_to_pixmap(rate_const_figure(time, conc, slope, intercept, r_squared))
@@ -0,0 +1,286 @@
+"""
+rate_law.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Nonlinear fitting of the Fe(II) oxidation rate law
+    -d[Fe(II)]/dt = k [Fe(II)]^a [O2]^b [OH-]^c
+directly to concentration-time traces.
+
+Within one experiment [O2] and pH are constant, so the law reduces to -d[Fe]/dt = K [Fe]^a with
+K = k [O2]^b [OH-]^c, which has the closed-form solution
+    [Fe](t) = ([Fe]0^s - s K t)^(1/s),  s = 1 - a
+(and [Fe]0 exp(-K t) for a = 1). The fit works on ln[Fe], written with log1p so it is exact for every order,
+with an analytic Jacobian. All traces of a TraceBatch are fitted together by a Levenberg-Marquardt loop
+whose 3x3 normal equations are assembled with segment sums and solved in one batched call.
+"""
+
+import numpy as np
+
+from .trace_batch import TraceBatch, rate_const_batch
+
+LN10 = np.log(10.0)
+# pKw used to convert pH to [OH-] in mol/L
+PKW = 14.0
+# Below this size of s*q and s*ln[Fe]0 the order derivative is taken from its series expansion
+SERIES_LIMIT = 1e-4
+# Largest value of u = s K t [Fe]0^-s allowed; u = 1 is the time at which [Fe] reaches zero
+U_MAX = 1 - 1e-12
+
+
+def ln_hydroxide(pH):
+    """
+    Natural log of the hydroxide concentration (mol/L) at a given pH.
+
+    Args:
+        - pH (array-like): pH values.
+
+    Returns:
+        ln[OH-] values.
+    """
+    return LN10 * (np.asarray(pH, dtype=float) - PKW)
+
+
+def _log1p_ratio(u):
+    """Returns -log1p(-u) / u, which tends to 1 as u goes to 0."""
+    small = np.abs(u) < 1e-8
+    safe = np.where(small, 0.5, u)
+    return np.where(small, 1 + u / 2, -np.log1p(-safe) / safe)
+
+
+def log_concentration(time, ln_fe0, ln_k, s):
+    """
+    ln[Fe](t) of the closed-form solution.
+
+    Args:
+        - time (array): Time since the start of the trace.
+        - ln_fe0 (array): ln[Fe]0, broadcastable to time.
+        - ln_k (array): ln of the effective rate constant K = k [O2]^b [OH-]^c.
+        - s (array): 1 - a, where a is the order in Fe(II).
+
+    Returns:
+        ln[Fe] at every time.
+    """
+    q = np.exp(ln_k - s * ln_fe0) * time
+    u = np.minimum(s * q, U_MAX)
+    return ln_fe0 - q * _log1p_ratio(u)
+
+
+def log_concentration_jacobian(time, ln_fe0, ln_k, s):
+    """
+    ln[Fe](t) and its analytic derivatives.
+
+    Args:
+        - time (array): Time since the start of the trace.
+        - ln_fe0 (array): ln[Fe]0, broadcastable to time.
+        - ln_k (array): ln of the effective rate constant.
+        - s (array): 1 - a.
+
+    Returns:
+        tuple: ln[Fe], d/d ln[Fe]0, d/d lnK and d/ds, each shaped like time.
+    """
+    w = np.exp(ln_k) * time
+    q = w * np.exp(-s * ln_fe0)
+    u = np.minimum(s * q, U_MAX)
+    one_minus_u = 1 - u
+    value = ln_fe0 - q * _log1p_ratio(u)
+
+    d_ln_fe0 = 1 / one_minus_u
+    d_ln_k = -q / one_minus_u
+
+    # d/ds of log1p(-s q(s)) / s; the exact form cancels badly for small s, so use the series there
+    series = (np.abs(u) < SERIES_LIMIT) & (np.abs(s * ln_fe0) < SERIES_LIMIT)
+    safe_s = np.where(series, 1.0, s)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exact = (-u * (1 - s * ln_fe0) / one_minus_u - np.log1p(-u)) / (safe_s * safe_s)
+    approximate = (w * ln_fe0 - w * w / 2
+                   + 2 * s * (-w * ln_fe0 ** 2 / 2 + w * w * ln_fe0 - w ** 3 / 3))
+    d_s = np.where(series, approximate, exact)
+    return value, d_ln_fe0, d_ln_k, d_s
+
+
+def concentration(time, fe0, k_eff, order=1.0):
+    """
+    [Fe](t) for -d[Fe]/dt = K [Fe]^a, e.g. to plot a fitted curve.
+
+    Args:
+        - time (array-like): Time since the start of the trace.
+        - fe0 (float): Initial concentration.
+        - k_eff (float): Effective rate constant K = k [O2]^b [OH-]^c.
+        - order (float, optional): Order a in Fe(II). Defaults to 1.
+
+    Returns:
+        Concentrations at every time (zero once Fe(II) is used up).
+    """
+    time = np.asarray(time, dtype=float)
+    s = 1.0 - order
+    q = k_eff * time * fe0 ** -s
+    if s > 0:
+        spent = s * q >= 1
+        return np.where(spent, 0.0, np.exp(log_concentration(time, np.log(fe0), np.log(k_eff), s)))
+    return np.exp(log_concentration(time, np.log(fe0), np.log(k_eff), s))
+
+
+def _normal_equations(ids, n, jacobian, residual, free):
+    """Per-trace J^T J and J^T r from segment sums over the flat points."""
+    p = jacobian.shape[1]
+    jtj = np.empty((n, p, p))
+    jtr = np.empty((n, p))
+    for i in range(p):
+        jtr[:, i] = np.bincount(ids, weights=jacobian[:, i] * residual, minlength=n)
+        for j in range(i, p):
+            jtj[:, i, j] = jtj[:, j, i] = np.bincount(ids, weights=jacobian[:, i] * jacobian[:, j], minlength=n)
+    # Fixed parameters get an identity row so their step is zero
+    jtj *= free[:, :, None] & free[:, None, :]
+    jtr *= free
+    jtj[~free, :] = 0
+    for i in range(p):
+        jtj[~free[:, i], i, i] = 1.0
+    return jtj, jtr
+
+
+def _evaluate(t, ln_conc, ids, params, n):
+    """Residuals, Jacobian and cost of every trace for parameters (ln[Fe]0, lnK, s)."""
+    value, d_fe0, d_k, d_s = log_concentration_jacobian(t, params[ids, 0], params[ids, 1], params[ids, 2])
+    residual = value - ln_conc
+    cost = np.bincount(ids, weights=residual * residual, minlength=n)
+    return residual, np.column_stack((d_fe0, d_k, d_s)), cost
+
+
+def fit_rate_law(batch, pH=None, o2=None, order=None, o2_order=1.0, oh_order=2.0, max_iter=50, tol=1e-10):
+    """
+    Fits [Fe]0, the effective rate constant and the order in Fe(II) to every trace of a batch.
+
+    The orders in O2 and OH- cannot be identified from a single trace, where both are constant, so they are
+    held at the given values and only used to convert the effective rate constant of each trace into k.
+    Traces with fewer than four points keep the order in Fe(II) fixed at 1. Starting values come from the
+    linear fit of ln[Fe] against time (rate_const_batch).
+
+    Args:
+        - batch (TraceBatch): Traces of Fe(II) concentration against time.
+        - pH (float or array, optional): pH of every trace, used to compute k. Defaults to None.
+        - o2 (float or array, optional): O2 concentration of every trace, used to compute k. Defaults to None.
+        - order (float, optional): Fixed order in Fe(II). None fits it. Defaults to None.
+        - o2_order (float, optional): Order b in O2. Defaults to 1.
+        - oh_order (float, optional): Order c in OH-. Defaults to 2.
+        - max_iter (int, optional): Maximum number of Levenberg-Marquardt iterations. Defaults to 50.
+        - tol (float, optional): Relative cost decrease at which a trace counts as converged. Defaults to 1e-10.
+
+    Returns:
+        dict: Column-oriented table with one entry per trace in 'trace', 'fe0', 'k_eff', 'order', their
+        standard errors 'fe0_se', 'k_eff_se', 'order_se', 'k' (NaN without pH and O2), 'r_squared' of
+        ln[Fe], 'n_points' and 'converged'.
+    """
+    n = len(batch)
+    ids = batch.trace_ids()
+    t = batch.time - batch.first(batch.time)[ids]
+    valid = np.isfinite(batch.conc) & (batch.conc > 0)
+    if not np.all(valid):
+        keep = valid
+        counts = np.bincount(ids[keep], minlength=n)
+        batch = TraceBatch(batch.time[keep], batch.conc[keep], np.concatenate(([0], np.cumsum(counts))),
+                           batch.labels)
+        ids, t = ids[keep], t[keep]
+    lengths = batch.lengths
+
+    # Starting values: first-order fit of ln[Fe] against time
+    linear = rate_const_batch(batch)
+    params = np.empty((n, 3))
+    params[:, 0] = linear['intercept'] + linear['slope'] * batch.first(batch.time)
+    params[:, 1] = np.log(np.maximum(-linear['slope'], 1e-12))
+    params[:, 2] = 0.0 if order is None else 1.0 - order
+
+    free = np.ones((n, 3), dtype=bool)
+    if order is not None:
+        free[:, 2] = False
+    free[lengths < 4, 2] = False
+    free[lengths < 2, 1] = False
+
+    ln_conc = np.log(batch.conc)
+    damping = np.full(n, 1e-3)
+    converged = np.zeros(n, dtype=bool)
+    residual, jacobian, cost = _evaluate(t, ln_conc, ids, params, n)
+
+    for _ in range(max_iter):
+        # Only the points of traces that are still moving are evaluated
+        points = np.flatnonzero(~converged[ids])
+        active_ids = ids[points]
+        jtj, jtr = _normal_equations(active_ids, n, jacobian[points], residual[points], free)
+        diagonal = np.diagonal(jtj, axis1=1, axis2=2)
+        augmented = jtj + damping[:, None, None] * np.eye(3) * np.maximum(diagonal, 1e-12)[:, None, :]
+        step = -np.linalg.solve(augmented, jtr[:, :, None])[:, :, 0]
+        step[converged] = 0.0
+
+        trial = params + step
+        trial_residual, trial_jacobian, trial_cost = _evaluate(t[points], ln_conc[points], active_ids, trial, n)
+        better = np.isfinite(trial_cost) & (trial_cost <= cost) & ~converged
+
+        small_step = np.all(np.abs(step) <= np.sqrt(tol) * (np.abs(params) + np.sqrt(tol)), axis=1)
+        newly_converged = better & ((cost - trial_cost <= tol * np.maximum(cost, 1e-300)) | small_step)
+        params[better] = trial[better]
+        cost = np.where(better, trial_cost, cost)
+        accept = better[active_ids]
+        residual[points[accept]] = trial_residual[accept]
+        jacobian[points[accept]] = trial_jacobian[accept]
+        damping = np.where(better, damping / 10, damping * 10)
+        converged |= newly_converged | (damping > 1e12)
+        if np.all(converged):
+            break
+
+    # Standard errors from the covariance at the optimum
+    jtj, _ = _normal_equations(ids, n, jacobian, residual, free)
+    n_free = free.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = cost / (lengths - n_free)
+        covariance = np.linalg.pinv(jtj) * sigma2[:, None, None]
+    variance = np.diagonal(covariance, axis1=1, axis2=2) * free
+    se = np.sqrt(np.maximum(variance, 0))
+
+    fe0 = np.exp(params[:, 0])
+    k_eff = np.exp(params[:, 1])
+    mean_ln = np.bincount(ids, weights=ln_conc, minlength=n) / lengths
+    ss_tot = np.bincount(ids, weights=(ln_conc - mean_ln[ids]) ** 2, minlength=n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_squared = 1 - cost / ss_tot
+
+    if pH is not None and o2 is not None:
+        ln_k = params[:, 1] - o2_order * np.log(np.asarray(o2, dtype=float)) - oh_order * ln_hydroxide(pH)
+        k = np.exp(ln_k)
+    else:
+        k = np.full(n, np.nan)
+
+    return {
+        'trace': batch.labels,
+        'fe0': fe0,
+        'k_eff': k_eff,
+        'order': 1.0 - params[:, 2],
+        'fe0_se': fe0 * se[:, 0],
+        'k_eff_se': k_eff * se[:, 1],
+        'order_se': se[:, 2],
+        'k': k,
+        'r_squared': r_squared,
+        'n_points': lengths,
+        'converged': converged,
+    }
+
+
+def fit_trace(time, conc, pH=None, o2=None, order=None, **options):
+    """
+    Fits the rate law to one trace, the nonlinear counterpart of rate_const.calculate_rate.
+
+    Args:
+        - time (array-like): Array of time values.
+        - conc (array-like): Array of Fe(II) concentration values.
+        - pH (float, optional): pH of the experiment. Defaults to None.
+        - o2 (float, optional): O2 concentration of the experiment. Defaults to None.
+        - order (float, optional): Fixed order in Fe(II). None fits it. Defaults to None.
+        - **options: Passed on to fit_rate_law.
+
+    Returns:
+        dict: The fitted values of the trace, see fit_rate_law.
+    """
+    batch = TraceBatch.from_traces([(time, conc)])
+    result = fit_rate_law(batch, pH=pH, o2=o2, order=order, **options)
+    return {key: (value[0].item() if isinstance(value, np.ndarray) else value[0]) for key, value in result.items()}
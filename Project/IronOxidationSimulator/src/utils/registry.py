@@ -0,0 +1,114 @@
+"""
+registry.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Lazy loading of the analysis modules.
+The analysis modules pull in pandas, scikit-learn and matplotlib, which take seconds to import. The GUI
+refers to them through this registry so they are only imported when an analysis or plot first runs, and the
+main window can paint without them.
+"""
+
+import importlib
+import sys
+import threading
+
+# Feature name -> module in src.utils that implements it
+ANALYSIS_MODULES = {
+    "reaction order analysis": "regression_analysis",
+    "initial rate analysis": "initial_rate",
+    "rate const analysis": "rate_const",
+    "3D plane plot": "plane3D_plot",
+}
+
+# First imports are serialised: several worker threads may ask for the same heavy module at once
+_import_lock = threading.RLock()
+
+
+class LazyModule:
+    """
+    A stand-in for a src.utils module that imports it on first attribute access.
+
+    Attributes:
+        - name (str): Name of the module inside src.utils.
+    """
+
+    def __init__(self, name):
+        """
+        Initializes the stand-in without importing anything.
+
+        Args:
+            - name (str): Name of the module inside src.utils, e.g. "initial_rate".
+        """
+        self.name = name
+
+    def __getattr__(self, attribute):
+        """Imports the module (once) and returns the requested attribute."""
+        return getattr(get_module(self.name), attribute)
+
+    def __repr__(self):
+        """Returns a representation showing the wrapped module."""
+        return f"<LazyModule {__package__}.{self.name}>"
+
+
+def get_module(name):
+    """
+    Imports a module of src.utils. Later calls return the already imported module.
+
+    The name is only known at runtime, so PyInstaller cannot follow these imports; the build collects them
+    with --collect-submodules src.utils (see .github/workflows/main.yml).
+
+    Args:
+        - name (str): Name of the module inside src.utils.
+
+    Returns:
+        module: The imported module.
+    """
+    full_name = f"{__package__}.{name}"
+    module = sys.modules.get(full_name)
+    if module is not None:
+        return module
+    with _import_lock:
+        return importlib.import_module(full_name)
+
+
+def lazy_module(name):
+    """
+    Returns a stand-in that imports a module of src.utils on first use.
+
+    Args:
+        - name (str): Name of the module inside src.utils.
+
+    Returns:
+        LazyModule: The stand-in.
+    """
+    return LazyModule(name)
+
+
+def analysis_module(option):
+    """
+    Imports the module implementing a feature.
+
+    Args:
+        - option (str): Feature name, see ANALYSIS_MODULES.
+
+    Returns:
+        module: The analysis module.
+    """
+    return get_module(ANALYSIS_MODULES[option])
+
+
+def read_data(option, filename):
+    """
+    Reads a data file with the reader of a feature, importing the feature's module if needed.
+
+    Args:
+        - option (str): Feature name, see ANALYSIS_MODULES.
+        - filename (str): Path to the data file.
+
+    Returns:
+        The data returned by the module's read_data, or None if an error occurs.
+    """
+    return analysis_module(option).read_data(filename)
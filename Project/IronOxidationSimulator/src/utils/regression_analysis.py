@@ -3,15 +3,17 @@ regression_analysis.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-06-28
-Modified: 2023-08-17
+Modified: 2026-10-18
 """
 
-from PyQt5.QtGui import QPixmap, QImage
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from matplotlib.figure import Figure
 import numpy as np
-import pandas as pd
 from sklearn.linear_model import LinearRegression
 
+from .memo import memoize
+from .render import figure_to_pixmap
+from .workbook import read_table
+
 
 def read_data(filename):
     """
@@ -20,13 +22,19 @@ def read_data(filename):
     Args:
         - filename (str): Path to the Excel file.
 
+    The first two columns hold the initial concentrations and rates. If the file has at least four columns,
+    the third and fourth hold their standard deviations, which the weighted regressions use.
+
     Returns:
         Data extracted from the file or None if an error occurs.
     """
     try:
-        data = pd.read_excel(filename)
+        data = read_table(filename)
         initial_concentration = data.iloc[:, 0].values
         initial_rate = data.iloc[:, 1].values
+        if data.shape[1] >= 4:
+            # Optional third and fourth columns: standard deviations of the concentration and the rate
+            return initial_concentration, initial_rate, data.iloc[:, 2].values, data.iloc[:, 3].values
         return initial_concentration, initial_rate
     except Exception as e:
         print(f"Error reading file {filename}: {e}")
@@ -47,6 +55,7 @@ def calculate_log_values(initial_concentration, initial_rate):
     return np.log(initial_concentration), np.log(initial_rate)
 
 
+@memoize("regression_analysis.calculate_regression")
 def calculate_regression(log_concentration, log_rate):
     """
     Calculates the linear regression of the log values using sklearn.
@@ -66,9 +75,178 @@ def calculate_regression(log_concentration, log_rate):
     return slope, intercept, r_squared
 
 
-def plot_regression(log_concentration, log_rate, slope, intercept, r_squared, label, color, ax, fig):
+def calculate_log_errors(values, errors):
     """
-    Plots the data and the regression line.
+    Propagates standard deviations through the natural log used by calculate_log_values.
+
+    Args:
+        - values (array-like): Initial concentrations or rates.
+        - errors (array-like): Their standard deviations.
+
+    Returns:
+        Standard deviations of the log values.
+    """
+    return np.abs(np.asarray(errors, dtype=float) / np.asarray(values, dtype=float))
+
+
+def _prepare_weighted(x, y, *errors):
+    """
+    Brings data and errors to 2D arrays of shape (datasets, points) and masks missing points.
+
+    Missing points (NaN in the data or the errors) get zero values so they drop out of every weighted sum.
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    shape = np.broadcast_shapes(x.shape, y.shape)
+    x = np.broadcast_to(x, shape)
+    y = np.broadcast_to(y, shape)
+    errors = [np.zeros(shape) if error is None else np.broadcast_to(np.asarray(error, dtype=float), shape)
+              for error in errors]
+    valid = np.isfinite(x) & np.isfinite(y)
+    for error in errors:
+        valid &= np.isfinite(error)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    errors = [np.where(valid, error, 0.0) for error in errors]
+    return x, y, errors, valid
+
+
+def _weighted_fit(x, y, w):
+    """Weighted means, variances and covariance, and the resulting line, along the last axis."""
+    sum_w = w.sum(axis=-1)
+    mean_x = (w * x).sum(axis=-1) / sum_w
+    mean_y = (w * y).sum(axis=-1) / sum_w
+    dx = x - mean_x[:, None]
+    dy = y - mean_y[:, None]
+    var_x = (w * dx * dx).sum(axis=-1) / sum_w
+    var_y = (w * dy * dy).sum(axis=-1) / sum_w
+    cov_xy = (w * dx * dy).sum(axis=-1) / sum_w
+    slope = cov_xy / var_x
+    intercept = mean_y - slope * mean_x
+    return slope, intercept, sum_w, var_x, var_y, cov_xy
+
+
+def _finish(x, values):
+    """Returns floats for a single 1D dataset and arrays for several datasets."""
+    if np.ndim(x) <= 1:
+        return tuple(float(value[0]) for value in values)
+    return values
+
+
+def weighted_regression(log_concentration, log_rate, log_concentration_sd=None, log_rate_sd=None):
+    """
+    Weighted least-squares regression of the log values, as in assets/reaction_order_analysis_WLSR.m.
+
+    Each point is weighted by 1 / (sd_x^2 + sd_y^2). Without any standard deviations all weights are one,
+    which gives the ordinary least-squares line of calculate_regression.
+
+    Several datasets can be fitted in one call by passing 2D arrays of shape (datasets, points); datasets
+    with fewer points are padded with NaN.
+
+    Args:
+        - log_concentration (array-like): The log concentration data.
+        - log_rate (array-like): The log rate data.
+        - log_concentration_sd (array-like, optional): Standard deviations of the log concentrations.
+          Defaults to None.
+        - log_rate_sd (array-like, optional): Standard deviations of the log rates. Defaults to None.
+
+    Returns:
+        Slope (reaction order), intercept, weighted R-squared and the standard errors of the slope and
+        intercept. Floats for one dataset, arrays with one value per dataset otherwise.
+    """
+    x, y, (sx, sy), valid = _prepare_weighted(log_concentration, log_rate, log_concentration_sd, log_rate_sd)
+    if log_concentration_sd is None and log_rate_sd is None:
+        w = valid.astype(float)
+    else:
+        with np.errstate(divide='ignore'):
+            w = np.where(valid, 1.0 / (sx ** 2 + sy ** 2), 0.0)
+
+    slope, intercept, sum_w, var_x, var_y, cov_xy = _weighted_fit(x, y, w)
+    n = valid.sum(axis=-1)
+    residuals = y - intercept[:, None] - slope[:, None] * x
+    mse = (w * residuals ** 2).sum(axis=-1) / sum_w
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se_slope = np.sqrt(mse / var_x / (n - 2))
+        se_intercept = se_slope * np.sqrt((w * x ** 2).sum(axis=-1) / sum_w)
+    r_squared = cov_xy ** 2 / (var_x * var_y)
+    return _finish(log_concentration, (slope, intercept, r_squared, se_slope, se_intercept))
+
+
+def york_regression(log_concentration, log_rate, log_concentration_sd, log_rate_sd, correlation=0.0,
+                    tol=1e-12, max_iter=100):
+    """
+    Errors-in-variables regression of the log values after York et al. (2004).
+
+    Unlike weighted_regression, the weight of each point depends on the slope, so both the x and the y
+    errors are accounted for properly. The slope is found by fixed-point iteration starting from the
+    weighted least-squares slope; all datasets are iterated together.
+
+    Several datasets can be fitted in one call by passing 2D arrays of shape (datasets, points); datasets
+    with fewer points are padded with NaN.
+
+    Args:
+        - log_concentration (array-like): The log concentration data.
+        - log_rate (array-like): The log rate data.
+        - log_concentration_sd (array-like): Standard deviations of the log concentrations.
+        - log_rate_sd (array-like): Standard deviations of the log rates.
+        - correlation (float or array-like, optional): Correlation between the x and y errors. Defaults to 0.
+        - tol (float, optional): Relative change of the slope at which the iteration stops. Defaults to 1e-12.
+        - max_iter (int, optional): Maximum number of iterations. Defaults to 100.
+
+    Returns:
+        Slope (reaction order), intercept, weighted R-squared and the standard errors of the slope and
+        intercept. Floats for one dataset, arrays with one value per dataset otherwise.
+    """
+    x, y, (sx, sy, r), valid = _prepare_weighted(log_concentration, log_rate, log_concentration_sd,
+                                                 log_rate_sd, correlation)
+    sx2, sy2, rxy = sx ** 2, sy ** 2, r * sx * sy
+
+    with np.errstate(divide='ignore'):
+        w0 = np.where(valid, 1.0 / (sx2 + sy2), 0.0)
+    slope = _weighted_fit(x, y, w0)[0]
+
+    for _ in range(max_iter):
+        b = slope[:, None]
+        with np.errstate(divide='ignore'):
+            w = np.where(valid, 1.0 / (sy2 + b * b * sx2 - 2 * b * rxy), 0.0)
+        sum_w = w.sum(axis=-1)
+        mean_x = (w * x).sum(axis=-1) / sum_w
+        mean_y = (w * y).sum(axis=-1) / sum_w
+        u = x - mean_x[:, None]
+        v = y - mean_y[:, None]
+        beta = w * (u * sy2 + b * v * sx2 - (b * u + v) * rxy)
+        new_slope = (w * beta * v).sum(axis=-1) / (w * beta * u).sum(axis=-1)
+        converged = np.all(np.abs(new_slope - slope) <= tol * np.abs(new_slope))
+        slope = new_slope
+        if converged:
+            break
+
+    b = slope[:, None]
+    with np.errstate(divide='ignore'):
+        w = np.where(valid, 1.0 / (sy2 + b * b * sx2 - 2 * b * rxy), 0.0)
+    sum_w = w.sum(axis=-1)
+    mean_x = (w * x).sum(axis=-1) / sum_w
+    mean_y = (w * y).sum(axis=-1) / sum_w
+    u = x - mean_x[:, None]
+    v = y - mean_y[:, None]
+    beta = w * (u * sy2 + b * v * sx2 - (b * u + v) * rxy)
+    intercept = mean_y - slope * mean_x
+
+    # Standard errors from the adjusted x values
+    adjusted_x = mean_x[:, None] + beta
+    mean_adjusted = (w * adjusted_x).sum(axis=-1) / sum_w
+    spread = (w * (adjusted_x - mean_adjusted[:, None]) ** 2).sum(axis=-1)
+    se_slope = np.sqrt(1.0 / spread)
+    se_intercept = np.sqrt(1.0 / sum_w + mean_adjusted ** 2 * se_slope ** 2)
+
+    r_squared = (w * u * v).sum(axis=-1) ** 2 / ((w * u * u).sum(axis=-1) * (w * v * v).sum(axis=-1))
+    return _finish(log_concentration, (slope, intercept, r_squared, se_slope, se_intercept))
+
+
+def regression_figure(log_concentration, log_rate, slope, intercept, r_squared, label, color,
+                      standard_errors=None):
+    """
+    Builds a figure of the data and the regression line. Safe to call from a worker thread.
 
     Args:
         - log_concentration (array-like): The log concentration data.
@@ -78,27 +256,68 @@ def plot_regression(log_concentration, log_rate, slope, intercept, r_squared, la
         - r_squared (float): R-squared value.
         - label (str): Label for the plot.
         - color (str): Color for the plot.
-        - ax (matplotlib.axes.Axes): Axes object to draw the plot onto.
-        - fig (matplotlib.figure.Figure): Figure object containing the Axes.
+        - standard_errors (tuple, optional): Standard errors of the slope and intercept. Defaults to None.
 
     Returns:
-        PyQt5.QtGui.QPixmap: QPixmap representation of the plot.
+        matplotlib.figure.Figure: The plot.
     """
+    fig = Figure()
+    ax = fig.add_subplot(111)
+    draw_regression(log_concentration, log_rate, slope, intercept, r_squared, label, color, ax, standard_errors)
+    return fig
+
+
+def draw_regression(log_concentration, log_rate, slope, intercept, r_squared, label, color, ax,
+                    standard_errors=None):
+    """
+    Draws the data and the regression line onto existing axes.
+
+    Args:
+        - log_concentration (array-like): The log concentration data.
+        - log_rate (array-like): The log rate data.
+        - slope (float): Slope of the regression line.
+        - intercept (float): Intercept of the regression line.
+        - r_squared (float): R-squared value.
+        - label (str): Label for the plot.
+        - color (str): Color for the plot.
+        - ax (matplotlib.axes.Axes): Axes object to draw the plot onto.
+        - standard_errors (tuple, optional): Standard errors of the slope and intercept, shown next to them.
+          Defaults to None.
+    """
+    if standard_errors is not None:
+        se_slope, se_intercept = standard_errors
+        equation = f"log[R0] = ({slope:.2f}±{se_slope:.2f})log[X] + ({intercept:.2f}±{se_intercept:.2f})"
+    else:
+        equation = f"log[R0] = ({slope:.2f})log[X] + ({intercept:.2f})"
     ax.plot(log_concentration, log_rate, 'o', color=color)
     ax.plot([np.min(log_concentration), np.max(log_concentration)],
             [slope * np.min(log_concentration) + intercept, slope * np.max(log_concentration) + intercept],
             '-', color=color)
     ax.text(0.02, 0.98,
-            f"{label}: log[R0] = ({slope:.2f})log[X] + ({intercept:.2f})",
+            f"{label}: {equation}",
             transform=ax.transAxes, verticalalignment='top', color=color)
 
     ax.set_xlabel('log([X], μM)')
     ax.set_ylabel('log(R0, μMs^-1)')
 
-    canvas = FigureCanvas(fig)
-    canvas.draw()
-    width, height = fig.get_size_inches() * fig.get_dpi()
-    image = QImage(canvas.buffer_rgba(), width, height, QImage.Format_ARGB32)
-    pixmap = QPixmap.fromImage(image)
 
-    return pixmap
+def plot_regression(log_concentration, log_rate, slope, intercept, r_squared, label, color, ax, fig):
+    """
+    Plots the data and the regression line.
+
+    Args:
+        - log_concentration (array-like): The log concentration data.
+        - log_rate (array-like): The log rate data.
+        - slope (float): Slope of the regression line.
+        - intercept (float): Intercept of the regression line.
+        - r_squared (float): R-squared value.
+        - label (str): Label for the plot.
+        - color (str): Color for the plot.
+        - ax (matplotlib.axes.Axes): Axes object to draw the plot onto.
+        - fig (matplotlib.figure.Figure): Figure object containing the Axes.
+
+    Returns:
+        PyQt5.QtGui.QPixmap: QPixmap representation of the plot.
+    """
+    draw_regression(log_concentration, log_rate, slope, intercept, r_squared, label, color, ax)
+    return figure_to_pixmap(fig)
@@ -0,0 +1,166 @@
+"""
+render.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Rendering of matplotlib figures to images.
+Figures are drawn with the Agg backend into raw RGBA bytes, which is safe on a worker thread as long as the
+figure is a matplotlib.figure.Figure (not created through pyplot). Only the final conversion to QPixmap has
+to happen on the GUI thread. Rendered images are kept in an LRU cache keyed by a hash of the data and plot
+parameters, so showing or saving the same results again does not redraw them.
+"""
+
+import threading
+from collections import OrderedDict
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PyQt5.QtGui import QImage, QPixmap
+
+
+class RenderedImage:
+    """
+    An RGBA image rendered by Agg.
+
+    Attributes:
+        - data (bytes): Pixel data, 4 bytes per pixel, row by row.
+        - width (int): Width in pixels.
+        - height (int): Height in pixels.
+    """
+
+    def __init__(self, data, width, height):
+        """
+        Initializes the image.
+
+        Args:
+            - data (bytes): RGBA pixel data.
+            - width (int): Width in pixels.
+            - height (int): Height in pixels.
+        """
+        self.data = data
+        self.width = width
+        self.height = height
+
+    @property
+    def nbytes(self):
+        """Size of the pixel data in bytes."""
+        return len(self.data)
+
+    def to_qimage(self):
+        """Returns a QImage owning a copy of the pixels. Safe to call from any thread."""
+        image = QImage(self.data, self.width, self.height, 4 * self.width, QImage.Format_RGBA8888)
+        return image.copy()
+
+    def to_pixmap(self):
+        """Returns a QPixmap of the image. Must be called on the GUI thread."""
+        return QPixmap.fromImage(self.to_qimage())
+
+
+def render_figure(fig):
+    """
+    Draws a figure with Agg.
+
+    Args:
+        - fig (matplotlib.figure.Figure): Figure to draw.
+
+    Returns:
+        RenderedImage: The rendered pixels.
+    """
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    buffer = canvas.buffer_rgba()
+    height, width = buffer.shape[:2]
+    return RenderedImage(bytes(buffer), int(width), int(height))
+
+
+def figure_to_pixmap(fig):
+    """
+    Draws a figure with Agg and converts it to a QPixmap on the calling (GUI) thread.
+
+    Args:
+        - fig (matplotlib.figure.Figure): Figure to draw.
+
+    Returns:
+        QPixmap: The rendered figure.
+    """
+    return render_figure(fig).to_pixmap()
+
+
+class RenderCache:
+    """
+    A thread-safe LRU cache of rendered images, bounded by the total size of their pixel data.
+
+    Attributes:
+        - max_bytes (int): Memory cap for the cached pixel data.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 ** 2):
+        """
+        Initializes an empty cache.
+
+        Args:
+            - max_bytes (int, optional): Memory cap in bytes. Defaults to 64 MB.
+        """
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Looks up an image.
+
+        Args:
+            - key (str): Key from hashing.content_key.
+
+        Returns:
+            RenderedImage or None if it is not cached.
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        """
+        Stores an image and evicts the least recently used ones beyond the memory cap.
+
+        Args:
+            - key (str): Key from hashing.content_key.
+            - image (RenderedImage): Rendered image.
+        """
+        if image.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                self._size -= self._images.pop(key).nbytes
+            self._images[key] = image
+            self._size += image.nbytes
+            while self._size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def set_max_bytes(self, max_bytes):
+        """
+        Changes the memory cap, evicting images if needed.
+
+        Args:
+            - max_bytes (int): New memory cap in bytes.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._images and self._size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def clear(self):
+        """Removes every cached image."""
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+
+    def __len__(self):
+        """Returns the number of cached images."""
+        return len(self._images)
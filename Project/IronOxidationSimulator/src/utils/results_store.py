@@ -0,0 +1,439 @@
+"""
+results_store.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Local SQLite store of analysis results.
+Every save from the GUI and every batch run adds a run to the store instead of only overwriting loose CSV
+files, so results can be queried across experiments, e.g. all rate constants between pH 7 and 8 with an R
+squared above 0.99:
+
+    with ResultsStore() as store:
+        table = store.query("rate const analysis", ph=(7, 8), min_r_squared=0.99)
+
+Schema:
+    - runs: one row per save or analysed file, with its source, SHA-256 of the data file and timestamp.
+    - fits: one row per analysis and method of a run, with the fitted slope, intercept, R squared, standard
+      errors, pH coefficient and the pH and initial Fe(II) concentration of the data.
+    - parameters: named values of a fit, such as the initial rate threshold or the confidence interval of
+      the slope.
+
+Fits are indexed by analysis, pH and R squared, and by initial concentration, so range queries stay in the
+millisecond range for hundreds of thousands of runs. Runs are written in batches, one transaction per batch.
+"""
+
+import math
+import os
+import sqlite3
+import time as timer
+
+import numpy as np
+import pandas as pd
+
+from . import workbook
+
+DB_ENV = "IRON_OXIDATION_DB"
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".iron_oxidation", "results.sqlite")
+SCHEMA_VERSION = 1
+# Page cache and memory map of the connection; range queries over large stores are dominated by page reads
+CACHE_BYTES = 64 * 1024 ** 2
+MMAP_BYTES = 256 * 1024 ** 2
+
+FIT_COLUMNS = ["analysis", "method", "slope", "intercept", "r_squared", "se_slope", "se_intercept",
+               "ph_coefficient", "ph", "fe0", "seconds", "error"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT,
+    file_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS fits (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    analysis TEXT NOT NULL,
+    method TEXT NOT NULL,
+    slope REAL,
+    intercept REAL,
+    r_squared REAL,
+    se_slope REAL,
+    se_intercept REAL,
+    ph_coefficient REAL,
+    ph REAL,
+    fe0 REAL,
+    seconds REAL,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    fit_id INTEGER NOT NULL REFERENCES fits(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (fit_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fits_analysis_ph ON fits (analysis, ph, r_squared);
+CREATE INDEX IF NOT EXISTS fits_analysis_r_squared ON fits (analysis, r_squared);
+CREATE INDEX IF NOT EXISTS fits_analysis_fe0 ON fits (analysis, fe0);
+CREATE INDEX IF NOT EXISTS fits_run ON fits (run_id);
+CREATE INDEX IF NOT EXISTS runs_file_hash ON runs (file_hash);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+"""
+
+
+def default_path():
+    """Returns the store used by the GUI: IRON_OXIDATION_DB if set, otherwise ~/.iron_oxidation/results.sqlite."""
+    return os.environ.get(DB_ENV) or DEFAULT_PATH
+
+
+def _value(value):
+    """Converts a result value to a float, or None for missing values."""
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def file_ph(filename):
+    """
+    Reads the pH of a data file from a "pH" column whose rows all agree.
+
+    Args:
+        - filename (str): Path to the data file.
+
+    Returns:
+        float: The pH, or None if the file has no single pH.
+    """
+    try:
+        table = workbook.read_table(filename)
+    except Exception:
+        return None
+    for column in table.columns:
+        if str(column).strip().lower() == "ph":
+            values = pd.to_numeric(table[column], errors="coerce").dropna().unique()
+            if len(values) == 1:
+                return float(values[0])
+    return None
+
+
+def file_metadata(filename):
+    """
+    Reads the metadata stored with a run of a data file.
+
+    Args:
+        - filename (str): Path to the data file.
+
+    Returns:
+        dict: "file_hash" (SHA-256, None if the file cannot be read) and "ph" (see file_ph).
+    """
+    try:
+        file_hash = workbook.file_hash(filename)
+    except OSError:
+        file_hash = None
+    return {"file_hash": file_hash, "ph": file_ph(filename)}
+
+
+def _interval_parameters(interval):
+    """Stores a confidence interval of the slope (see bootstrap.confidence_interval) as fit parameters."""
+    if interval is None:
+        return {}
+    low, high = interval['slope_ci']
+    return {"slope_ci_low": low, "slope_ci_high": high, "confidence": interval['confidence']}
+
+
+def fits_from_result(result, ph=None):
+    """
+    Converts the results shown in the GUI (ButtonArea.result) into fit records.
+
+    Args:
+        - result (dict): Analysis results, keyed by feature and method.
+        - ph (float, optional): pH of the data, if known. Defaults to None.
+
+    Returns:
+        list of dict: One record per analysis and method, with the keys of FIT_COLUMNS and "parameters".
+    """
+    fits = []
+
+    def add(analysis, method, slope, intercept, r_squared, fe0=None, parameters=None, **values):
+        record = dict.fromkeys(FIT_COLUMNS)
+        record.update(analysis=analysis, method=method, slope=slope, intercept=intercept, r_squared=r_squared,
+                      ph=ph, fe0=fe0, error="", parameters=parameters or {}, **values)
+        fits.append(record)
+
+    for option, option_result in result.items():
+        for method, method_result in option_result.items():
+            if option == "reaction order analysis":
+                standard_errors = tuple(method_result[5:7]) or (None, None)
+                add(option, method, *method_result[2:5],
+                    parameters=_interval_parameters(method_result[7] if len(method_result) > 7 else None),
+                    se_slope=standard_errors[0], se_intercept=standard_errors[1])
+            elif option == "initial rate analysis":
+                fe0 = method_result['conc'][0] if len(method_result['conc']) else None
+                if 'slopes' in method_result:
+                    thresholds = np.arange(0.05, 0.2, 0.01)
+                    for threshold, slope, intercept, r_squared in zip(
+                            thresholds, method_result['slopes'], method_result['intercepts'],
+                            method_result['r_squared_values']):
+                        add(option, f"Threshold {threshold:.2f}", slope, intercept, r_squared, fe0,
+                            {"threshold": threshold})
+                else:
+                    add(option, method, method_result['slope'], method_result['intercept'],
+                        method_result['r_squared'], fe0)
+            elif option == "rate const analysis":
+                ln_conc = method_result['ln_conc']
+                add(option, method, method_result['slope'], method_result['intercept'],
+                    method_result['r_squared'], np.exp(ln_conc[0]) if len(ln_conc) else None,
+                    _interval_parameters(method_result.get('interval')))
+            elif option == "3D plane plot":
+                params, r_squared = method_result[3], method_result[4]
+                add(option, method, params[1], params[0], r_squared, ph_coefficient=params[2])
+    return fits
+
+
+def runs_from_table(table, kind="batch"):
+    """
+    Groups the batch result table (see batch.run_batch) into one run per file.
+
+    Args:
+        - table (pandas.DataFrame): Consolidated result table.
+        - kind (str, optional): Kind recorded with the runs. Defaults to "batch".
+
+    Returns:
+        list of dict: Runs for ResultsStore.add_runs.
+    """
+    runs = []
+    for filename, rows in table.groupby("file", sort=False):
+        try:
+            file_hash = workbook.file_hash(filename)
+        except OSError:
+            file_hash = None
+        fits = []
+        for row in rows.to_dict("records"):
+            fit = {column: row.get(column) for column in FIT_COLUMNS}
+            fit["parameters"] = {}
+            if row.get("method", "").startswith("Threshold "):
+                fit["parameters"]["threshold"] = float(row["method"].split()[1])
+            for name in ("slope_ci_low", "slope_ci_high"):
+                if name in row and pd.notna(row[name]):
+                    fit["parameters"][name] = float(row[name])
+            fits.append(fit)
+        runs.append({"kind": kind, "source": filename, "file_hash": file_hash, "fits": fits})
+    return runs
+
+
+class ResultsStore:
+    """
+    A SQLite database of analysis runs.
+
+    Attributes:
+        - path (str): Path of the database file.
+        - connection (sqlite3.Connection): Open connection.
+    """
+
+    def __init__(self, path=None):
+        """
+        Opens (and if needed creates) a store.
+
+        Args:
+            - path (str, optional): Database file, or ":memory:". Defaults to default_path().
+        """
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if self.path != ":memory:":
+            # Readers do not block the writer, and commits do not wait for a full sync
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+            self.connection.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+        self.connection.execute(f"PRAGMA cache_size = -{CACHE_BYTES // 1024}")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """Closes the connection."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def add_run(self, fits, kind="gui", source=None, file_hash=None, created=None):
+        """
+        Adds one run.
+
+        Args:
+            - fits (list of dict): Fit records, see fits_from_result.
+            - kind (str, optional): Where the run comes from, e.g. "gui" or "batch". Defaults to "gui".
+            - source (str, optional): Data file or other description of the input. Defaults to None.
+            - file_hash (str, optional): SHA-256 of the data file. Defaults to None.
+            - created (float, optional): Unix time of the run. Defaults to now.
+
+        Returns:
+            int: Id of the run.
+        """
+        return self.add_runs([{"fits": fits, "kind": kind, "source": source, "file_hash": file_hash,
+                               "created": created}])[0]
+
+    def add_runs(self, runs, batch_size=10000):
+        """
+        Adds many runs, committing one transaction per batch_size runs.
+
+        Args:
+            - runs (iterable of dict): Runs with "fits" and optionally "kind", "source", "file_hash" and
+              "created", see add_run.
+            - batch_size (int, optional): Runs per transaction. Defaults to 10000.
+
+        Returns:
+            list of int: Ids of the runs.
+        """
+        ids = []
+        batch = []
+        for run in runs:
+            batch.append(run)
+            if len(batch) >= batch_size:
+                ids.extend(self._insert(batch))
+                batch = []
+        if batch:
+            ids.extend(self._insert(batch))
+        return ids
+
+    def _insert(self, runs):
+        """Writes runs in one transaction."""
+        now = timer.time()
+        run_rows, fit_rows, parameter_rows = [], [], []
+        with self.connection:
+            cursor = self.connection.cursor()
+            # Take the write lock first, so the ids below cannot be claimed by another writer
+            cursor.execute("BEGIN IMMEDIATE")
+            run_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+            fit_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM fits").fetchone()[0]
+            for run in runs:
+                run_id += 1
+                run_rows.append((run_id, run.get("created") or now, run.get("kind") or "gui", run.get("source"),
+                                 run.get("file_hash")))
+                for fit in run["fits"]:
+                    fit_id += 1
+                    fit_rows.append((fit_id, run_id, fit.get("analysis") or "", fit.get("method") or "")
+                                    + tuple(_value(fit.get(column)) for column in FIT_COLUMNS[2:-1])
+                                    + (fit.get("error") or "",))
+                    parameter_rows.extend((fit_id, name, _value(value))
+                                          for name, value in (fit.get("parameters") or {}).items())
+            cursor.executemany("INSERT INTO runs (id, created, kind, source, file_hash) VALUES (?, ?, ?, ?, ?)",
+                               run_rows)
+            cursor.executemany(f"INSERT INTO fits (id, run_id, {', '.join(FIT_COLUMNS)}) "
+                               f"VALUES ({', '.join('?' * (len(FIT_COLUMNS) + 2))})", fit_rows)
+            cursor.executemany("INSERT INTO parameters (fit_id, name, value) VALUES (?, ?, ?)", parameter_rows)
+        return [row[0] for row in run_rows]
+
+    def query(self, analysis=None, method=None, ph=None, fe0=None, min_r_squared=None, file_hash=None,
+              include_errors=False, limit=None):
+        """
+        Finds fits matching all given conditions.
+
+        Args:
+            - analysis (str, optional): Analysis name, e.g. "rate const analysis". Defaults to None.
+            - method (str, optional): Method name. Defaults to None.
+            - ph (tuple, optional): Inclusive (low, high) pH range. Defaults to None.
+            - fe0 (tuple, optional): Inclusive (low, high) range of the initial concentration. Defaults to None.
+            - min_r_squared (float, optional): Lowest accepted R squared. Defaults to None.
+            - file_hash (str, optional): Only runs of this data file. Defaults to None.
+            - include_errors (bool, optional): Include analyses that failed. Defaults to False.
+            - limit (int, optional): Maximum number of rows. Defaults to None.
+
+        Returns:
+            pandas.DataFrame: One row per fit, in the order they were added, with the fit id (see parameters)
+            and the run's id, creation time, kind, source and file hash.
+        """
+        conditions, values = [], []
+        for column, value in (("f.analysis", analysis), ("f.method", method), ("r.file_hash", file_hash)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        for column, bounds in (("f.ph", ph), ("f.fe0", fe0)):
+            if bounds is not None:
+                conditions.append(f"{column} BETWEEN ? AND ?")
+                values.extend(float(bound) for bound in bounds)
+        if min_r_squared is not None:
+            conditions.append("f.r_squared >= ?")
+            values.append(float(min_r_squared))
+        if not include_errors:
+            conditions.append("f.error = ''")
+
+        sql = (f"SELECT f.id AS fit_id, r.id AS run_id, r.created, r.kind, r.source, r.file_hash, "
+               f"{', '.join('f.' + column for column in FIT_COLUMNS)} "
+               f"FROM fits f JOIN runs r ON r.id = f.run_id")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if limit is not None:
+            sql += f" ORDER BY f.id LIMIT {int(limit)}"
+        cursor = self.connection.execute(sql, values)
+        columns = [description[0] for description in cursor.description]
+        table = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        # Sorting here is cheaper than an ORDER BY, which makes SQLite sort the rows in a temporary tree
+        return table.sort_values("fit_id", kind="stable", ignore_index=True)
+
+    def parameters(self, fit_ids):
+        """
+        Returns the parameters of fits.
+
+        Args:
+            - fit_ids (list of int): Ids of the fits.
+
+        Returns:
+            dict: Fit id -> {name: value}.
+        """
+        result = {}
+        fit_ids = [int(fit_id) for fit_id in fit_ids]
+        for start in range(0, len(fit_ids), 900):
+            chunk = fit_ids[start:start + 900]
+            rows = self.connection.execute(
+                f"SELECT fit_id, name, value FROM parameters WHERE fit_id IN ({', '.join('?' * len(chunk))})",
+                chunk)
+            for fit_id, name, value in rows:
+                result.setdefault(fit_id, {})[name] = value
+        return result
+
+    def count(self):
+        """
+        Returns the number of runs and fits in the store.
+
+        Returns:
+            tuple: (runs, fits).
+        """
+        runs = self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        fits = self.connection.execute("SELECT COUNT(*) FROM fits").fetchone()[0]
+        return runs, fits
+
+
+def record_result(result, source=None, ph=None, path=None):
+    """
+    Adds the results of a GUI session to a store as one run.
+
+    Args:
+        - result (dict): Analysis results, keyed by feature and method.
+        - source (str, optional): Data file the results come from. Defaults to None (manual input).
+        - ph (float, optional): pH of the data. Defaults to the pH column of the source file, if any.
+        - path (str, optional): Database file. Defaults to default_path().
+
+    Returns:
+        int: Id of the run, or None if it could not be stored.
+    """
+    metadata = file_metadata(source) if source else {"file_hash": None, "ph": None}
+    try:
+        with ResultsStore(path) as store:
+            return store.add_run(fits_from_result(result, ph if ph is not None else metadata["ph"]), kind="gui",
+                                 source=source or "manual input", file_hash=metadata["file_hash"])
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error storing results: {e}")
+        return None
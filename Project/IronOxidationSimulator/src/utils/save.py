@@ -3,83 +3,285 @@ save.py
 ----------------------
 Author: Dongzi Ding
 Created: 2023-06-25
-Modified: 2023-08-14
+Modified: 2026-10-18
+
+Export of the analysis results.
+Rows are streamed to disk one at a time instead of being collected in DataFrames. Every file is written
+once, to a temporary file in the output directory that then replaces the target, so an interrupted save
+never leaves a half-written file behind. A manifest in the output directory records a content hash per
+file, and files whose content has not changed since the last save are skipped. Figures are PNG-encoded on
+a small thread pool. All results can also be written as one workbook with a sheet per analysis, using
+openpyxl's constant-memory write-only mode.
 """
 
+import csv
+import json
 import os
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import tracing
+from .fileio import atomic_write
+from .hashing import content_key
+
+MANIFEST_NAME = ".export_manifest.json"
+WORKBOOK_NAME = "results.xlsx"
+# Bumped when the layout of the exported files changes, so old manifest entries no longer match
+EXPORT_VERSION = 1
+FIGURE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _cell(value):
+    """Converts a result value to a plain Python value for csv and openpyxl."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return str(tuple(_cell(item) for item in value))
+    return value
+
+
+INTERVAL_HEADER = ["Slope CI low", "Slope CI high", "Confidence", "Interval method"]
+
+
+def _interval_cells(interval):
+    """Cells of a bootstrap.confidence_interval result, empty if the method has none."""
+    if interval is None:
+        return [None] * len(INTERVAL_HEADER)
+    low, high = interval['slope_ci']
+    return [low, high, interval['confidence'], interval['method']]
+
+
+def result_rows(option, option_result):
+    """
+    Yields the rows exported for one analysis.
+
+    Args:
+        - option (str): Feature name.
+        - option_result (dict): Entry of ButtonArea.result for the feature, keyed by method.
+
+    Returns:
+        generator: The header row, then one row per result.
+    """
+    if option == "3D plane plot":
+        yield ["pH", "logFe", "logR", "Params", "R Squared"]
+        for method_result in option_result.values():
+            yield [_cell(value) for value in method_result[:5]]
+    elif option == "rate const analysis":
+        intervals = any('interval' in method_result for method_result in option_result.values())
+        yield ["Rate constant", "Intercept", "R Squared"] + (INTERVAL_HEADER if intervals else [])
+        for method_result in option_result.values():
+            row = [_cell(method_result[key]) for key in ('slope', 'intercept', 'r_squared')]
+            yield row + (_interval_cells(method_result.get('interval')) if intervals else [])
+    elif option == "initial rate analysis":
+        yield ["Slope", "Intercept", "R Squared"]
+        for method_result in option_result.values():
+            if 'slopes' in method_result:
+                for row in zip(method_result['slopes'], method_result['intercepts'],
+                               method_result['r_squared_values']):
+                    yield [_cell(value) for value in row]
+            else:
+                yield [_cell(method_result[key]) for key in ('slope', 'intercept', 'r_squared')]
+    else:
+        intervals = any(len(method_result) > 7 for method_result in option_result.values())
+        yield ["Method", "Slope", "Intercept", "R Squared",
+               "Standard error of slope", "Standard error of intercept"] + (INTERVAL_HEADER if intervals else [])
+        for method, method_result in option_result.items():
+            standard_errors = method_result[5:7]
+            if len(standard_errors) < 2:
+                standard_errors = (None, None)
+            row = [method] + [_cell(value) for value in tuple(method_result[2:5]) + tuple(standard_errors)]
+            yield row + (_interval_cells(method_result[7] if len(method_result) > 7 else None) if intervals else [])
+
+
+def write_csv(path, rows):
+    """
+    Streams rows to a CSV file, atomically.
+
+    Args:
+        - path (str): Output file.
+        - rows (iterable): Rows of values, the first being the header.
+    """
+    atomic_write(path, lambda file: csv.writer(file, lineterminator="\n").writerows(rows))
+
+
+def write_workbook(path, result):
+    """
+    Writes all results to one workbook with a sheet per analysis, in constant memory.
+
+    Args:
+        - path (str): Output .xlsx file.
+        - result (dict): Analysis results, keyed by feature.
+    """
+    from openpyxl import Workbook
+
+    def write(temporary):
+        workbook = Workbook(write_only=True)
+        for option, option_result in result.items():
+            sheet = workbook.create_sheet(title=option[:31])
+            for row in result_rows(option, option_result):
+                sheet.append(row)
+        workbook.save(temporary)
+
+    atomic_write(path, write, mode=None)
 
 
-def save(result, dirname, figures):
+def _as_image(figure):
+    """Returns a QImage for a QPixmap, QImage or RenderedImage. QPixmaps must be converted on the GUI thread."""
+    if hasattr(figure, "to_qimage"):
+        return figure.to_qimage()
+    if hasattr(figure, "toImage"):
+        return figure.toImage()
+    return figure
+
+
+def _image_key(image):
+    """Content hash of a QImage's pixels."""
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    return content_key(EXPORT_VERSION, image.width(), image.height(), int(image.format()),
+                       np.frombuffer(bytes(bits), dtype=np.uint8))
+
+
+def write_png(path, image):
     """
-    Saves the result data to CSV files and figures to PNG files.
+    Encodes a QImage as PNG, atomically. Safe to call from any thread.
+
+    Args:
+        - path (str): Output file.
+        - image (QImage): Image to encode.
+    """
+    def write(temporary):
+        if not image.save(temporary, "PNG"):
+            raise OSError(f"could not encode {path}")
+
+    atomic_write(path, write, mode=None)
+
+
+def load_manifest(dirname):
+    """
+    Reads the content hashes of the files of an earlier save.
+
+    Args:
+        - dirname (str): Output directory.
+
+    Returns:
+        dict: File name -> content hash, empty if there is no readable manifest.
+    """
+    try:
+        with open(os.path.join(dirname, MANIFEST_NAME)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _unchanged(manifest, dirname, name, key):
+    """Returns True if a file exists and was written from the same content."""
+    return manifest.get(name) == key and os.path.exists(os.path.join(dirname, name))
+
+
+def _report(job, percent):
+    """Reports progress if the export runs as a background job."""
+    if job is not None:
+        job.report(percent)
+
+
+def save(result, dirname, figures, workbook=False, force=False, store=None, source=None, job=None):
+    """
+    Saves the result data to CSV files (or one workbook) and figures to PNG files.
+
+    Files whose content is unchanged since the last save to the same directory are skipped. If a results
+    store is given, the results are also added to it as a new run, see results_store.
 
     Parameters:
         - result (dict): Dictionary containing the analysis results.
         - dirname (str): Directory path where the results will be saved.
-        - figures (dict): Dictionary containing figures for saving as PNG.
+        - figures (dict): Figures to save as PNG, as QPixmap (converted on the calling thread), QImage or
+          RenderedImage.
+        - workbook (bool, optional): Write all results to one results.xlsx instead of a CSV per analysis.
+          Defaults to False.
+        - force (bool, optional): Write every file even if it is unchanged. Defaults to False.
+        - store (str, optional): Path of a SQLite results store to add the results to. Defaults to None.
+        - source (str, optional): Data file the results come from, recorded in the store. Defaults to None.
+        - job (Worker, optional): Background job used to report progress. Defaults to None.
 
     Returns:
-        None
+        dict: Paths of the files "written" and "skipped", and the "run_id" in the store (None without one).
     """
-    for option in result:
-        if option == "3D plane plot":
-            data_to_save = {
-                "pH": [],
-                "logFe": [],
-                "logR": [],
-                "Params": [],
-                "R Squared": []
-            }
-            for method in result[option]:
-                data_to_save["pH"].append(result[option][method][0])
-                data_to_save["logFe"].append(result[option][method][1])
-                data_to_save["logR"].append(result[option][method][2])
-                data_to_save["Params"].append(result[option][method][3])
-                data_to_save["R Squared"].append(result[option][method][4])
-        elif option == "rate const analysis":
-            data_to_save = {
-                "Rate constant": [],
-                "Intercept": [],
-                "R Squared": []
-                }
-            for method in result[option]:
-                data_to_save["Rate constant"].append(result[option][method]['slope'])
-                data_to_save["Intercept"].append(result[option][method]['intercept'])
-                data_to_save["R Squared"].append(result[option][method]['r_squared'])
-        elif option == "initial rate analysis":
-            data_to_save = {
-                "Slope": [],
-                "Intercept": [],
-                "R Squared": []
-            }
-            for method in result[option]:
-                if 'slopes' in result[option][method]:
-                    data_to_save["Slope"].extend(result[option][method]['slopes'])
-                    data_to_save["Intercept"].extend(result[option][method]['intercepts'])
-                    data_to_save["R Squared"].extend(result[option][method]['r_squared_values'])
-                else:
-                    data_to_save["Slope"].append(result[option][method]['slope'])
-                    data_to_save["Intercept"].append(result[option][method]['intercept'])
-                    data_to_save["R Squared"].append(result[option][method]['r_squared'])
-
-        else:
-
-            data_to_save = {"Slope": [],
-                            "Intercept": [], "R Squared": []}
-            for method in result[option]:
-                data_to_save["Slope"].append(result[option][method][2])
-                data_to_save["Intercept"].append(result[option][method][3])
-                data_to_save["R Squared"].append(result[option][method][4])
-        result_df = pd.DataFrame(data_to_save)
-        result_path = os.path.join(dirname, f"{option}_result.csv")
+    with tracing.span("save", "io", dirname=dirname):
+        summary = _save(result, dirname, figures, workbook, force, job)
+        summary["run_id"] = None
+        if store is not None:
+            # Imported here: the store needs pandas, which plain file exports do not
+            from .results_store import record_result
+            with tracing.span("store_results", "io"):
+                summary["run_id"] = record_result(result, source, path=store)
+        return summary
+
+
+def _save(result, dirname, figures, workbook, force, job):
+    """Writes the files of save()."""
+    manifest = {} if force else load_manifest(dirname)
+    updated = dict(manifest)
+    written, skipped = [], []
+    _report(job, 0)
+
+    tables = {option: content_key(EXPORT_VERSION, option, result[option]) for option in result}
+    if workbook:
+        outputs = [(WORKBOOK_NAME, content_key(*sorted(tables.items())),
+                    lambda path: write_workbook(path, result))]
+    else:
+        outputs = [(f"{option}_result.csv", key,
+                    lambda path, option=option: write_csv(path, result_rows(option, result[option])))
+                   for option, key in tables.items()]
+
+    for name, key, write in outputs:
+        path = os.path.join(dirname, name)
+        if _unchanged(manifest, dirname, name, key):
+            skipped.append(path)
+            continue
         try:
-            result_df.to_csv(result_path, index=False)
+            with tracing.span("write_table", "io", file=name):
+                write(path)
         except Exception as e:
-            print(f"Error saving CSV for option {option}: {e}")
-        result_df.to_csv(result_path, index=False)
+            print(f"Error saving {name}: {e}")
+            continue
+        updated[name] = key
+        written.append(path)
+    _report(job, 30)
 
-    for option, pixmap in figures.items():
-        figure_path = os.path.join(dirname, f"{option}_figure.png")
-        pixmap.save(figure_path, "PNG")
+    images = {option: _as_image(figure) for option, figure in figures.items()}
 
+    def encode(item):
+        option, image = item
+        name = f"{option}_figure.png"
+        with tracing.span("write_png", "io", option=option):
+            key = _image_key(image)
+            if _unchanged(manifest, dirname, name, key):
+                return name, key, False
+            write_png(os.path.join(dirname, name), image)
+            return name, key, True
+
+    if images:
+        with ThreadPoolExecutor(max_workers=min(FIGURE_WORKERS, len(images))) as pool:
+            futures = [pool.submit(encode, item) for item in images.items()]
+            for done, future in enumerate(futures, 1):
+                try:
+                    name, key, changed = future.result()
+                except Exception as e:
+                    print(f"Error saving figure: {e}")
+                    continue
+                updated[name] = key
+                (written if changed else skipped).append(os.path.join(dirname, name))
+                _report(job, 30 + 65 * done // len(futures))
+
+    if updated != manifest or force:
+        try:
+            atomic_write(os.path.join(dirname, MANIFEST_NAME), lambda file: json.dump(updated, file, indent=1))
+        except OSError as e:
+            print(f"Error saving the export manifest: {e}")
+    _report(job, 100)
+    return {"written": written, "skipped": skipped}
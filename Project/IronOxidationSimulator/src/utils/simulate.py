@@ -0,0 +1,134 @@
+"""
+simulate.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Forward simulation of Fe(II) concentration-time curves from a fitted 3D plane.
+Plane3DPlotter fits ln R0 = p0 + p1 ln[Fe]0 + p2 pH, which is the rate law
+    -d[Fe]/dt = exp(p0 + p2 pH) [Fe]^p1
+evaluated at t = 0. Integrating it in closed form (see rate_law) gives [Fe](t) for any pH and initial
+concentration. Grids of pH x [Fe]0 x time are evaluated with broadcasting in chunks of rows, so memory stays
+bounded, and are written as float32 to an array or a memory-mapped .npy file.
+"""
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from .rate_law import log_concentration
+
+# Number of grid points evaluated at once
+CHUNK_POINTS = 2 ** 22
+
+
+def plane_rate_law(params):
+    """
+    Converts the parameters of a fitted plane into a rate law.
+
+    Args:
+        - params (tuple): Intercept, ln[Fe]0 coefficient and pH coefficient, as returned by
+          Plane3DPlotter.fit_plane.
+
+    Returns:
+        dict: "ln_k" (ln of the rate constant at pH 0), "order" (order in Fe(II)) and "pH_coefficient".
+    """
+    intercept, order, pH_coefficient = (float(value) for value in params)
+    return {'ln_k': intercept, 'order': order, 'pH_coefficient': pH_coefficient}
+
+
+def initial_rate(params, pH, fe0):
+    """
+    Initial rates predicted by a fitted plane.
+
+    Args:
+        - params (tuple): Parameters of the fitted plane.
+        - pH (array-like): pH values.
+        - fe0 (array-like): Initial concentrations, broadcastable to pH.
+
+    Returns:
+        Initial rates R0.
+    """
+    law = plane_rate_law(params)
+    return np.exp(law['ln_k'] + law['order'] * np.log(fe0) + law['pH_coefficient'] * np.asarray(pH, dtype=float))
+
+
+def _simulate_rows(ln_fe0, ln_k, s, time):
+    """Fe(II) concentrations for rows of (ln[Fe]0, ln K) against a time vector."""
+    curves = np.exp(log_concentration(time[None, :], ln_fe0[:, None], ln_k[:, None], s))
+    if s > 0:
+        # For orders below one, ([Fe]0^s - s K t)^(1/s) reaches zero in finite time
+        spent = s * np.exp(ln_k - s * ln_fe0)[:, None] * time[None, :] >= 1
+        curves[spent] = 0.0
+    return curves
+
+
+def simulate_grid(params, pH, fe0, time, filename=None, dtype=np.float32, chunk_points=CHUNK_POINTS):
+    """
+    Simulates Fe(II) curves for every combination of pH and initial concentration.
+
+    Args:
+        - params (tuple): Parameters of the fitted plane, see Plane3DPlotter.fit_plane.
+        - pH (array-like): pH values of the grid.
+        - fe0 (array-like): Initial concentrations of the grid, in the units of the fitted data.
+        - time (array-like): Times at which to evaluate the curves, in the units of the fitted rates.
+        - filename (str, optional): If given, the curves are written to this .npy file through a memory map,
+          so grids larger than memory can be simulated. Defaults to None.
+        - dtype (numpy dtype, optional): Type of the output. Defaults to float32.
+        - chunk_points (int, optional): Number of grid points evaluated at once. Defaults to CHUNK_POINTS.
+
+    Returns:
+        array of shape (len(pH), len(fe0), len(time)) holding [Fe](t), or a numpy.memmap if filename is given.
+    """
+    law = plane_rate_law(params)
+    pH = np.atleast_1d(np.asarray(pH, dtype=float))
+    fe0 = np.atleast_1d(np.asarray(fe0, dtype=float))
+    time = np.atleast_1d(np.asarray(time, dtype=float))
+    shape = (pH.size, fe0.size, time.size)
+
+    if filename is not None:
+        curves = open_memmap(filename, mode='w+', dtype=dtype, shape=shape)
+    else:
+        curves = np.empty(shape, dtype=dtype)
+    rows = curves.reshape(-1, time.size)
+
+    s = 1.0 - law['order']
+    ln_fe0 = np.tile(np.log(fe0), pH.size)
+    ln_k = np.repeat(law['ln_k'] + law['pH_coefficient'] * pH, fe0.size)
+    step = max(1, chunk_points // max(time.size, 1))
+    for start in range(0, rows.shape[0], step):
+        stop = min(start + step, rows.shape[0])
+        rows[start:stop] = _simulate_rows(ln_fe0[start:stop], ln_k[start:stop], s, time)
+
+    if filename is not None:
+        curves.flush()
+    return curves
+
+
+def simulate_curve(params, pH, fe0, time):
+    """
+    Simulates a single Fe(II) curve.
+
+    Args:
+        - params (tuple): Parameters of the fitted plane.
+        - pH (float): pH of the experiment.
+        - fe0 (float): Initial concentration.
+        - time (array-like): Times at which to evaluate the curve.
+
+    Returns:
+        array: [Fe](t) in double precision.
+    """
+    return simulate_grid(params, pH, fe0, time, dtype=float)[0, 0]
+
+
+def load_grid(filename):
+    """
+    Opens a grid written by simulate_grid without reading it into memory.
+
+    Args:
+        - filename (str): Path to the .npy file.
+
+    Returns:
+        numpy.memmap: The curves, indexed by pH, initial concentration and time.
+    """
+    return np.load(filename, mmap_mode='r')
@@ -0,0 +1,277 @@
+"""
+streaming.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Chunked ingest and fitting for very long concentration traces.
+Binary traces (.npy, or raw float64 .bin files with interleaved time/concentration pairs) are memory-mapped,
+CSV traces are streamed with pandas, and both are processed in fixed-size chunks. The initial rate cut and the
+rate constant regression are computed from running sums, so peak memory is bounded by the chunk size and
+not by the length of the trace.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+BINARY_EXTENSIONS = (".bin", ".f64", ".dat")
+
+
+class RunningFit:
+    """
+    Running sums for a straight-line least-squares fit of y against t.
+
+    Points can be added (and removed) in any number of batches. All sums are taken on values shifted by a
+    reference point, by default the first point seen, so large time or concentration offsets do not cancel out.
+
+    Attributes:
+        - n (int): Number of points currently included.
+        - t_ref, y_ref (float): Shift applied to t and y before summing.
+        - sum_t, sum_y, sum_tt, sum_ty, sum_yy (float): Sums of the shifted values.
+    """
+
+    def __init__(self, t_ref=None, y_ref=None):
+        """
+        Initializes an empty fit.
+
+        Args:
+            - t_ref (float, optional): Time shift. Defaults to the first time added.
+            - y_ref (float, optional): Response shift. Defaults to the first response added.
+        """
+        self.t_ref = t_ref
+        self.y_ref = y_ref
+        self.n = 0
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = self.sum_yy = 0.0
+
+    def _accumulate(self, t, y, sign):
+        """Adds (sign=1) or removes (sign=-1) points from the sums."""
+        t = np.asarray(t, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if t.size == 0:
+            return
+        if self.t_ref is None:
+            self.t_ref = float(t.flat[0])
+        if self.y_ref is None:
+            self.y_ref = float(y.flat[0])
+        t = t - self.t_ref
+        y = y - self.y_ref
+        self.n += sign * t.size
+        self.sum_t += sign * float(t.sum())
+        self.sum_y += sign * float(y.sum())
+        self.sum_tt += sign * float(np.dot(t.ravel(), t.ravel()))
+        self.sum_ty += sign * float(np.dot(t.ravel(), y.ravel()))
+        self.sum_yy += sign * float(np.dot(y.ravel(), y.ravel()))
+
+    def update(self, t, y):
+        """
+        Adds points to the fit.
+
+        Args:
+            - t (float or array): Time values.
+            - y (float or array): Response values.
+        """
+        self._accumulate(t, y, 1)
+
+    def downdate(self, t, y):
+        """
+        Removes points that were previously added.
+
+        Args:
+            - t (float or array): Time values.
+            - y (float or array): Response values.
+        """
+        self._accumulate(t, y, -1)
+
+    def _centred(self):
+        """Returns the centred sums S_tt, S_ty and S_yy."""
+        mean_t = self.sum_t / self.n
+        mean_y = self.sum_y / self.n
+        s_tt = max(self.sum_tt - self.sum_t * mean_t, 0.0)
+        s_ty = self.sum_ty - self.sum_t * mean_y
+        s_yy = max(self.sum_yy - self.sum_y * mean_y, 0.0)
+        return s_tt, s_ty, s_yy
+
+    def line(self):
+        """
+        Returns the least-squares line through the included points.
+
+        Returns:
+            Slope and intercept. A single distinct time gives a flat line, as LinearRegression does.
+            Both are nan when there are no points.
+        """
+        if self.n == 0:
+            return np.nan, np.nan
+        s_tt, s_ty, _ = self._centred()
+        slope = s_ty / s_tt if s_tt > 0 else 0.0
+        intercept_shifted = self.sum_y / self.n - slope * self.sum_t / self.n
+        return slope, intercept_shifted + self.y_ref - slope * self.t_ref
+
+    def score(self, slope, intercept):
+        """
+        Computes the R squared of a given line over the included points.
+
+        Args:
+            - slope (float): Slope of the line.
+            - intercept (float): Intercept of the line.
+
+        Returns:
+            R squared value, nan when the points have no spread.
+        """
+        if self.n == 0:
+            return np.nan
+        s_tt, s_ty, s_yy = self._centred()
+        mean_t = self.sum_t / self.n
+        mean_y = self.sum_y / self.n
+        offset = intercept + slope * self.t_ref - self.y_ref + slope * mean_t - mean_y
+        ss_res = s_yy - 2 * slope * s_ty + slope ** 2 * s_tt + self.n * offset ** 2
+        return 1 - ss_res / s_yy if s_yy > 0 else np.nan
+
+    def r_squared(self):
+        """Returns the R squared of the least-squares line over the included points."""
+        return self.score(*self.line())
+
+
+def _open_binary(filename):
+    """Memory-maps a binary trace as an (n, 2) array of time and concentration."""
+    if filename.lower().endswith(".npy"):
+        data = np.load(filename, mmap_mode="r")
+    else:
+        data = np.memmap(filename, dtype=np.float64, mode="r")
+        data = data.reshape(-1, 2)
+    if data.ndim != 2 or data.shape[1] < 2:
+        raise ValueError(f"{filename} does not hold (time, concentration) columns")
+    return data
+
+
+def iter_chunks(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams a trace file in fixed-size chunks.
+
+    Args:
+        - filename (str): Path to a .npy file with an (n, 2) array, a raw float64 .bin/.f64/.dat file
+          with interleaved time and concentration values, or a .csv file with time and concentration
+          in the first two columns.
+        - chunk_size (int, optional): Number of points per chunk. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Yields:
+        Arrays of time and concentration values for each chunk.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        for chunk in pd.read_csv(filename, chunksize=chunk_size):
+            yield chunk.iloc[:, 0].to_numpy(dtype=float), chunk.iloc[:, 1].to_numpy(dtype=float)
+    elif extension == ".npy" or extension in BINARY_EXTENSIONS:
+        data = _open_binary(filename)
+        for start in range(0, data.shape[0], chunk_size):
+            block = np.asarray(data[start:start + chunk_size, :2], dtype=float)
+            yield block[:, 0], block[:, 1]
+    else:
+        raise ValueError(f"Unsupported trace format '{extension}', use .npy, .bin or .csv")
+
+
+def trace_endpoints(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Finds the first and last concentration of a trace.
+
+    Binary files are read directly from the memory map; CSV files are streamed once.
+
+    Args:
+        - filename (str): Path to the trace file, see iter_chunks.
+        - chunk_size (int, optional): Number of points per chunk. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        First and last concentration values.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".npy" or extension in BINARY_EXTENSIONS:
+        data = _open_binary(filename)
+        return float(data[0, 1]), float(data[-1, 1])
+    first = last = None
+    for _, conc in iter_chunks(filename, chunk_size):
+        if conc.size:
+            if first is None:
+                first = float(conc[0])
+            last = float(conc[-1])
+    if first is None:
+        raise ValueError(f"{filename} is empty")
+    return first, last
+
+
+def initial_rate_chunked(filename, threshold, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Chunked initial_rate.calculate_rate: fits the first part of a trace without loading it into memory.
+
+    Args:
+        - filename (str): Path to the trace file, see iter_chunks.
+        - threshold (float): Fraction of the concentration change to use for the regression.
+        - chunk_size (int, optional): Number of points per chunk. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        Dictionary containing slope, intercept, R squared (scored on the whole trace) and the number
+        of points used in the fit.
+    """
+    conc_l, conc_h = trace_endpoints(filename, chunk_size)
+    subset = RunningFit()
+    full = RunningFit()
+    for time, conc in iter_chunks(filename, chunk_size):
+        if conc_h > conc_l:  # rising concentration
+            mask = (conc - conc_l) <= (conc_h - conc_l) * threshold
+        else:  # falling concentration
+            mask = (conc_l - conc) <= (conc_l - conc_h) * threshold
+        if subset.t_ref is None and time.size:
+            # Share one reference point so both fits see the same shift
+            subset.t_ref, subset.y_ref = full.t_ref, full.y_ref = float(time[0]), float(conc[0])
+        subset.update(time[mask], conc[mask])
+        full.update(time, conc)
+
+    slope, intercept = subset.line()
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'r_squared': full.score(slope, intercept),
+        'n_points': subset.n
+    }
+
+
+def rate_const_chunked(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Chunked rate_const.calculate_rate: regresses ln(concentration) on time without loading the trace.
+
+    Args:
+        - filename (str): Path to the trace file, see iter_chunks.
+        - chunk_size (int, optional): Number of points per chunk. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        Dictionary containing slope (rate constant), intercept, R squared and the number of points.
+    """
+    fit = RunningFit()
+    for time, conc in iter_chunks(filename, chunk_size):
+        fit.update(time, np.log(conc))
+
+    slope, intercept = fit.line()
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'r_squared': fit.r_squared(),
+        'n_points': fit.n
+    }
+
+
+def save_trace(filename, time, conc):
+    """
+    Saves a trace as an (n, 2) .npy file that iter_chunks can memory-map.
+
+    Args:
+        - filename (str): Output path ending in .npy.
+        - time (array): Time values.
+        - conc (array): Concentration values.
+    """
+    data = np.lib.format.open_memmap(filename, mode="w+", dtype=np.float64, shape=(len(time), 2))
+    data[:, 0] = time
+    data[:, 1] = conc
+    data.flush()
+    del data
@@ -0,0 +1,280 @@
+"""
+trace_batch.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Batched versions of the initial rate and rate constant fits.
+Many kinetic traces of different lengths are stored back to back in flat arrays with an offsets index,
+and every fit is computed for all traces at once with segment sums instead of one sklearn model per trace.
+"""
+
+import numpy as np
+
+from .registry import lazy_module
+
+# Only needed for the robust estimators, and heavy to import, see utils.registry
+initial_rate = lazy_module("initial_rate")
+
+
+class TraceBatch:
+    """
+    A ragged collection of (time, concentration) traces.
+
+    Trace i occupies time[offsets[i]:offsets[i + 1]] and conc[offsets[i]:offsets[i + 1]].
+
+    Attributes:
+        - time (array): Time values of all traces, concatenated.
+        - conc (array): Concentration values of all traces, concatenated.
+        - offsets (array): Start index of every trace, followed by the total number of points.
+        - labels (list): Name of every trace, e.g. the file it came from.
+    """
+
+    def __init__(self, time, conc, offsets, labels=None):
+        """
+        Initializes the batch from flat arrays.
+
+        Args:
+            - time (array): Concatenated time values.
+            - conc (array): Concatenated concentration values.
+            - offsets (array): Start index of every trace plus the total length, so len(offsets) = traces + 1.
+            - labels (list, optional): Name of every trace. Defaults to the trace index.
+        """
+        self.time = np.asarray(time, dtype=float)
+        self.conc = np.asarray(conc, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if self.time.shape != self.conc.shape or self.offsets[-1] != self.time.size:
+            raise ValueError("time, conc and offsets do not describe the same traces")
+        if np.any(np.diff(self.offsets) < 1):
+            raise ValueError("every trace needs at least one point")
+        self.labels = list(range(len(self))) if labels is None else list(labels)
+
+    @classmethod
+    def from_traces(cls, traces, labels=None):
+        """
+        Builds a batch from a sequence of (time, conc) pairs.
+
+        Args:
+            - traces (iterable): (time, conc) pairs, e.g. the output of initial_rate.read_data.
+            - labels (list, optional): Name of every trace. Defaults to None.
+
+        Returns:
+            TraceBatch: The packed traces.
+        """
+        traces = list(traces)
+        lengths = [len(time) for time, _ in traces]
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        time = np.concatenate([np.asarray(time, dtype=float) for time, _ in traces])
+        conc = np.concatenate([np.asarray(conc, dtype=float) for _, conc in traces])
+        return cls(time, conc, offsets, labels)
+
+    def __len__(self):
+        """Returns the number of traces."""
+        return self.offsets.size - 1
+
+    @property
+    def lengths(self):
+        """Number of points in every trace."""
+        return np.diff(self.offsets)
+
+    def trace_ids(self):
+        """Returns the index of the trace that every flat point belongs to."""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def trace(self, i):
+        """
+        Returns one trace as views into the flat arrays.
+
+        Args:
+            - i (int): Index of the trace.
+
+        Returns:
+            Arrays of time and concentration values.
+        """
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.time[start:stop], self.conc[start:stop]
+
+    def first(self, values):
+        """Returns the first value of every trace."""
+        return values[self.offsets[:-1]]
+
+    def last(self, values):
+        """Returns the last value of every trace."""
+        return values[self.offsets[1:] - 1]
+
+
+def cut_mask(batch, threshold):
+    """
+    Computes the cut_data selection of every trace at once.
+
+    Args:
+        - batch (TraceBatch): Traces to cut.
+        - threshold (float or array): One threshold for all traces or one per trace.
+
+    Returns:
+        Boolean array over the flat points, True where the point is kept.
+    """
+    ids = batch.trace_ids()
+    threshold = np.broadcast_to(np.asarray(threshold, dtype=float), (len(batch),))
+    conc_l, conc_h = batch.first(batch.conc), batch.last(batch.conc)
+    rising = conc_h > conc_l
+    span = np.where(rising, conc_h - conc_l, conc_l - conc_h)
+    distance = np.where(rising[ids], batch.conc - conc_l[ids], conc_l[ids] - batch.conc)
+    return distance <= (span * threshold)[ids]
+
+
+def cut_batch(batch, threshold):
+    """
+    Applies the threshold cut to every trace.
+
+    Args:
+        - batch (TraceBatch): Traces to cut.
+        - threshold (float or array): One threshold for all traces or one per trace.
+
+    Returns:
+        TraceBatch: The cut traces, in the same order and with the same labels.
+    """
+    mask = cut_mask(batch, threshold)
+    counts = np.bincount(batch.trace_ids()[mask], minlength=len(batch))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return TraceBatch(batch.time[mask], batch.conc[mask], offsets, batch.labels)
+
+
+def _segment_mean(values, ids, weights, counts):
+    """Mean of values per trace over the points with weight 1."""
+    return np.bincount(ids, weights=values * weights, minlength=counts.size) / counts
+
+
+def _fit_segments(batch, y, fit_mask):
+    """
+    Fits one straight line per trace on the masked points and scores it on every point of the trace.
+
+    Values are shifted to the first point of their trace and the sums are centred in two passes,
+    so the result is not affected by large time offsets.
+
+    Args:
+        - batch (TraceBatch): Traces providing the time values and offsets.
+        - y (array): Flat response values, aligned with batch.time.
+        - fit_mask (array): Boolean array, True for points used in the fit.
+
+    Returns:
+        Arrays of slopes, intercepts, R squared values and the number of fitted points.
+    """
+    n = len(batch)
+    ids = batch.trace_ids()
+    t0, y0 = batch.first(batch.time), batch.first(y)
+    t = batch.time - t0[ids]
+    y = y - y0[ids]
+    weights = fit_mask.astype(float)
+
+    n_fit = np.bincount(ids, weights=weights, minlength=n)
+    mean_t = _segment_mean(t, ids, weights, n_fit)
+    mean_y = _segment_mean(y, ids, weights, n_fit)
+    dt = (t - mean_t[ids]) * weights
+    dy = y - mean_y[ids]
+    s_tt = np.bincount(ids, weights=dt * dt, minlength=n)
+    s_ty = np.bincount(ids, weights=dt * dy, minlength=n)
+    # A single distinct time gives a flat line, as LinearRegression does
+    slopes = np.where(s_tt > 0, s_ty / np.where(s_tt > 0, s_tt, 1.0), 0.0)
+    intercepts_shifted = mean_y - slopes * mean_t
+
+    residual = y - intercepts_shifted[ids] - slopes[ids] * t
+    ss_res = np.bincount(ids, weights=residual * residual, minlength=n)
+    full_mean_y = np.bincount(ids, weights=y, minlength=n) / batch.lengths
+    centred_y = y - full_mean_y[ids]
+    ss_tot = np.bincount(ids, weights=centred_y * centred_y, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r_squared = 1 - ss_res / ss_tot
+
+    intercepts = intercepts_shifted + y0 - slopes * t0
+    return slopes, intercepts, r_squared, n_fit.astype(np.int64)
+
+
+def _robust_segments(batch, fit_mask, estimator):
+    """
+    Fits every trace with a robust estimator on the masked points and scores the line on the whole trace.
+
+    The fits themselves run trace by trace (see initial_rate.theil_sen_fit and ransac_fit); the R squared
+    values are computed for all traces at once.
+
+    Args:
+        - batch (TraceBatch): Traces to fit.
+        - fit_mask (array): Boolean array, True for points used in the fit.
+        - estimator (str): "theil-sen" or "ransac".
+
+    Returns:
+        Arrays of slopes, intercepts, R squared values and the number of fitted points.
+    """
+    if estimator == "theil-sen":
+        fit = initial_rate.theil_sen_fit
+    elif estimator == "ransac":
+        fit = initial_rate.ransac_fit
+    else:
+        raise ValueError(f"unknown estimator '{estimator}'")
+    n = len(batch)
+    slopes, intercepts = np.empty(n), np.empty(n)
+    for i, (start, stop) in enumerate(zip(batch.offsets[:-1], batch.offsets[1:])):
+        keep = fit_mask[start:stop]
+        slopes[i], intercepts[i] = fit(batch.time[start:stop][keep], batch.conc[start:stop][keep])[:2]
+
+    ids = batch.trace_ids()
+    residual = batch.conc - intercepts[ids] - slopes[ids] * batch.time
+    ss_res = np.bincount(ids, weights=residual * residual, minlength=n)
+    centred = batch.conc - (np.bincount(ids, weights=batch.conc, minlength=n) / batch.lengths)[ids]
+    ss_tot = np.bincount(ids, weights=centred * centred, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r_squared = 1 - ss_res / ss_tot
+    return slopes, intercepts, r_squared, np.bincount(ids, weights=fit_mask, minlength=n).astype(np.int64)
+
+
+def initial_rate_batch(batch, threshold, estimator="ols"):
+    """
+    Batched initial_rate.calculate_rate: fits the first part of every trace.
+
+    Args:
+        - batch (TraceBatch): Traces to analyse.
+        - threshold (float or array): One threshold for all traces or one per trace.
+        - estimator (str, optional): Line fit, one of initial_rate.ESTIMATORS. Least squares ("ols") fits all
+          traces at once with segment sums; the robust "theil-sen" and "ransac" fit trace by trace.
+          Defaults to "ols".
+
+    Returns:
+        dict: Column-oriented table with one entry per trace in 'trace', 'slope', 'intercept',
+        'r_squared' and 'n_points'.
+    """
+    fit_mask = cut_mask(batch, threshold)
+    if estimator == "ols":
+        slopes, intercepts, r_squared, n_points = _fit_segments(batch, batch.conc, fit_mask)
+    else:
+        slopes, intercepts, r_squared, n_points = _robust_segments(batch, fit_mask, estimator)
+    return {
+        'trace': batch.labels,
+        'slope': slopes,
+        'intercept': intercepts,
+        'r_squared': r_squared,
+        'n_points': n_points
+    }
+
+
+def rate_const_batch(batch):
+    """
+    Batched rate_const.calculate_rate: fits ln(concentration) against time for every trace.
+
+    Args:
+        - batch (TraceBatch): Traces to analyse.
+
+    Returns:
+        dict: Column-oriented table with one entry per trace in 'trace', 'slope', 'intercept',
+        'r_squared' and 'n_points'.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ln_conc = np.log(batch.conc)
+    slopes, intercepts, r_squared, n_points = _fit_segments(batch, ln_conc, np.ones(batch.conc.size, dtype=bool))
+    return {
+        'trace': batch.labels,
+        'slope': slopes,
+        'intercept': intercepts,
+        'r_squared': r_squared,
+        'n_points': n_points
+    }
@@ -0,0 +1,313 @@
+"""
+tracing.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Per-stage timing of the application.
+Stages such as reading a file, fitting, drawing a figure or writing the results are wrapped in spans:
+
+    with tracing.span("read_data", option=option):
+        ...
+
+Tracing is off by default and a disabled span is a shared object whose enter and exit do nothing, so the
+spans can stay in the code. When enabled, every span records its start, duration and thread, and the
+recording can be written as Chrome trace-event JSON (open it in chrome://tracing or https://ui.perfetto.dev)
+or summarised as a table of total time per stage.
+
+Tracing is enabled by setting the environment variable IRON_OXIDATION_TRACE to the path of the JSON file
+to write when the program exits, or by calling enable().
+"""
+
+import atexit
+import json
+import os
+import threading
+import time as timer
+from functools import wraps
+
+TRACE_ENV = "IRON_OXIDATION_TRACE"
+# Spans beyond this are dropped, so a forgotten trace cannot grow without bounds
+MAX_EVENTS = 1_000_000
+
+_enabled = False
+_events = []
+_dropped = 0
+_origin_ns = timer.perf_counter_ns()
+_thread_names = {}
+_export_path = None
+
+
+class _NullSpan:
+    """The span returned while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        """Ignores the arguments."""
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    A timed stage. Use it as a context manager; it is recorded when the block exits.
+
+    Attributes:
+        - name (str): Name of the stage.
+        - category (str): Group of the stage, e.g. "io", "fit" or "plot".
+        - args (dict): Extra values shown with the span in the trace viewer.
+    """
+
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name, category, args):
+        """
+        Initializes the span without starting it.
+
+        Args:
+            - name (str): Name of the stage.
+            - category (str): Group of the stage.
+            - args (dict): Extra values recorded with the span.
+        """
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = timer.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = timer.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        _record(self.name, self.category, self.start, end - self.start, self.args)
+        return False
+
+    def set(self, **args):
+        """Adds values to the span, e.g. sizes only known inside the block."""
+        self.args.update(args)
+
+
+def _record(name, category, start, duration, args):
+    """Stores a finished span."""
+    global _dropped
+    if len(_events) >= MAX_EVENTS:
+        _dropped += 1
+        return
+    thread = threading.current_thread()
+    if thread.ident not in _thread_names:
+        _thread_names[thread.ident] = thread.name
+    # list.append is atomic, so spans can end on any thread without a lock
+    _events.append((name, category, start, duration, thread.ident, args))
+
+
+def span(name, category="app", **args):
+    """
+    Starts a span.
+
+    Args:
+        - name (str): Name of the stage.
+        - category (str, optional): Group of the stage. Defaults to "app".
+        - **args: Extra values recorded with the span.
+
+    Returns:
+        Span, or a no-op stand-in when tracing is disabled.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def traced(name=None, category="app"):
+    """
+    Decorator that runs a function inside a span.
+
+    Args:
+        - name (str, optional): Name of the span. Defaults to the function's qualified name.
+        - category (str, optional): Group of the span. Defaults to "app".
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorate(function):
+        span_name = name or function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with Span(span_name, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(path=None):
+    """
+    Turns tracing on.
+
+    Args:
+        - path (str, optional): If given, the trace is written to this file as Chrome trace-event JSON and a
+          summary is printed when the program exits. Defaults to None.
+    """
+    global _enabled, _export_path
+    _enabled = True
+    if path:
+        if _export_path is None:
+            atexit.register(_export_at_exit)
+        _export_path = path
+
+
+def disable():
+    """Turns tracing off. Recorded spans are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """Returns True if spans are being recorded."""
+    return _enabled
+
+
+def enable_from_environment():
+    """
+    Enables tracing if the IRON_OXIDATION_TRACE environment variable is set.
+
+    Returns:
+        bool: True if tracing was enabled.
+    """
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        enable(path)
+        return True
+    return False
+
+
+def clear():
+    """Forgets all recorded spans."""
+    global _dropped
+    _events.clear()
+    _dropped = 0
+
+
+def events():
+    """
+    Returns the recorded spans.
+
+    Returns:
+        list of tuple: (name, category, start ns, duration ns, thread id, args) of every span.
+    """
+    return list(_events)
+
+
+def chrome_trace():
+    """
+    Builds the Chrome trace-event representation of the recorded spans.
+
+    Returns:
+        dict: {"traceEvents": [...], "displayTimeUnit": "ms"} with one complete ("X") event per span and the
+        thread names as metadata events.
+    """
+    pid = os.getpid()
+    trace_events = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+        for tid, thread_name in list(_thread_names.items())
+    ]
+    for name, category, start, duration, tid, args in list(_events):
+        trace_events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - _origin_ns) / 1000,
+            "dur": duration / 1000,
+            "pid": pid,
+            "tid": tid,
+            "args": {key: _jsonable(value) for key, value in args.items()},
+        })
+    trace = {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+    if _dropped:
+        trace["otherData"] = {"dropped_spans": _dropped}
+    return trace
+
+
+def _jsonable(value):
+    """Converts a span argument to a JSON value."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    try:
+        return value.item()
+    except (AttributeError, ValueError):
+        return str(value)
+
+
+def export_chrome_trace(path):
+    """
+    Writes the recorded spans as Chrome trace-event JSON.
+
+    Args:
+        - path (str): Output file.
+
+    Returns:
+        str: The path written, or None if writing failed.
+    """
+    try:
+        with open(path, "w") as file:
+            json.dump(chrome_trace(), file)
+    except OSError as e:
+        print(f"Error writing trace to {path}: {e}")
+        return None
+    return path
+
+
+def summary():
+    """
+    Aggregates the recorded spans by name.
+
+    Returns:
+        list of dict: "name", "category", "count", "total_ms", "mean_ms" and "max_ms" of every stage,
+        sorted by total time.
+    """
+    stages = {}
+    for name, category, _, duration, _, _ in list(_events):
+        stage = stages.setdefault(name, {"name": name, "category": category, "count": 0, "total_ms": 0.0,
+                                         "max_ms": 0.0})
+        stage["count"] += 1
+        stage["total_ms"] += duration / 1e6
+        stage["max_ms"] = max(stage["max_ms"], duration / 1e6)
+    rows = sorted(stages.values(), key=lambda stage: stage["total_ms"], reverse=True)
+    for row in rows:
+        row["mean_ms"] = row["total_ms"] / row["count"]
+    return rows
+
+
+def summary_table():
+    """
+    Formats summary() as a text table.
+
+    Returns:
+        str: One line per stage.
+    """
+    rows = summary()
+    width = max([len(row["name"]) for row in rows] + [5])
+    lines = [f"{'Stage':{width}s} {'Category':10s} {'Count':>7s} {'Total ms':>11s} {'Mean ms':>10s} {'Max ms':>10s}"]
+    for row in rows:
+        lines.append(f"{row['name']:{width}s} {row['category']:10s} {row['count']:7d} {row['total_ms']:11.2f} "
+                     f"{row['mean_ms']:10.2f} {row['max_ms']:10.2f}")
+    return "\n".join(lines)
+
+
+def _export_at_exit():
+    """Writes the trace and prints the summary when the program exits."""
+    if _export_path and _events:
+        if export_chrome_trace(_export_path):
+            print(f"Trace written to {_export_path}")
+        print(summary_table())
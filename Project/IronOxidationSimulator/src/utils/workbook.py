@@ -0,0 +1,249 @@
+"""
+workbook.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Shared table loader used by every analysis reader.
+Excel workbooks (.xlsx/.xls) are parsed with pandas.read_excel and .csv exports with pandas.read_csv.
+Parsed tables are kept in an in-process cache keyed by path, modification time and size, so selecting
+several features for one file parses it only once. The least recently used tables are evicted when the
+cache grows beyond its memory budget.
+
+The first time a numeric table is parsed, a columnar sidecar is written next to it: one contiguous
+".<name>.colcache.<i>.npy" file per column plus a small ".<name>.colcache.json" with the source modification
+time, size and SHA-256. Later sessions memory-map the column files and wrap them in a DataFrame without
+copying, instead of parsing the workbook again. The sidecar is rebuilt as soon as the source file changes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import tracing
+
+CSV_EXTENSIONS = (".csv",)
+EXCEL_EXTENSIONS = (".xlsx", ".xls", ".xlsm")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_budget = 512 * 1024 ** 2
+_cache_size = 0
+
+SIDECAR_VERSION = 2
+_sidecar_enabled = True
+
+
+def _parse_table(filename):
+    """Parses the file without going through the cache."""
+    extension = os.path.splitext(str(filename))[1].lower()
+    if extension in CSV_EXTENSIONS:
+        with tracing.span("pandas.read_csv", "io"):
+            return pd.read_csv(filename)
+    with tracing.span("pandas.read_excel", "io"):
+        return pd.read_excel(filename)
+
+
+def _sidecar_paths(filename):
+    """Returns the base path of the sidecar column files and the path of the metadata file of a source file."""
+    directory, name = os.path.split(os.path.abspath(filename))
+    base = os.path.join(directory, f".{name}.colcache")
+    return base, base + ".json"
+
+
+def _column_path(base, index):
+    """Returns the path of the sidecar file of one column."""
+    return f"{base}.{index}.npy"
+
+
+def file_hash(filename):
+    """
+    Computes the SHA-256 of a file, reading it in 1 MB blocks.
+
+    Args:
+        - filename (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1024 ** 2), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_sidecar(filename, stat):
+    """
+    Loads the sidecar of a source file if it is still valid.
+
+    The sidecar is valid when the source has the recorded modification time and size. If only the
+    modification time differs (the file was touched or copied), the content hash decides.
+
+    Returns:
+        pandas.DataFrame backed by the memory-mapped sidecar, or None if there is no valid sidecar.
+    """
+    base, meta_path = _sidecar_paths(filename)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SIDECAR_VERSION or meta.get("size") != stat.st_size:
+            return None
+        if meta.get("mtime_ns") != stat.st_mtime_ns:
+            if meta.get("sha256") != file_hash(filename):
+                return None
+            meta["mtime_ns"] = stat.st_mtime_ns
+            _write_json(meta_path, meta)
+        columns = {column: np.load(_column_path(base, i), mmap_mode="r") for i, column in enumerate(meta["columns"])}
+        # Each column is its own contiguous array, so pandas keeps one block per column instead of copying
+        return pd.DataFrame(columns, copy=False)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_json(path, meta):
+    """Writes the sidecar metadata atomically."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temp_path, path)
+
+
+def _write_sidecar(filename, stat, data):
+    """
+    Writes the columnar sidecar of a parsed table.
+
+    Only tables whose columns are all numeric or boolean are stored. Failures (for example a read-only
+    directory) are ignored because the sidecar is only an accelerator.
+    """
+    if data.empty or not all(dtype.kind in "biuf" for dtype in data.dtypes):
+        return
+    base, meta_path = _sidecar_paths(filename)
+    try:
+        # Files are named by position, whatever the column titles are
+        for i in range(data.shape[1]):
+            column_path = _column_path(base, i)
+            temp_path = f"{column_path}.{os.getpid()}.tmp.npy"
+            np.save(temp_path, np.ascontiguousarray(data.iloc[:, i].to_numpy()))
+            os.replace(temp_path, column_path)
+        # Record array of the first sidecar version, and columns left over from a wider version of the table
+        if os.path.exists(base + ".npy"):
+            os.remove(base + ".npy")
+        extra = data.shape[1]
+        while os.path.exists(_column_path(base, extra)):
+            os.remove(_column_path(base, extra))
+            extra += 1
+        _write_json(meta_path, {
+            "version": SIDECAR_VERSION,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_hash(filename),
+            "columns": [str(column) for column in data.columns],
+        })
+    except OSError:
+        pass
+
+
+def _load_table(filename):
+    """Loads a table from its sidecar if possible, otherwise parses it and writes the sidecar."""
+    if not _sidecar_enabled:
+        return _parse_table(filename)
+    stat = os.stat(filename)
+    data = _load_sidecar(filename, stat)
+    if data is None:
+        data = _parse_table(filename)
+        _write_sidecar(filename, stat, data)
+    return data
+
+
+def _cache_key(filename):
+    """Builds the cache key of a file from its absolute path, modification time and size."""
+    stat = os.stat(filename)
+    return os.path.abspath(filename), stat.st_mtime_ns, stat.st_size
+
+
+def _evict(budget):
+    """Drops the least recently used tables until the cache fits in the budget. Caller holds the lock."""
+    global _cache_size
+    while _cache and _cache_size > budget:
+        _, (_, nbytes) = _cache.popitem(last=False)
+        _cache_size -= nbytes
+
+
+def read_table(filename):
+    """
+    Reads a table of experimental data from an Excel workbook or CSV file.
+
+    The returned DataFrame is shared between all readers of the same file and must not be modified.
+
+    Args:
+        - filename (str): Path to the .xlsx/.xls or .csv file.
+
+    Returns:
+        pandas.DataFrame: Contents of the first sheet (or of the CSV file).
+    """
+    global _cache_size
+    key = _cache_key(filename)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key][0]
+
+    data = _load_table(filename)
+    nbytes = int(data.memory_usage(index=True, deep=True).sum())
+
+    with _cache_lock:
+        if key not in _cache and nbytes <= _cache_budget:
+            _cache[key] = (data, nbytes)
+            _cache_size += nbytes
+            _evict(_cache_budget)
+    return data
+
+
+def set_cache_budget(nbytes):
+    """
+    Sets the memory budget of the table cache, evicting tables if needed.
+
+    Args:
+        - nbytes (int): Maximum memory in bytes. 0 disables caching.
+    """
+    global _cache_budget
+    with _cache_lock:
+        _cache_budget = int(nbytes)
+        _evict(_cache_budget)
+
+
+def set_sidecar_enabled(enabled):
+    """
+    Turns the columnar sidecar files on or off.
+
+    Args:
+        - enabled (bool): If False, workbooks are always parsed and no sidecar is written.
+    """
+    global _sidecar_enabled
+    _sidecar_enabled = bool(enabled)
+
+
+def clear_cache():
+    """Removes every table from the cache."""
+    global _cache_size
+    with _cache_lock:
+        _cache.clear()
+        _cache_size = 0
+
+
+def cache_info():
+    """
+    Returns the current state of the table cache.
+
+    Returns:
+        dict: Number of cached tables, memory they use and the memory budget, in bytes.
+    """
+    with _cache_lock:
+        return {"tables": len(_cache), "bytes": _cache_size, "budget": _cache_budget}
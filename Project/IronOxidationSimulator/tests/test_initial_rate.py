@@ -0,0 +1,67 @@
+"""
+test_initial_rate.py
+----------------------
+Author: Dongzi Ding
+Created: 2026-10-18
+Modified: 2026-10-18
+
+Checks the prefix-sum threshold sweep against one LinearRegression fit per threshold.
+
+Run from Project/IronOxidationSimulator:
+    python -m pytest -q tests
+"""
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from src.utils import initial_rate
+
+
+def _reference_fits(time, conc, thresholds):
+    """The per-threshold loop calculate_rate_compare used before the sweep: mask, fit, score on all points."""
+    conc_l, conc_h = conc[0], conc[-1]
+    if conc_h > conc_l:
+        distance, span = conc - conc_l, conc_h - conc_l
+    else:
+        distance, span = conc_l - conc, conc_l - conc_h
+    slopes, intercepts, r_squared_values = [], [], []
+    for threshold in thresholds:
+        mask = distance <= span * threshold
+        model = LinearRegression().fit(time[mask].reshape(-1, 1), conc[mask])
+        slopes.append(model.coef_[0])
+        intercepts.append(model.intercept_)
+        r_squared_values.append(model.score(time.reshape(-1, 1), conc))
+    return np.array(slopes), np.array(intercepts), np.array(r_squared_values)
+
+
+def _noisy_trace(seed, rising):
+    """A trace whose noise brings points back within the limit after they first leave it."""
+    rng = np.random.default_rng(seed)
+    time = np.sort(rng.uniform(0, 600, 400)) + 1000.0
+    curve = 1 - np.exp(-(time - time[0]) / 200)
+    conc = 50 + (curve if rising else -curve) * 20 + rng.normal(0, 1.5, time.size)
+    return time, conc
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("rising", [True, False])
+def test_sweep_matches_per_threshold_fits(seed, rising):
+    time, conc = _noisy_trace(seed, rising)
+    thresholds = np.arange(0.05, 0.2, 0.01)
+    # The noise makes the kept points more than a prefix of the trace
+    kept = initial_rate.cut_data(time, conc, thresholds[0])[0]
+    assert not np.array_equal(kept, time[:kept.size])
+
+    expected = _reference_fits(time, conc, thresholds)
+    for value, reference in zip(initial_rate.sweep_thresholds(time, conc, thresholds), expected):
+        np.testing.assert_allclose(value, reference, rtol=1e-7, atol=1e-9)
+
+
+def test_calculate_rate_compare_matches_per_threshold_fits():
+    time, conc = _noisy_trace(7, rising=False)
+    result = initial_rate.calculate_rate_compare(time, conc)
+    slopes, intercepts, r_squared_values = _reference_fits(time, conc, np.arange(0.05, 0.2, 0.01))
+    np.testing.assert_allclose(result['slopes'], slopes, rtol=1e-7, atol=1e-9)
+    np.testing.assert_allclose(result['intercepts'], intercepts, rtol=1e-7, atol=1e-9)
+    np.testing.assert_allclose(result['r_squared_values'], r_squared_values, rtol=1e-7, atol=1e-9)